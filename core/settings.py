@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -61,6 +62,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'test_pr.routers.ReplicaStickinessMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -83,6 +85,78 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.app'
+ASGI_APPLICATION = 'core.asgi.application'
+
+# Асинхронные views участника (take_test, save_answer, таймер, результат).
+# Включайте при запуске под ASGI-сервером: uvicorn core.asgi:application
+ASYNC_PARTICIPANT_VIEWS = os.environ.get('ASYNC_PARTICIPANT_VIEWS', 'False') == 'True'
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Общий кэш для нескольких воркеров - Redis (REDIS_URL), иначе локальный кэш процесса
+redis_url = os.environ.get('REDIS_URL')
+
+if redis_url:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': redis_url,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Sessions
+# https://docs.djangoproject.com/en/4.2/topics/http/sessions/
+
+# Сессия участника хранит только его ID и имя, поэтому по умолчанию
+# используются подписанные cookie - без чтения и записи строк в БД.
+# SESSION_BACKEND: signed_cookies (по умолчанию), cache или db
+SESSION_BACKENDS = {
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'db': 'django.contrib.sessions.backends.db',
+}
+SESSION_ENGINE = SESSION_BACKENDS[os.environ.get('SESSION_BACKEND', 'signed_cookies')]
+
+# Сколько секунд хранятся в кэше лист теста и ключ ответов
+# (при изменении теста кэш сбрасывается сразу)
+TEST_CACHE_TIMEOUT = int(os.environ.get('TEST_CACHE_TIMEOUT', 300))
+
+# Сколько секунд хранится отрисованная страница проверенного результата
+RESULT_CACHE_TIMEOUT = int(os.environ.get('RESULT_CACHE_TIMEOUT', 86400))
+
+# Тесты длиннее PAGED_TEST_THRESHOLD вопросов загружаются на странице
+# прохождения порциями по QUESTIONS_PAGE_SIZE через API
+PAGED_TEST_THRESHOLD = int(os.environ.get('PAGED_TEST_THRESHOLD', 100))
+QUESTIONS_PAGE_SIZE = int(os.environ.get('QUESTIONS_PAGE_SIZE', 20))
+
+# Очередь проверки: take_test только сохраняет ответы, проверяют их
+# процессы `python manage.py grade_worker`
+GRADING_QUEUE = os.environ.get('GRADING_QUEUE', 'False') == 'True'
+
+# Ограничение частоты запросов участника (test_pr/ratelimit.py).
+# rate - скорость пополнения корзины ('30/m'), burst - её размер,
+# keys - корзины: participant, session, ip (без участника и сессии - IP).
+# Ученики одного класса часто выходят в сеть с одного IP, поэтому
+# лимит по IP для регистрации рассчитан на целый класс.
+# Общим для воркеров лимит будет только с общим кэшем (REDIS_URL),
+# на локальном кэше каждый процесс считает его отдельно.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True') == 'True'
+RATE_LIMITS = {
+    'register': {'rate': '60/m', 'burst': 60, 'keys': ['session', 'ip']},
+    'save_answer': {'rate': '120/m', 'burst': 30, 'keys': ['participant', 'session']},
+    'record_question_timings': {'rate': '30/m', 'burst': 10, 'keys': ['participant', 'session']},
+}
+# За обратным прокси: заголовок с адресом клиента, например HTTP_X_FORWARDED_FOR
+RATE_LIMIT_IP_HEADER = os.environ.get('RATE_LIMIT_IP_HEADER', '')
 
 
 # Database
@@ -110,6 +184,48 @@ else:
         }
     }
 
+    # Профиль для локального развёртывания на экзамене (SQLITE_PROFILE=production):
+    # WAL позволяет читать во время записи, IMMEDIATE-транзакции выстраивают
+    # записи в очередь, а timeout ждёт освобождения блокировки вместо ошибки
+    if os.environ.get('SQLITE_PROFILE') == 'production':
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 20)),
+        }
+
+# Реплика для отчётов админки: DATABASE_REPLICA_URL, а локально
+# SQLITE_REPLICA=True - второй файл SQLite (см. manage.py sync_sqlite_replica)
+replica_url = os.environ.get('DATABASE_REPLICA_URL')
+
+if replica_url:
+    DATABASES['replica'] = dj_database_url.config(
+        default=replica_url,
+        conn_max_age=600,
+        conn_health_checks=True,
+    )
+elif not database_url and os.environ.get('SQLITE_REPLICA') == 'True':
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+    }
+
+if 'replica' in DATABASES:
+    # В тестах реплика указывает на тестовую основную БД
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['test_pr.routers.ReplicaRouter']
+REPORTING_DATABASE = 'replica'
+
+# Сколько секунд после записи администратора читать из основной БД
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -148,8 +264,23 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
-# WhiteNoise configuration
-# STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# WhiteNoise: файлы с хешем содержимого в имени (кэшируются браузером
+# навсегда) и заранее сжатые gzip/brotli копии, создаются collectstatic.
+# Без DEBUG collectstatic обязателен (run.sh и setup.sh запускают его сами);
+# при разработке и в тестах файлы отдаются из static/ без манифеста.
+TESTING = sys.argv[1:2] == ['test']
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage'
+            if DEBUG or TESTING
+            else 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
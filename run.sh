@@ -37,6 +37,18 @@ fi
 echo "✓ Миграции выполнены успешно"
 echo ""
 
+# Сборка статики: файлы с хешем в имени и сжатые копии для WhiteNoise
+echo "📦 Сборка статических файлов..."
+python3 manage.py collectstatic --noinput
+
+if [ $? -ne 0 ]; then
+    echo "❌ Ошибка при сборке статических файлов"
+    exit 1
+fi
+
+echo "✓ Статические файлы собраны"
+echo ""
+
 # Запуск сервера
 echo "🎯 Запуск Django сервера на http://localhost:8000"
 echo "📝 Админ-панель: http://localhost:8000/admin/"
@@ -57,6 +57,18 @@ fi
 echo "✅ База данных создана"
 echo ""
 
+# Сборка статики
+echo "📦 Сборка статических файлов..."
+python3 manage.py collectstatic --noinput
+
+if [ $? -ne 0 ]; then
+    echo "❌ Ошибка при сборке статических файлов"
+    exit 1
+fi
+
+echo "✅ Статические файлы собраны"
+echo ""
+
 # Создание суперпользователя
 echo "👤 Создание администратора..."
 echo ""
@@ -0,0 +1,45 @@
+// ====================================
+// МЕСТО В ТЕСТЕ И ТАБЛИЦА ЛИДЕРОВ
+// ====================================
+// Загружаются отдельно от страницы результата, чтобы сама страница
+// не менялась и кэшировалась.
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('result-rank');
+    if (!container) {
+        return;
+    }
+
+    fetch(container.dataset.rankUrl, {credentials: 'same-origin'})
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success || !data.rank) {
+                return;
+            }
+
+            document.getElementById('rank-place').textContent = `${data.rank} из ${data.total}`;
+            document.getElementById('rank-percentile').textContent = `${data.percentile}%`;
+
+            const tbody = document.getElementById('leaders-body');
+            data.leaders.forEach((leader, index) => {
+                const row = document.createElement('tr');
+                if (String(leader.result_id) === container.dataset.resultId) {
+                    row.style.fontWeight = 'bold';
+                }
+                [
+                    index + 1,
+                    leader.name,
+                    `${leader.correct_answers}/${leader.total_questions}`,
+                    `${leader.percentage.toFixed(1)}%`,
+                ].forEach(value => {
+                    const cell = document.createElement('td');
+                    cell.textContent = value;
+                    row.appendChild(cell);
+                });
+                tbody.appendChild(row);
+            });
+
+            container.style.display = 'block';
+        })
+        .catch(error => console.error(error));
+});
@@ -0,0 +1,263 @@
+// ====================================
+// ПРОХОЖДЕНИЕ ТЕСТА
+// ====================================
+// Настройки берутся из data-атрибутов формы теста: число вопросов,
+// время и, для длинного теста, адрес API порций вопросов. Первая порция
+// приходит в разметке, следующие загружаются заранее во время навигации.
+// Время на каждом открытом вопросе копится в буфере и уходит пачками
+// на data-timings-url - при заполнении буфера, уходе со вкладки и отправке.
+
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.getElementById('test-form');
+    if (!form) {
+        return;
+    }
+
+    const questions = parseInt(form.dataset.total, 10);
+    const questionsUrl = form.dataset.questionsUrl;
+    const pageSize = parseInt(form.dataset.pageSize, 10);
+    const wrapper = document.getElementById('questions-wrapper');
+    const nav = document.getElementById('question-nav');
+    const loadedPages = new Map();
+    let currentQuestion = 0;
+
+    const timingsUrl = form.dataset.timingsUrl;
+    const TIMINGS_BATCH = 20;
+    let timings = [];
+    let shownQuestionId = null;
+    let shownAt = 0;
+
+    // Кнопки навигации длинного теста создаются скриптом
+    if (questionsUrl) {
+        loadedPages.set(1, Promise.resolve());
+        for (let i = 0; i < questions; i++) {
+            const btn = document.createElement('button');
+            btn.type = 'button';
+            btn.className = 'question-nav-btn';
+            btn.dataset.index = i;
+            btn.textContent = i + 1;
+            nav.appendChild(btn);
+        }
+    }
+    const navButtons = Array.from(nav.querySelectorAll('.question-nav-btn'));
+
+    function pageOf(index) {
+        return Math.floor(index / pageSize) + 1;
+    }
+
+    function renderQuestion(question, index) {
+        const questionElement = document.createElement('div');
+        questionElement.className = 'question';
+        questionElement.id = 'question-' + question.id;
+        questionElement.dataset.index = index;
+        questionElement.style.display = 'none';
+
+        const header = document.createElement('div');
+        header.style.marginBottom = '20px';
+        const number = document.createElement('span');
+        number.className = 'question-number';
+        number.textContent = index + 1;
+        const text = document.createElement('span');
+        text.className = 'question-text';
+        text.textContent = question.text;
+        header.append(number, ' ', text);
+
+        const answers = document.createElement('div');
+        answers.style.marginLeft = '45px';
+        question.answers.forEach(answer => {
+            const option = document.createElement('div');
+            option.className = 'answer-option';
+            const radio = document.createElement('input');
+            radio.type = 'radio';
+            radio.name = 'answer_' + question.id;
+            radio.value = answer.id;
+            radio.id = 'answer_' + answer.id;
+            radio.className = 'answer-radio';
+            radio.dataset.question = question.id;
+            const label = document.createElement('label');
+            label.htmlFor = radio.id;
+            label.textContent = answer.text;
+            option.append(radio, label);
+            answers.appendChild(option);
+        });
+
+        questionElement.append(header, answers);
+        wrapper.appendChild(questionElement);
+    }
+
+    // Загрузка порции вопросов (каждая порция запрашивается один раз)
+    function loadPage(page) {
+        if (!questionsUrl || page < 1 || (page - 1) * pageSize >= questions) {
+            return Promise.resolve();
+        }
+        if (!loadedPages.has(page)) {
+            const request = fetch(`${questionsUrl}?page=${page}`, {credentials: 'same-origin'})
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        throw new Error(data.error);
+                    }
+                    const start = (data.page - 1) * data.page_size;
+                    data.questions.forEach((question, i) => renderQuestion(question, start + i));
+                })
+                .catch(error => {
+                    // Повторим загрузку при следующем переходе
+                    loadedPages.delete(page);
+                    console.error(error);
+                });
+            loadedPages.set(page, request);
+        }
+        return loadedPages.get(page);
+    }
+
+    // Время на вопросах
+    function sendTimings() {
+        if (!timingsUrl || !timings.length) {
+            return;
+        }
+        // Строка уходит как text/plain - sendBeacon не нужен предварительный запрос
+        const body = JSON.stringify({timings: timings});
+        timings = [];
+        if (!navigator.sendBeacon || !navigator.sendBeacon(timingsUrl, body)) {
+            fetch(timingsUrl, {method: 'POST', body: body, credentials: 'same-origin', keepalive: true})
+                .catch(error => console.error(error));
+        }
+    }
+
+    function stopTiming() {
+        if (shownQuestionId !== null) {
+            const duration = Math.round(performance.now() - shownAt);
+            if (duration > 0) {
+                timings.push([shownQuestionId, duration]);
+            }
+            shownQuestionId = null;
+        }
+        if (timings.length >= TIMINGS_BATCH) {
+            sendTimings();
+        }
+    }
+
+    function startTiming(questionElement) {
+        stopTiming();
+        shownQuestionId = parseInt(questionElement.id.replace('question-', ''), 10);
+        shownAt = performance.now();
+    }
+
+    // Пока вкладка скрыта, время не идёт; накопленное отправляем сразу,
+    // страницу могут закрыть, не возвращаясь на неё
+    let pausedQuestionId = null;
+    document.addEventListener('visibilitychange', function() {
+        if (document.visibilityState === 'hidden') {
+            pausedQuestionId = shownQuestionId;
+            stopTiming();
+            sendTimings();
+        } else if (pausedQuestionId !== null) {
+            shownQuestionId = pausedQuestionId;
+            shownAt = performance.now();
+            pausedQuestionId = null;
+        }
+    });
+
+    form.addEventListener('submit', function() {
+        stopTiming();
+        sendTimings();
+    });
+
+    function showQuestion(index) {
+        const page = pageOf(index);
+        loadPage(page).then(() => {
+            if (index !== currentQuestion) {
+                return;
+            }
+
+            // Скрываем все вопросы и показываем текущий
+            wrapper.querySelectorAll('.question').forEach(q => q.style.display = 'none');
+            const questionElement = wrapper.querySelector(`.question[data-index="${index}"]`);
+            if (questionElement) {
+                questionElement.style.display = 'block';
+                startTiming(questionElement);
+            }
+        });
+
+        // Следующая порция загружается заранее, пока участник отвечает
+        loadPage(page + 1);
+
+        // Обновляем активную кнопку навигации
+        navButtons.forEach((btn, i) => {
+            btn.classList.toggle('active', i === index);
+        });
+
+        // Обновляем видимость кнопок навигации
+        document.getElementById('prev-btn').style.display = index > 0 ? 'inline-block' : 'none';
+        document.getElementById('next-btn').style.display = index < questions - 1 ? 'inline-block' : 'none';
+        document.getElementById('submit-btn').style.display = index === questions - 1 ? 'block' : 'none';
+    }
+
+    // Отслеживание ответов (в том числе в догруженных вопросах)
+    wrapper.addEventListener('change', function(e) {
+        if (!e.target.classList.contains('answer-radio')) {
+            return;
+        }
+        const navBtn = navButtons[e.target.closest('.question').dataset.index];
+        if (navBtn) {
+            navBtn.classList.add('answered');
+        }
+    });
+
+    // Навигация
+    document.getElementById('prev-btn').addEventListener('click', function() {
+        if (currentQuestion > 0) {
+            currentQuestion--;
+            showQuestion(currentQuestion);
+        }
+    });
+
+    document.getElementById('next-btn').addEventListener('click', function() {
+        if (currentQuestion < questions - 1) {
+            currentQuestion++;
+            showQuestion(currentQuestion);
+        }
+    });
+
+    // Клики по номерам вопросов
+    navButtons.forEach((btn, index) => {
+        btn.addEventListener('click', function(e) {
+            e.preventDefault();
+            currentQuestion = index;
+            showQuestion(currentQuestion);
+        });
+    });
+
+    // Таймер
+    let timeLeft = parseInt(form.dataset.timerSeconds, 10);
+    const timerDisplay = document.getElementById('timer-display');
+    const timerElement = document.getElementById('timer');
+
+    function updateTimer() {
+        const minutes = Math.floor(timeLeft / 60);
+        const seconds = timeLeft % 60;
+        timerDisplay.textContent = `Осталось: ${minutes}:${seconds.toString().padStart(2, '0')}`;
+
+        if (timeLeft <= 60) {
+            timerElement.classList.add('warning');
+        }
+        if (timeLeft <= 0) {
+            timerElement.classList.add('danger');
+            // form.submit() не вызывает событие submit
+            stopTiming();
+            sendTimings();
+            form.submit();
+            return;
+        }
+
+        timeLeft--;
+        setTimeout(updateTimer, 1000);
+    }
+
+    if (timeLeft > 0 && timerElement) {
+        updateTimer();
+    }
+
+    // Показываем первый вопрос при загрузке
+    showQuestion(0);
+});
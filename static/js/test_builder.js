@@ -0,0 +1,112 @@
+// ====================================
+// КОНСТРУКТОР ТЕСТОВ: СПИСОК ТЕСТОВ
+// ====================================
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+function duplicateTest(testId) {
+    if (!confirm('Вы уверены, что хотите дублировать этот тест?')) {
+        return;
+    }
+    
+    fetch(`/admin-builder/${testId}/duplicate/`, {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCookie('csrftoken'),
+            'Content-Type': 'application/json'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            alert(data.message);
+            window.location.reload();
+        } else {
+            alert('Ошибка: ' + data.error);
+        }
+    })
+    .catch(error => {
+        alert('Произошла ошибка при дублировании теста');
+        console.error(error);
+    });
+}
+
+function deleteTest(testId, testTitle) {
+    if (!confirm(`Вы уверены, что хотите удалить тест "${testTitle}"?\n\nЭто действие нельзя отменить!`)) {
+        return;
+    }
+    
+    fetch(`/admin-builder/${testId}/delete/`, {
+        method: 'POST',
+        headers: {
+            'X-CSRFToken': getCookie('csrftoken'),
+            'Content-Type': 'application/json'
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            alert(data.message);
+            window.location.reload();
+        } else {
+            alert('Ошибка: ' + data.error);
+        }
+    })
+    .catch(error => {
+        alert('Произошла ошибка при удалении теста');
+        console.error(error);
+    });
+}
+
+// Прогресс фонового удаления (задачи выполняет purge_deleted)
+function pollDeletions() {
+    const card = document.getElementById('deletion-progress');
+    if (!card) {
+        return;
+    }
+    
+    fetch(card.dataset.statusUrl)
+    .then(response => response.json())
+    .then(data => {
+        const active = new Set(data.jobs.map(job => String(job.id)));
+        data.jobs.forEach(job => {
+            const row = card.querySelector(`[data-job-id="${job.id}"]`);
+            if (!row) {
+                return;
+            }
+            row.querySelector('.deletion-bar').style.width = job.progress + '%';
+            row.querySelector('.deletion-status').textContent = job.error
+                ? `${job.status_display}: ${job.error}`
+                : `${job.status_display} - ${job.progress}%`;
+        });
+        
+        // Завершённые задачи пропадают из ответа
+        card.querySelectorAll('[data-job-id]').forEach(row => {
+            if (!active.has(row.dataset.jobId)) {
+                row.remove();
+            }
+        });
+        
+        if (data.jobs.some(job => job.status !== 'failed')) {
+            setTimeout(pollDeletions, 2000);
+        } else if (!data.jobs.length) {
+            card.remove();
+        }
+    })
+    .catch(error => console.error(error));
+}
+
+document.addEventListener('DOMContentLoaded', pollDeletions);
@@ -0,0 +1,396 @@
+// ====================================
+// КОНСТРУКТОР ТЕСТОВ: СОЗДАНИЕ И РЕДАКТИРОВАНИЕ
+// ====================================
+// Адрес возврата и текст сообщения берутся из data-атрибутов формы,
+// существующие вопросы - из JSON-блока #questions-data.
+// Порядок вопросов задаётся перетаскиванием; при редактировании перенос
+// сохранённого вопроса сразу отправляется на data-reorder-url.
+// При редактировании сохраняются только изменения (PATCH на data-changes-url):
+// изменённые поля теста, изменённые и новые вопросы и ID удалённых вопросов,
+// с версией теста data-version на момент открытия страницы.
+
+let questionCounter = 0;
+const dirtyFields = new Set();
+const deletedQuestionIds = [];
+
+function addQuestion(text = '', answers = [], questionId = null) {
+    questionCounter++;
+    const container = document.getElementById('questions-container');
+    document.getElementById('no-questions').style.display = 'none';
+    
+    const questionDiv = document.createElement('div');
+    questionDiv.className = 'question-card';
+    questionDiv.id = `question-${questionCounter}`;
+    if (questionId !== null) {
+        questionDiv.dataset.questionId = questionId;
+    }
+    questionDiv.innerHTML = `
+        <div class="question-header">
+            <h3 style="margin: 0;">
+                <span class="drag-handle" title="Перетащите, чтобы изменить порядок">⠿</span>
+                Вопрос ${questionCounter}
+            </h3>
+            <button type="button" onclick="removeQuestion(${questionCounter})" class="btn btn-danger" style="padding: 8px 16px;">
+                Удалить вопрос
+            </button>
+        </div>
+        
+        <div class="form-group">
+            <label>Текст вопроса *</label>
+            <textarea class="form-control question-text" rows="3" placeholder="Введите текст вопроса" required>${text}</textarea>
+        </div>
+        
+        <div style="margin-top: 20px; padding-top: 20px; border-top: 1px solid var(--border-color);">
+            <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 15px;">
+                <strong>Варианты ответов</strong>
+                <button type="button" onclick="addAnswer(${questionCounter}); markQuestionDirty(this)" class="btn btn-success" style="padding: 6px 12px; font-size: 0.9rem;">
+                    + Добавить вариант
+                </button>
+            </div>
+            <div class="answers-container" id="answers-${questionCounter}"></div>
+        </div>
+    `;
+    
+    container.appendChild(questionDiv);
+    enableDragging(questionDiv);
+    
+    // Добавляем существующие ответы или 4 пустых
+    if (answers.length > 0) {
+        answers.forEach(answer => {
+            addAnswer(questionCounter, answer.text, answer.is_correct, answer.order, answer.id);
+        });
+    } else {
+        for (let i = 0; i < 4; i++) {
+            addAnswer(questionCounter);
+        }
+    }
+}
+
+function removeQuestion(questionId) {
+    if (confirm('Удалить этот вопрос?')) {
+        const card = document.getElementById(`question-${questionId}`);
+        if (card.dataset.questionId) {
+            deletedQuestionIds.push(parseInt(card.dataset.questionId));
+        }
+        card.remove();
+        
+        const container = document.getElementById('questions-container');
+        if (container.children.length === 0) {
+            document.getElementById('no-questions').style.display = 'block';
+        }
+    }
+}
+
+function addAnswer(questionId, text = '', isCorrect = false, order = null, answerId = null) {
+    const container = document.getElementById(`answers-${questionId}`);
+    const answerIndex = order !== null ? order : container.children.length;
+    
+    const answerDiv = document.createElement('div');
+    answerDiv.className = 'answer-item';
+    if (answerId !== null && answerId !== undefined) {
+        answerDiv.dataset.answerId = answerId;
+    }
+    answerDiv.innerHTML = `
+        <input type="text" class="form-control answer-text" placeholder="Вариант ответа" required style="flex: 1;" value="${text}">
+        <label style="display: flex; align-items: center; gap: 5px; cursor: pointer; white-space: nowrap;">
+            <input type="checkbox" class="form-check-input answer-correct" style="margin: 0;" ${isCorrect ? 'checked' : ''}>
+            <span>Верно</span>
+        </label>
+        <input type="number" class="form-control answer-order" value="${answerIndex}" min="0" style="width: 80px;">
+        <button type="button" onclick="markQuestionDirty(this); this.parentElement.remove()" class="btn btn-danger" style="padding: 8px 12px;">
+            ×
+        </button>
+    `;
+    
+    container.appendChild(answerDiv);
+}
+
+// ====================================
+// ОТСЛЕЖИВАНИЕ ИЗМЕНЕНИЙ
+// ====================================
+
+function markQuestionDirty(element) {
+    element.closest('.question-card').dataset.dirty = 'true';
+}
+
+function trackChange(e) {
+    // Правка внутри карточки помечает вопрос, иначе - поле теста
+    if (e.target.closest('.question-card')) {
+        markQuestionDirty(e.target);
+    } else if (e.target.name && e.target.name !== 'csrfmiddlewaretoken') {
+        dirtyFields.add(e.target.name);
+    }
+}
+
+document.getElementById('test-form').addEventListener('input', trackChange);
+document.getElementById('test-form').addEventListener('change', trackChange);
+
+// ====================================
+// ПЕРЕТАСКИВАНИЕ ВОПРОСОВ
+// ====================================
+
+let draggedCard = null;
+
+function enableDragging(card) {
+    // Карточка перетаскивается только за ручку, чтобы не мешать выделению текста
+    const handle = card.querySelector('.drag-handle');
+    handle.addEventListener('mousedown', () => {
+        card.draggable = true;
+    });
+    handle.addEventListener('mouseup', () => {
+        card.draggable = false;
+    });
+    
+    let startedAfter = null;
+    
+    card.addEventListener('dragstart', e => {
+        draggedCard = card;
+        startedAfter = card.previousElementSibling;
+        card.classList.add('dragging');
+        e.dataTransfer.effectAllowed = 'move';
+    });
+    
+    card.addEventListener('dragend', () => {
+        card.draggable = false;
+        card.classList.remove('dragging');
+        draggedCard = null;
+        if (card.previousElementSibling !== startedAfter) {
+            saveQuestionPosition(card);
+        }
+    });
+}
+
+function neighbourQuestionId(card, direction) {
+    // Ближайший сохранённый вопрос (у новых карточек ещё нет ID)
+    let sibling = direction < 0 ? card.previousElementSibling : card.nextElementSibling;
+    while (sibling && !sibling.dataset.questionId) {
+        sibling = direction < 0 ? sibling.previousElementSibling : sibling.nextElementSibling;
+    }
+    return sibling ? parseInt(sibling.dataset.questionId) : null;
+}
+
+async function saveQuestionPosition(card) {
+    const form = document.getElementById('test-form');
+    if (!form.dataset.reorderUrl || !card.dataset.questionId) {
+        return;
+    }
+    
+    try {
+        const response = await fetch(form.dataset.reorderUrl, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': form.querySelector('[name=csrfmiddlewaretoken]').value,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                question_id: parseInt(card.dataset.questionId),
+                after_id: neighbourQuestionId(card, -1),
+                before_id: neighbourQuestionId(card, 1)
+            })
+        });
+        const data = await response.json();
+        
+        if (!data.success) {
+            alert('Ошибка: ' + data.error);
+            window.location.reload();
+        }
+    } catch (error) {
+        alert('Не удалось сохранить порядок вопросов');
+        console.error(error);
+    }
+}
+
+document.getElementById('questions-container').addEventListener('dragover', e => {
+    if (!draggedCard) {
+        return;
+    }
+    e.preventDefault();
+    
+    // Карточка встаёт перед первой карточкой, середина которой ниже курсора
+    const container = e.currentTarget;
+    const after = [...container.querySelectorAll('.question-card:not(.dragging)')].find(card => {
+        const box = card.getBoundingClientRect();
+        return e.clientY < box.top + box.height / 2;
+    });
+    if (after) {
+        container.insertBefore(draggedCard, after);
+    } else {
+        container.appendChild(draggedCard);
+    }
+});
+
+document.getElementById('test-form').addEventListener('submit', async function(e) {
+    e.preventDefault();
+    
+    const formData = new FormData(this);
+    
+    // Собираем данные о вопросах
+    const questionsData = [];
+    const changedQuestions = [];
+    const questionCards = document.querySelectorAll('.question-card');
+    
+    if (questionCards.length === 0) {
+        alert('Добавьте хотя бы один вопрос!');
+        return;
+    }
+    
+    for (const [index, card] of questionCards.entries()) {
+        const questionText = card.querySelector('.question-text').value.trim();
+        
+        if (!questionText) {
+            alert('Заполните текст всех вопросов!');
+            return;
+        }
+        
+        // Собираем ответы для этого вопроса
+        const answers = [];
+        const answerItems = card.querySelectorAll('.answer-item');
+        
+        if (answerItems.length === 0) {
+            alert('Добавьте хотя бы один вариант ответа для каждого вопроса!');
+            return;
+        }
+        
+        if (answerItems.length < 2) {
+            alert('Каждый вопрос должен иметь минимум 2 варианта ответа!');
+            return;
+        }
+        
+        let hasCorrectAnswer = false;
+        
+        for (const answerItem of answerItems) {
+            const answerText = answerItem.querySelector('.answer-text').value.trim();
+            const isCorrect = answerItem.querySelector('.answer-correct').checked;
+            const answerOrder = answerItem.querySelector('.answer-order').value;
+            
+            if (!answerText) {
+                alert('Заполните текст всех вариантов ответа!');
+                return;
+            }
+            
+            if (isCorrect) {
+                hasCorrectAnswer = true;
+            }
+            
+            answers.push({
+                id: answerItem.dataset.answerId ? parseInt(answerItem.dataset.answerId) : null,
+                text: answerText,
+                is_correct: isCorrect,
+                order: parseInt(answerOrder)
+            });
+        }
+        
+        if (!hasCorrectAnswer) {
+            alert('Отметьте правильный ответ для каждого вопроса!');
+            return;
+        }
+        
+        // Порядок вопросов - порядок карточек
+        questionsData.push({
+            text: questionText,
+            answers: answers
+        });
+        
+        // Изменения: новые вопросы (после ближайшего сохранённого) и изменённые
+        if (!card.dataset.questionId) {
+            changedQuestions.push({
+                key: card.id,
+                number: index + 1,
+                after_id: neighbourQuestionId(card, -1),
+                text: questionText,
+                answers: answers
+            });
+        } else if (card.dataset.dirty) {
+            changedQuestions.push({
+                id: parseInt(card.dataset.questionId),
+                number: index + 1,
+                text: questionText,
+                answers: answers
+            });
+        }
+    }
+    
+    if (this.dataset.changesUrl) {
+        await saveChanges(this, changedQuestions);
+        return;
+    }
+    
+    formData.append('questions_data', JSON.stringify(questionsData));
+    
+    try {
+        const response = await fetch('', {
+            method: 'POST',
+            body: formData
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            alert(this.dataset.successMessage);
+            window.location.href = data.redirect_url || this.dataset.redirectUrl;
+        } else {
+            alert('Ошибка: ' + (data.error || JSON.stringify(data.errors)));
+        }
+    } catch (error) {
+        alert('Произошла ошибка при сохранении теста');
+        console.error(error);
+    }
+});
+
+async function saveChanges(form, questions) {
+    const test = {};
+    for (const name of dirtyFields) {
+        const field = form.elements[name];
+        test[name] = field.type === 'checkbox' ? field.checked : field.value;
+    }
+    
+    if (Object.keys(test).length === 0 && questions.length === 0 && deletedQuestionIds.length === 0) {
+        window.location.href = form.dataset.redirectUrl;
+        return;
+    }
+    
+    try {
+        const response = await fetch(form.dataset.changesUrl, {
+            method: 'PATCH',
+            headers: {
+                'X-CSRFToken': form.querySelector('[name=csrfmiddlewaretoken]').value,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                version: parseInt(form.dataset.version),
+                test: test,
+                questions: questions,
+                deleted: deletedQuestionIds
+            })
+        });
+        const data = await response.json();
+        
+        if (data.success) {
+            form.dataset.version = data.version;
+            alert(form.dataset.successMessage);
+            window.location.href = form.dataset.redirectUrl;
+        } else if (response.status === 409) {
+            // Тест сохранён другим редактором - его изменения не перезаписываются
+            if (confirm(data.error + '. Обновить страницу? Ваши несохранённые изменения будут потеряны.')) {
+                window.location.reload();
+            }
+        } else {
+            alert('Ошибка: ' + (data.error || JSON.stringify(data.errors)));
+        }
+    } catch (error) {
+        alert('Произошла ошибка при сохранении теста');
+        console.error(error);
+    }
+}
+
+// Загружаем существующие вопросы (при редактировании)
+const initialQuestions = document.getElementById('questions-data');
+const questionsData = initialQuestions ? JSON.parse(initialQuestions.textContent) : [];
+if (questionsData.length > 0) {
+    questionsData.forEach(q => {
+        addQuestion(q.text, q.answers, q.id);
+    });
+} else {
+    // Если нет вопросов, добавляем один пустой
+    addQuestion();
+}
@@ -1,8 +1,19 @@
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from django.db.models import Count
-from .models import Test, Question, Answer, Participant, TestResult, UserAnswer
+from django.db import transaction
+from django.db.models import Case, Count, Value, When
+from .models import Test, Question, Answer, Participant, TestResult, Submission, DeletionJob
+from . import ordering
+from .caching import touch_tests
+from .dedup import update_signatures
+from .deletion import BackgroundDeletionAdminMixin
+from .packing import answers_for_result
+from .regrade import diff, regrade
+from .routers import ReportingAdminMixin
+from .search import FullTextSearchAdminMixin, QUESTION_INDEX, ANSWER_INDEX, index_answers
 
 
 class AnswerInline(admin.TabularInline):
@@ -39,7 +50,7 @@ class QuestionInline(admin.StackedInline):
 
 
 @admin.register(Test)
-class TestAdmin(admin.ModelAdmin):
+class TestAdmin(ReportingAdminMixin, BackgroundDeletionAdminMixin, admin.ModelAdmin):
     """Админ для управления тестами"""
     list_display = (
         'title',
@@ -60,7 +71,7 @@ class TestAdmin(admin.ModelAdmin):
             'description': 'Введите название и описание теста'
         }),
         ('Настройки времени и отображения', {
-            'fields': ('timer_minutes', 'show_answers', 'show_result'),
+            'fields': ('timer_minutes', 'pool_size', 'show_answers', 'show_result'),
             'description': 'Настройте таймер и параметры отображения результатов'
         }),
         ('Служебная информация', {
@@ -71,7 +82,7 @@ class TestAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at', 'preview_link')
     inlines = [QuestionInline]
     
-    actions = ['make_active', 'make_inactive', 'duplicate_test']
+    actions = ['make_active', 'make_inactive', 'duplicate_test', 'regrade_results']
     
     # Для автозаполнения в других моделях
     search_fields = ['title']
@@ -107,15 +118,23 @@ class TestAdmin(admin.ModelAdmin):
             color, count
         )
     
+    def _set_status(self, queryset, status):
+        """update() не вызывает сигналы - кэш тестов и версия каталога сбрасываются явно"""
+        with transaction.atomic():
+            test_ids = list(queryset.values_list('id', flat=True))
+            updated = Test.objects.filter(id__in=test_ids).update(status=status)
+            touch_tests(test_ids)
+        return updated
+    
     def make_active(self, request, queryset):
         """Активировать выбранные тесты"""
-        updated = queryset.update(status='active')
+        updated = self._set_status(queryset, 'active')
         self.message_user(request, f'Активировано тестов: {updated}')
     make_active.short_description = "✓ Активировать выбранные тесты"
     
     def make_inactive(self, request, queryset):
         """Деактивировать выбранные тесты"""
-        updated = queryset.update(status='inactive')
+        updated = self._set_status(queryset, 'inactive')
         self.message_user(request, f'Деактивировано тестов: {updated}')
     make_inactive.short_description = "✗ Деактивировать выбранные тесты"
     
@@ -142,6 +161,37 @@ class TestAdmin(admin.ModelAdmin):
         self.message_user(request, f'Дублировано тестов: {queryset.count()}')
     duplicate_test.short_description = "📋 Дублировать выбранные тесты"
     
+    # Сколько изменений показывать на тест на странице подтверждения
+    REGRADE_CHANGES_SHOWN = 200
+    
+    def regrade_results(self, request, queryset):
+        """Перепроверить результаты по текущим правильным ответам (сначала - список изменений)"""
+        tests = list(queryset.order_by('id'))
+        
+        if request.POST.get('apply'):
+            changed = sum(len(regrade(test.id)) for test in tests)
+            self.message_user(request, f'Перепроверено тестов: {len(tests)}, изменено результатов: {changed}')
+            return None
+        
+        previews = []
+        for test in tests:
+            changes = diff(test.id)
+            previews.append({
+                'test': test,
+                'changes': changes[:self.REGRADE_CHANGES_SHOWN],
+                'total': len(changes),
+            })
+        
+        return TemplateResponse(request, 'admin/test_pr/test/regrade_confirmation.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Перепроверка результатов',
+            'opts': self.model._meta,
+            'previews': previews,
+            'queryset': queryset,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
+    regrade_results.short_description = "🔄 Перепроверить результаты"
+    
     @admin.display(description='Предпросмотр')
     def preview_link(self, obj):
         """Ссылка на предпросмотр теста"""
@@ -159,18 +209,19 @@ class TestAdmin(admin.ModelAdmin):
 
 
 @admin.register(Question)
-class QuestionAdmin(admin.ModelAdmin):
+class QuestionAdmin(ReportingAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin):
     """Админ для управления вопросами"""
     list_display = (
         'get_test_title',
         'text_preview',
         'order',
         'get_answers_count',
-        'has_correct_answer'
+        'has_correct_answer',
+        'get_average_time'
     )
     list_filter = ('test', 'test__status', 'created_at')
     search_fields = ('text', 'test__title')
-    list_select_related = ('test',)
+    list_select_related = ('test', 'timing_stat')
     save_on_top = True
     
     fieldsets = (
@@ -188,10 +239,14 @@ class QuestionAdmin(admin.ModelAdmin):
     
     autocomplete_fields = ['test']
     
-    # Для автозаполнения в других моделях
-    search_fields = ['text']
+    # Поиск по индексу (текст вопроса и название теста);
+    # search_fields - запасной вариант для СУБД без полнотекстового поиска
+    search_index = QUESTION_INDEX
     
-    actions = ['move_to_top', 'add_default_answers']
+    actions = [
+        'move_to_top', 'move_up', 'move_down', 'move_to_bottom',
+        'renumber_questions', 'add_default_answers'
+    ]
     
     @admin.display(description='Тест')
     def get_test_title(self, obj):
@@ -231,42 +286,69 @@ class QuestionAdmin(admin.ModelAdmin):
             return mark_safe('<span style="color: #10b981; font-size: 16px;">✓</span>')
         return mark_safe('<span style="color: #ef4444; font-size: 16px;">✗</span>')
     
+    @admin.display(description='Среднее время')
+    def get_average_time(self, obj):
+        """Среднее время на вопросе по сводке (обновляет rollup_timings)"""
+        stat = getattr(obj, 'timing_stat', None)
+        if stat is None or not stat.views:
+            return '—'
+        return format_html(
+            '<span title="{}">{} с</span>',
+            f'Открытий: {stat.views}', f'{stat.average_seconds:.1f}'
+        )
+    
     def move_to_top(self, request, queryset):
         """Переместить вопросы в начало"""
-        for question in queryset:
-            question.order = 0
-            question.save()
+        ordering.move_to_top(list(queryset.values_list('id', flat=True)))
         self.message_user(request, f'Перемещено вопросов: {queryset.count()}')
     move_to_top.short_description = "↑ Переместить в начало"
     
+    def move_to_bottom(self, request, queryset):
+        """Переместить вопросы в конец"""
+        ordering.move_to_bottom(list(queryset.values_list('id', flat=True)))
+        self.message_user(request, f'Перемещено вопросов: {queryset.count()}')
+    move_to_bottom.short_description = "↓ Переместить в конец"
+    
+    def move_up(self, request, queryset):
+        """Сдвинуть вопросы на одну позицию выше"""
+        ordering.shift(list(queryset.values_list('id', flat=True)), -1)
+        self.message_user(request, f'Сдвинуто вопросов: {queryset.count()}')
+    move_up.short_description = "↑ Сдвинуть выше"
+    
+    def move_down(self, request, queryset):
+        """Сдвинуть вопросы на одну позицию ниже"""
+        ordering.shift(list(queryset.values_list('id', flat=True)), 1)
+        self.message_user(request, f'Сдвинуто вопросов: {queryset.count()}')
+    move_down.short_description = "↓ Сдвинуть ниже"
+    
+    def renumber_questions(self, request, queryset):
+        """Пронумеровать вопросы тестов подряд"""
+        updated = ordering.renumber(list(queryset.values_list('id', flat=True)))
+        self.message_user(request, f'Изменён порядок вопросов: {updated}')
+    renumber_questions.short_description = "🔢 Пронумеровать вопросы тестов заново"
+    
     def add_default_answers(self, request, queryset):
         """Добавить стандартные варианты ответов"""
-        for question in queryset:
-            if question.answers.count() == 0:
-                Answer.objects.create(
-                    question=question,
-                    text="Вариант А",
-                    order=1,
-                    is_correct=True
-                )
-                Answer.objects.create(
-                    question=question,
-                    text="Вариант Б",
-                    order=2,
-                    is_correct=False
-                )
-                Answer.objects.create(
-                    question=question,
-                    text="Вариант В",
-                    order=3,
-                    is_correct=False
-                )
-        self.message_user(request, f'Добавлены ответы для {queryset.count()} вопросов')
+        # Одна вставка для всех вопросов без ответов; bulk_create не вызывает
+        # сигналы, поэтому индексы и кэш тестов обновляются явно
+        with transaction.atomic():
+            questions = list(queryset.filter(answers__isnull=True).values_list('id', 'test_id'))
+            Answer.objects.bulk_create([
+                Answer(question_id=question_id, text=text, order=order, is_correct=order == 1)
+                for question_id, _ in questions
+                for order, text in enumerate(["Вариант А", "Вариант Б", "Вариант В"], start=1)
+            ])
+            question_ids = [question_id for question_id, _ in questions]
+            if question_ids:
+                index_answers('a.question_id IN (%s)' % ', '.join(['%s'] * len(question_ids)), question_ids)
+                update_signatures(question_ids)
+                touch_tests({test_id for _, test_id in questions})
+        self.message_user(request, f'Добавлены ответы для {len(questions)} вопросов')
     add_default_answers.short_description = "➕ Добавить варианты ответов"
 
 
 @admin.register(Answer)
-class AnswerAdmin(admin.ModelAdmin):
+class AnswerAdmin(FullTextSearchAdminMixin, admin.ModelAdmin):
     """Админ для управления ответами"""
     list_display = (
         'get_question_preview',
@@ -277,6 +359,7 @@ class AnswerAdmin(admin.ModelAdmin):
     )
     list_filter = ('is_correct', 'question__test', 'created_at')
     search_fields = ('text', 'question__text', 'question__test__title')
+    search_index = ANSWER_INDEX
     list_select_related = ('question', 'question__test')
     save_on_top = True
     
@@ -294,7 +377,7 @@ class AnswerAdmin(admin.ModelAdmin):
     
     autocomplete_fields = ['question']
     
-    actions = ['mark_as_correct', 'mark_as_incorrect']
+    actions = ['mark_as_correct', 'mark_as_incorrect', 'mark_as_only_correct']
     
     @admin.display(description='Вопрос')
     def get_question_preview(self, obj):
@@ -325,21 +408,43 @@ class AnswerAdmin(admin.ModelAdmin):
         """Название теста"""
         return obj.question.test.title
     
+    def _touch_answer_tests(self, answer_ids):
+        """update() не вызывает сигналы - кэш тестов сбрасывается явно"""
+        touch_tests(Question.objects.filter(answers__id__in=answer_ids).values_list('test_id', flat=True).distinct())
+    
     def mark_as_correct(self, request, queryset):
         """Пометить как правильные"""
-        updated = queryset.update(is_correct=True)
+        with transaction.atomic():
+            answer_ids = list(queryset.values_list('id', flat=True))
+            updated = Answer.objects.filter(id__in=answer_ids).update(is_correct=True)
+            self._touch_answer_tests(answer_ids)
         self.message_user(request, f'Помечено правильными: {updated}')
     mark_as_correct.short_description = "✓ Пометить как правильные"
     
     def mark_as_incorrect(self, request, queryset):
         """Пометить как неправильные"""
-        updated = queryset.update(is_correct=False)
+        with transaction.atomic():
+            answer_ids = list(queryset.values_list('id', flat=True))
+            updated = Answer.objects.filter(id__in=answer_ids).update(is_correct=False)
+            self._touch_answer_tests(answer_ids)
         self.message_user(request, f'Помечено неправильными: {updated}')
     mark_as_incorrect.short_description = "✗ Пометить как неправильные"
+    
+    def mark_as_only_correct(self, request, queryset):
+        """Сделать выбранные ответы единственными правильными в своих вопросах"""
+        with transaction.atomic():
+            answer_ids = list(queryset.values_list('id', flat=True))
+            # Одним UPDATE по всем ответам затронутых вопросов
+            Answer.objects.filter(
+                question_id__in=Answer.objects.filter(id__in=answer_ids).values('question_id')
+            ).update(is_correct=Case(When(id__in=answer_ids, then=Value(True)), default=Value(False)))
+            self._touch_answer_tests(answer_ids)
+        self.message_user(request, f'Правильный ответ задан для {len(answer_ids)} вариантов')
+    mark_as_only_correct.short_description = "◉ Сделать единственным правильным"
 
 
 @admin.register(Participant)
-class ParticipantAdmin(admin.ModelAdmin):
+class ParticipantAdmin(ReportingAdminMixin, BackgroundDeletionAdminMixin, admin.ModelAdmin):
     """Админ для просмотра участников"""
     list_display = ('get_full_name', 'get_test_count', 'created_at')
     list_filter = ('created_at',)
@@ -361,7 +466,7 @@ class ParticipantAdmin(admin.ModelAdmin):
 
 
 @admin.register(TestResult)
-class TestResultAdmin(admin.ModelAdmin):
+class TestResultAdmin(ReportingAdminMixin, admin.ModelAdmin):
     """Админ для просмотра результатов тестов"""
     list_display = (
         'get_participant_name',
@@ -415,7 +520,7 @@ class TestResultAdmin(admin.ModelAdmin):
     @admin.display(description='Ответы пользователя')
     def get_user_answers_display(self, obj):
         """Отображение всех ответов пользователя"""
-        answers = obj.user_answers.select_related('question', 'selected_answer')
+        answers = answers_for_result(obj)
         html = '<table style="width:100%; border-collapse:collapse;"><tr><th>Вопрос</th><th>Ответ</th><th>Результат</th></tr>'
         for ua in answers:
             status = '✓ Верно' if ua.is_correct else '✗ Неверно'
@@ -433,45 +538,48 @@ class TestResultAdmin(admin.ModelAdmin):
         return True
 
 
-@admin.register(UserAnswer)
-class UserAnswerAdmin(admin.ModelAdmin):
-    """Админ для просмотра ответов пользователя"""
-    list_display = (
-        'get_participant_name',
-        'get_question_text',
-        'get_selected_answer',
-        'is_correct'
-    )
-    list_filter = ('is_correct', 'created_at', 'test_result__test')
-    search_fields = (
-        'test_result__participant__first_name',
-        'test_result__participant__last_name',
-        'question__text'
-    )
+# Ответы попыток хранятся в TestResult.answers_packed (миграция 0010
+# перенесла туда все строки UserAnswer) - отдельного списка ответов нет,
+# они показываются в карточке результата через answers_for_result.
+
+
+@admin.register(Submission)
+class SubmissionAdmin(admin.ModelAdmin):
+    """Админ для просмотра очереди проверки"""
+    list_display = ('id', 'test_result', 'status', 'attempts', 'created_at', 'claimed_at')
+    list_filter = ('status',)
+    list_select_related = ('test_result__participant', 'test_result__test')
     readonly_fields = (
         'test_result',
-        'question',
-        'selected_answer',
-        'is_correct',
-        'created_at',
-        'updated_at'
+        'payload',
+        'status',
+        'attempts',
+        'claimed_by',
+        'claimed_at',
+        'error',
+        'created_at'
     )
     
-    @admin.display(description='Участник')
-    def get_participant_name(self, obj):
-        return f"{obj.test_result.participant.first_name} {obj.test_result.participant.last_name}"
-    
-    @admin.display(description='Вопрос')
-    def get_question_text(self, obj):
-        text = obj.question.text
-        return text[:40] + '...' if len(text) > 40 else text
-    
-    @admin.display(description='Выбранный ответ')
-    def get_selected_answer(self, obj):
-        return obj.selected_answer.text if obj.selected_answer else 'Не ответил'
-    
     def has_add_permission(self, request):
         return False
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    """Админ для просмотра фоновых удалений"""
+    list_display = ('title', 'kind', 'status', 'deleted', 'total', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = (
+        'kind',
+        'object_id',
+        'title',
+        'status',
+        'total',
+        'deleted',
+        'error',
+        'created_at',
+        'finished_at'
+    )
     
-    def has_delete_permission(self, request, obj=None):
+    def has_add_permission(self, request):
         return False
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class TestPrConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'test_pr'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from django.core import checks
+        from .ratelimit import check_shared_cache
+        checks.register(check_shared_cache, checks.Tags.caches)
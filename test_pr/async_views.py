@@ -0,0 +1,232 @@
+"""
+Асинхронные версии views участника для запуска под ASGI (uvicorn).
+
+Пока запрос ждёт ответа БД, рабочий процесс продолжает обслуживать
+других участников. Подключаются через настройку ASYNC_PARTICIPANT_VIEWS.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.shortcuts import render, redirect
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.db import IntegrityError
+import json
+
+from .models import Question, Answer, Participant, TestResult
+from .sessions import aget_session_participant
+from .caching import get_test_sheet
+from .submissions import enqueue_submission, save_graded_result
+from .ratelimit import rate_limit
+from .timings import parse_timings, record_timings
+from .leaderboard import LEADERBOARD_CACHE_TIMEOUT, aget_leaderboard, aget_rank
+from .views import (
+    result_page_response, take_test_context, questions_page_response,
+    snapshot_response, timer_response,
+)
+
+
+async def _participant_missing_redirect(request, participant):
+    """Ответ на ошибку сохранения результата: участник удалён или тест уже пройден"""
+    if not await Participant.objects.filter(id=participant.id).aexists():
+        await request.session.aflush()
+        return redirect('register')
+    return redirect('test_list')
+
+
+@require_http_methods(["GET", "POST"])
+async def take_test(request, test_id):
+    """
+    Прохождение теста (асинхронная версия).
+    GET: Показывает все вопросы теста с возможностью навигации
+    POST: Сохраняет ответы и завершает тест
+    """
+    participant = await aget_session_participant(request)
+    if not participant:
+        return redirect('register')
+
+    # Лист теста строится один раз на всех участников и берётся из кэша
+    test = await sync_to_async(get_test_sheet)(test_id)
+    if not test:
+        return redirect('test_list')
+
+    # Проверяем, не прошёл ли уже этот тест
+    existing_result_id = await TestResult.objects.filter(
+        test_id=test_id,
+        participant_id=participant.id
+    ).values_list('id', flat=True).afirst()
+
+    if existing_result_id:
+        return redirect('test_result', result_id=existing_result_id)
+
+    # Участник из сессии помечен удалённым - ответы не принимаются
+    if request.method == 'POST' and not await Participant.objects.filter(id=participant.id).aexists():
+        await request.session.aflush()
+        return redirect('register')
+
+    if request.method == 'POST' and settings.GRADING_QUEUE:
+        # Ответы принимаются без проверки - результат проверит grade_worker
+        try:
+            result = await sync_to_async(enqueue_submission)(test_id, participant.id, request.POST)
+        except IntegrityError:
+            return await _participant_missing_redirect(request, participant)
+        return redirect('test_result', result_id=result.id)
+
+    if request.method == 'POST':
+        # Результат и гистограмма мест - одной транзакцией, как в синхронной версии
+        try:
+            result = await sync_to_async(save_graded_result)(test_id, participant.id, request.POST)
+        except IntegrityError:
+            return await _participant_missing_redirect(request, participant)
+        if result is None:
+            return redirect('test_list')
+
+        return redirect('test_result', result_id=result.id)
+
+    return render(request, 'test_pr/take_test.html', take_test_context(test, participant))
+
+
+@require_http_methods(["POST"])
+@rate_limit('save_answer')
+async def save_answer(request, test_id):
+    """
+    AJAX endpoint для сохранения ответа пользователя (асинхронная версия).
+    """
+    try:
+        data = json.loads(request.body)
+        question_id = data.get('question_id')
+        answer_id = data.get('answer_id')
+
+        question = await Question.objects.aget(id=question_id)
+
+        # Валидируем, что ответ принадлежит этому вопросу
+        if answer_id:
+            await Answer.objects.aget(id=answer_id, question=question)
+
+        return JsonResponse({'success': True})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+
+@require_http_methods(["GET"])
+async def test_result(request, result_id):
+    """
+    Отображение результатов прохождения теста (асинхронная версия).
+    """
+    participant = await aget_session_participant(request)
+    if not participant:
+        return redirect('register')
+
+    # Метаданные и страница берутся из кэша; при промахе страница
+    # рендерится шаблоном (синхронно), поэтому - в потоке целиком
+    return await sync_to_async(result_page_response)(request, result_id, participant)
+
+
+@require_http_methods(["GET"])
+async def get_test_timer(request, test_id):
+    """
+    API: Получить информацию о таймере теста (асинхронная версия).
+    """
+    test = await sync_to_async(get_test_sheet)(test_id)
+    if not test:
+        return JsonResponse({'success': False, 'error': 'Тест не найден'})
+
+    return timer_response(request, test)
+
+
+@require_http_methods(["GET"])
+async def get_test_questions(request, test_id):
+    """
+    API: Порция вопросов теста (асинхронная версия).
+    """
+    participant = await aget_session_participant(request)
+    if not participant:
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+
+    test = await sync_to_async(get_test_sheet)(test_id)
+    if not test:
+        return JsonResponse({'success': False, 'error': 'Тест не найден'})
+
+    return questions_page_response(request, test, participant)
+
+
+@require_http_methods(["GET"])
+async def get_test_snapshot(request, test_id):
+    """
+    API: Весь тест одним ответом для клиентов-киосков (асинхронная версия).
+    """
+    participant = await aget_session_participant(request)
+    if not participant:
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+
+    test = await sync_to_async(get_test_sheet)(test_id)
+    if not test:
+        return JsonResponse({'success': False, 'error': 'Тест не найден'})
+
+    # Снимок строится без БД, но сериализация и ожидание single_flight
+    # блокируют - в потоке, а не в цикле событий
+    return await sync_to_async(snapshot_response)(request, test, participant)
+
+
+@require_http_methods(["GET"])
+async def get_result_rank(request, result_id):
+    """
+    API: Место результата и таблица лидеров (асинхронная версия).
+    """
+    participant = await aget_session_participant(request)
+    if not participant:
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+
+    result = await TestResult.objects.filter(
+        id=result_id,
+        participant_id=participant.id,
+        is_completed=True
+    ).values('test_id', 'percentage').afirst()
+    if not result:
+        return JsonResponse({'success': False, 'error': 'Результат не найден'}, status=404)
+
+    response = JsonResponse({
+        'success': True,
+        **(await aget_rank(result['test_id'], result['percentage']) or {}),
+        'leaders': await aget_leaderboard(result['test_id']),
+    })
+    patch_cache_control(response, private=True, max_age=LEADERBOARD_CACHE_TIMEOUT)
+    return response
+
+
+@require_http_methods(["GET"])
+async def get_test_leaderboard(request, test_id):
+    """
+    API: Лучшие результаты теста (асинхронная версия).
+    """
+    if not await aget_session_participant(request):
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+
+    response = JsonResponse({'success': True, 'leaders': await aget_leaderboard(test_id)})
+    patch_cache_control(response, private=True, max_age=LEADERBOARD_CACHE_TIMEOUT)
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@rate_limit('record_question_timings')
+async def record_question_timings(request, test_id):
+    """
+    API: Пачка времени на вопросах со страницы прохождения (асинхронная версия).
+    """
+    if not await aget_session_participant(request):
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+
+    test = await sync_to_async(get_test_sheet)(test_id)
+    if not test:
+        return JsonResponse({'success': False, 'error': 'Тест не найден'}, status=404)
+
+    try:
+        rows = parse_timings(request.body, {question['id'] for question in test['questions']})
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    await sync_to_async(record_timings)(rows)
+    return HttpResponse(status=204)
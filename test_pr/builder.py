@@ -0,0 +1,267 @@
+"""
+Сохранение изменений конструктора тестов.
+
+При редактировании страница отправляет не весь тест, а только
+изменения: поля теста, которые правились, вопросы, которые
+правились или добавлены (целиком, с ответами), и ID удалённых
+вопросов. Изменённые вопросы и ответы обновляются на месте
+(bulk_update), новые вставляются одним bulk_create на таблицу,
+поэтому сохранение стоит O(изменений), а не O(размер теста), и
+ответы участников на неизменённые варианты сохраняются.
+
+Одновременное редактирование - оптимистичная блокировка по
+Test.version: изменения принимаются, только если версия теста
+не изменилась с открытия страницы. Проверка и увеличение версии -
+один UPDATE ... WHERE version = ожидаемая, первым в транзакции,
+поэтому из двух одновременных сохранений второе получает
+VersionConflict, а не перезаписывает первое.
+"""
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import invalidate_test
+from .db import retry_on_locked
+from .dedup import schedule_signature
+from .forms import TestForm
+from .models import Answer, Question, Test
+from .ordering import ORDER_STEP, compact
+from .search import index_questions
+
+
+class VersionConflict(Exception):
+    """Тест сохранён другим редактором после открытия страницы"""
+
+    def __init__(self, version):
+        super().__init__('Тест изменён другим редактором, обновите страницу')
+        self.version = version
+
+
+def _int(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise TypeError(value)
+
+
+def _int_or_none(value):
+    return _int(value) if value is not None else None
+
+
+def _parse_question(data, index):
+    """Вопрос из изменений; ValueError с сообщением для редактора"""
+    number = data.get('number', index + 1)
+    text = str(data.get('text', '')).strip()
+    if not text:
+        raise ValueError(f'Текст вопроса #{number} пуст')
+
+    answers = data.get('answers', [])
+    if not isinstance(answers, list) or len(answers) < 2:
+        raise ValueError(f'Вопрос #{number} должен иметь минимум 2 варианта ответа')
+
+    parsed_answers = []
+    for a_index, answer in enumerate(answers):
+        answer_text = str(answer.get('text', '')).strip()
+        if not answer_text:
+            raise ValueError(f'Текст ответа в вопросе #{number} пуст')
+        parsed_answers.append({
+            'id': _int_or_none(answer.get('id')),
+            'text': answer_text,
+            'is_correct': bool(answer.get('is_correct', False)),
+            'order': _int(answer.get('order', a_index)),
+        })
+
+    if not any(answer['is_correct'] for answer in parsed_answers):
+        raise ValueError(f'Вопрос #{number} должен иметь хотя бы один правильный ответ')
+
+    return {
+        'id': _int_or_none(data.get('id')),
+        'key': str(data.get('key', index)),
+        'after_id': _int_or_none(data.get('after_id')),
+        'text': text,
+        'answers': parsed_answers,
+    }
+
+
+def parse_changes(data):
+    """
+    Изменения со страницы: {"version", "test": {поле: значение},
+    "questions": [вопрос с ответами; без id - новый], "deleted": [id]}.
+    ValueError - если изменения некорректны.
+    """
+    try:
+        changes = {
+            'version': _int(data['version']),
+            'test': dict(data.get('test') or {}),
+            'questions': [
+                _parse_question(question, index)
+                for index, question in enumerate(data.get('questions') or [])
+            ],
+            'deleted': [_int(question_id) for question_id in data.get('deleted') or []],
+        }
+    except (TypeError, KeyError, AttributeError):
+        raise ValueError('Некорректные данные')
+
+    unknown = set(changes['test']) - set(TestForm.Meta.fields)
+    if unknown:
+        raise ValueError(f'Неизвестные поля теста: {", ".join(sorted(unknown))}')
+    return changes
+
+
+def clean_test_fields(test, fields):
+    """
+    Проверить изменённые поля теста формой конструктора.
+    Возвращает (очищенные значения, ошибки формы или None).
+    """
+    if not fields:
+        return {}, None
+    # Без instance: форма не должна менять тест до проверки версии
+    current = TestForm(instance=test)
+    form = TestForm({**{name: current[name].value() for name in current.fields}, **fields})
+    if not form.is_valid():
+        return {}, form.errors
+    return {name: form.cleaned_data[name] for name in fields}, None
+
+
+def _update_questions(test_id, questions):
+    """Обновить изменённые вопросы и их ответы на месте"""
+    if not questions:
+        return
+    question_ids = [question['id'] for question in questions]
+    found = set(Question.objects.filter(test_id=test_id, id__in=question_ids).values_list('id', flat=True))
+    missing = set(question_ids) - found
+    if missing:
+        raise Question.DoesNotExist(f'Вопрос не найден в тесте: {min(missing)}')
+
+    owners = dict(Answer.objects.filter(question_id__in=question_ids).values_list('id', 'question_id'))
+    changed_answers = []
+    new_answers = []
+    kept = set()
+    for question in questions:
+        for answer in question['answers']:
+            row = Answer(
+                question_id=question['id'], text=answer['text'],
+                is_correct=answer['is_correct'], order=answer['order']
+            )
+            if answer['id'] is None:
+                new_answers.append(row)
+                continue
+            if owners.get(answer['id']) != question['id']:
+                raise Answer.DoesNotExist(f'Ответ не найден в вопросе: {answer["id"]}')
+            row.id = answer['id']
+            kept.add(answer['id'])
+            changed_answers.append(row)
+
+    Question.objects.bulk_update(
+        [Question(id=question['id'], text=question['text']) for question in questions], ['text']
+    )
+    # Удалённые варианты - через ORM: ответы участников на них теряют ссылку (SET_NULL)
+    Answer.objects.filter(id__in=set(owners) - kept).delete()
+    Answer.objects.bulk_update(changed_answers, ['text', 'is_correct', 'order'])
+    Answer.objects.bulk_create(new_answers)
+
+
+def _place(test_id, created):
+    """
+    Поставить новые вопросы после их соседей (after_id, None - начало теста).
+    Новые вопросы вставлены в конец теста; если соседи не там, вопросы
+    получают номера из промежутка между соседями, а когда места
+    не хватает - тест уплотняется, как при перетаскивании.
+    """
+    rows = list(Question.objects.filter(test_id=test_id).order_by('order', 'id').values_list('id', 'order'))
+    orders = dict(rows)
+    new_ids = {question.id for question, _ in created}
+    saved = [question_id for question_id, _ in rows if question_id not in new_ids]
+
+    groups = {}
+    for question, after_id in created:
+        # Сосед мог быть удалён другим изменением - тогда вопрос в конце
+        if after_id is None or (after_id in orders and after_id not in new_ids):
+            anchor = after_id
+        else:
+            anchor = saved[-1] if saved else None
+        groups.setdefault(anchor, []).append(question.id)
+
+    arranged = list(groups.get(None, []))
+    for question_id in saved:
+        arranged.append(question_id)
+        arranged.extend(groups.get(question_id, []))
+    if arranged == [question_id for question_id, _ in rows]:
+        return
+
+    placed = []
+    for anchor, question_ids in groups.items():
+        position = saved.index(anchor) + 1 if anchor is not None else 0
+        if position == len(saved):
+            continue
+        low = orders[anchor] if anchor is not None else -1
+        high = orders[saved[position]]
+        count = len(question_ids)
+        if high - low <= count:
+            compact(arranged, list(orders.values()))
+            return
+        placed.extend(
+            Question(id=question_id, order=low + (high - low) * (i + 1) // (count + 1))
+            for i, question_id in enumerate(question_ids)
+        )
+    Question.objects.bulk_update(placed, ['order'])
+
+
+def _create_questions(test_id, questions):
+    """Вставить новые вопросы (в конец теста) и их ответы. Возвращает {key: id}"""
+    if not questions:
+        return {}
+    top = Question.objects.filter(test_id=test_id).order_by('-order').values_list('order', flat=True).first()
+    start = top + ORDER_STEP if top is not None else 0
+    created = Question.objects.bulk_create([
+        Question(test_id=test_id, text=question['text'], order=start + i * ORDER_STEP)
+        for i, question in enumerate(questions)
+    ])
+    Answer.objects.bulk_create([
+        Answer(question_id=row.id, text=answer['text'], is_correct=answer['is_correct'], order=answer['order'])
+        for row, question in zip(created, questions)
+        for answer in question['answers']
+    ])
+    _place(test_id, [(row, question['after_id']) for row, question in zip(created, questions)])
+    return {question['key']: row.id for row, question in zip(created, questions)}
+
+
+@retry_on_locked
+@transaction.atomic
+def apply_changes(test, changes, fields):
+    """
+    Применить изменения конструктора (parse_changes) к тесту;
+    fields - очищенные поля теста (clean_test_fields).
+    Возвращает (новая версия, {key нового вопроса: id}).
+    VersionConflict - если тест уже сохранён другим редактором.
+    """
+    # Проверка версии - первым запросом: дальше тест заблокирован до конца транзакции
+    saved = Test.objects.filter(id=test.id, version=changes['version']).update(
+        version=F('version') + 1, updated_at=timezone.now(), **fields
+    )
+    if not saved:
+        raise VersionConflict(Test.objects.filter(id=test.id).values_list('version', flat=True).first())
+
+    if changes['deleted']:
+        Question.objects.filter(test_id=test.id, id__in=changes['deleted']).delete()
+
+    updated = [question for question in changes['questions'] if question['id'] is not None]
+    added = [question for question in changes['questions'] if question['id'] is None]
+    _update_questions(test.id, updated)
+    created = _create_questions(test.id, added)
+
+    if not Question.objects.filter(test_id=test.id).exists():
+        raise ValueError('Добавьте хотя бы один вопрос')
+
+    # bulk-операции не вызывают сигналы: индекс, подписи и кэш - явно
+    question_ids = [question['id'] for question in updated] + list(created.values())
+    if 'title' in fields and fields['title'] != test.title:
+        index_questions('q.test_id = %s', [test.id])
+    elif question_ids:
+        index_questions('q.id IN (%s)' % ', '.join(['%s'] * len(question_ids)), question_ids)
+    for question_id in question_ids:
+        schedule_signature(question_id)
+    invalidate_test(test.id)
+
+    return changes['version'] + 1, created
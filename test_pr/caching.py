@@ -0,0 +1,203 @@
+"""
+Кэширование данных теста для страниц участника.
+
+Лист теста (вопросы и варианты без отметки правильности) и ключ ответов
+строятся один раз на всех участников, открывших тест одновременно,
+и сбрасываются при изменении теста, вопросов или ответов.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Test, Question, Answer, TestResult
+from .singleflight import single_flight
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def test_sheet_key(test_id):
+    return f'test:{test_id}:sheet'
+
+
+def answer_key_key(test_id):
+    return f'test:{test_id}:answer_key'
+
+
+def build_test_sheet(test_id):
+    """
+    Лист теста для take_test.
+    Возвращает False, если тест не найден или неактивен.
+    """
+    test = Test.objects.filter(id=test_id, status='active').first()
+    if not test:
+        return False
+
+    questions = []
+    for question in test.questions.prefetch_related('answers').order_by('order'):
+        questions.append({
+            'id': question.id,
+            'text': question.text,
+            'answers': [
+                {'id': answer.id, 'text': answer.text}
+                for answer in question.answers.all()
+            ],
+        })
+
+    return {
+        'id': test.id,
+        'title': test.title,
+        'description': test.description,
+        'timer_minutes': test.timer_minutes,
+        'pool_size': test.pool_size,
+        'show_answers': test.show_answers,
+        'show_result': test.show_result,
+        'version': int(test.updated_at.timestamp() * 1000000),
+        'questions': questions,
+    }
+
+
+def build_answer_key(test_id):
+    """
+    Ключ ответов для проверки теста: ID вопросов по порядку,
+    словарь {answer_id: (question_id, is_correct)} и размер набора вопросов попытки.
+    Статус теста не проверяется: отправки из очереди проверяются
+    и после деактивации теста. Возвращает False, если тест не найден.
+    """
+    test = Test.objects.filter(id=test_id).values('pool_size').first()
+    if not test:
+        return False
+
+    question_ids = list(
+        Question.objects.filter(test_id=test_id).order_by('order').values_list('id', flat=True)
+    )
+    answers = {
+        answer_id: (question_id, is_correct)
+        for answer_id, question_id, is_correct in Answer.objects.filter(
+            question__test_id=test_id
+        ).values_list('id', 'question_id', 'is_correct')
+    }
+
+    return {
+        'question_ids': question_ids,
+        'answers': answers,
+        'pool_size': test['pool_size'],
+    }
+
+
+def get_test_sheet(test_id):
+    """Лист активного теста из кэша (None, если тест недоступен)"""
+    sheet = single_flight(
+        test_sheet_key(test_id),
+        lambda: build_test_sheet(test_id),
+        settings.TEST_CACHE_TIMEOUT
+    )
+    return sheet or None
+
+
+def get_answer_key(test_id):
+    """Ключ ответов теста из кэша (None, если тест не найден)"""
+    answer_key = single_flight(
+        answer_key_key(test_id),
+        lambda: build_answer_key(test_id),
+        settings.TEST_CACHE_TIMEOUT
+    )
+    return answer_key or None
+
+
+def get_catalog_version():
+    """
+    Версия каталога тестов: меняется при создании, изменении
+    и удалении любого теста (и его вопросов или ответов).
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        stats = Test.objects.aggregate(count=Count('id'), changed=Max('updated_at'))
+        changed = int(stats['changed'].timestamp() * 1000000) if stats['changed'] else 0
+        version = f"{stats['count']}-{changed}"
+        cache.set(CATALOG_VERSION_KEY, version, settings.TEST_CACHE_TIMEOUT)
+    return version
+
+
+def invalidate_test(test_id):
+    """Сбросить кэш теста и версию каталога после фиксации транзакции"""
+    transaction.on_commit(
+        lambda: cache.delete_many([
+            test_sheet_key(test_id),
+            answer_key_key(test_id),
+            CATALOG_VERSION_KEY,
+        ])
+    )
+
+
+def touch_test(test_id):
+    """Отметить тест изменённым (вопросы или ответы) и сбросить его кэш"""
+    Test.objects.filter(id=test_id).update(updated_at=timezone.now())
+    invalidate_test(test_id)
+
+
+def touch_tests(test_ids):
+    """touch_test для нескольких тестов одним UPDATE (массовые изменения в обход сигналов)"""
+    test_ids = list(test_ids)
+    Test.objects.filter(id__in=test_ids).update(updated_at=timezone.now())
+    for test_id in test_ids:
+        invalidate_test(test_id)
+
+
+def result_meta_key(result_id):
+    return f'result:{result_id}:meta'
+
+
+def result_page_key(result_id):
+    return f'result:{result_id}:page'
+
+
+def get_result_meta(result_id):
+    """
+    Данные для проверки доступа и условного запроса к странице результата:
+    участник, готовность, ETag и время изменения.
+    Кэшируются только проверенные результаты - они больше не меняются.
+    """
+    meta = cache.get(result_meta_key(result_id))
+    if meta is not None:
+        return meta
+
+    row = TestResult.objects.filter(id=result_id).values(
+        'participant_id', 'is_completed', 'correct_answers', 'completed_at'
+    ).first()
+    if not row:
+        return None
+
+    last_modified = int(row['completed_at'].timestamp())
+    meta = {
+        'participant_id': row['participant_id'],
+        'is_completed': row['is_completed'],
+        'etag': f'"result-{result_id}-{last_modified}-{row["correct_answers"]}"',
+        'last_modified': last_modified,
+    }
+    if meta['is_completed']:
+        cache.set(result_meta_key(result_id), meta, settings.RESULT_CACHE_TIMEOUT)
+    return meta
+
+
+def invalidate_result(result_id):
+    """Сбросить кэш страницы результата (после перепроверки или удаления)"""
+    transaction.on_commit(
+        lambda: cache.delete_many([result_meta_key(result_id), result_page_key(result_id)])
+    )
+
+
+def invalidate_results(result_ids):
+    """Сбросить кэш страниц нескольких результатов одним запросом к кэшу"""
+    result_ids = list(result_ids)
+    if not result_ids:
+        return
+    transaction.on_commit(
+        lambda: cache.delete_many(
+            [result_meta_key(result_id) for result_id in result_ids]
+            + [result_page_key(result_id) for result_id in result_ids]
+        )
+    )
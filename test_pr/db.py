@@ -0,0 +1,42 @@
+"""
+Повтор записи при блокировке SQLite.
+
+Даже с WAL и busy timeout одновременные записи из нескольких процессов
+могут получить "database is locked". Такие операции повторяются
+ограниченное число раз с растущей паузой.
+"""
+
+import functools
+import random
+import time
+
+from django.db import connection, OperationalError
+
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.05
+
+
+def is_locked_error(error):
+    return 'database is locked' in str(error) or 'database table is locked' in str(error)
+
+
+def retry_on_locked(func):
+    """
+    Повторить функцию записи, если SQLite занята.
+    Внутри внешней транзакции повтор невозможен, ошибка передаётся дальше.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(RETRY_ATTEMPTS):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if (
+                    not is_locked_error(e)
+                    or connection.in_atomic_block
+                    or attempt == RETRY_ATTEMPTS - 1
+                ):
+                    raise
+                # Пауза со случайной добавкой, чтобы процессы не повторяли запись одновременно
+                time.sleep(RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random()))
+    return wrapper
@@ -0,0 +1,277 @@
+"""
+Поиск почти одинаковых вопросов (MinHash + LSH).
+
+Вопрос (текст и варианты ответов) разбивается на шинглы - подстроки
+по SHINGLE_SIZE символов. MinHash-подпись из NUM_PERM минимумов
+хэшей приближает коэффициент Жаккара двух вопросов долей совпадающих
+позиций. Подпись режется на BANDS полос по ROWS значений; хэши полос
+хранятся в QuestionBand с индексом (band, bucket). Кандидаты
+в дубликаты - вопросы с общим хэшем хотя бы одной полосы, поэтому
+поиск кластеров - один проход по полосам, а не сравнение всех пар.
+
+Подписи пересчитываются после сохранения вопросов и ответов
+(после фиксации транзакции). Вопросы без подписи (созданные в обход
+сигналов) досчитывает команда find_duplicates.
+"""
+
+import hashlib
+import random
+import re
+import struct
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Question, Answer, QuestionSignature, QuestionBand
+
+SHINGLE_SIZE = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Порог похожести по умолчанию: при 16 полосах по 4 значения вопросы
+# с похожестью 0.8 становятся кандидатами с вероятностью > 99.9%
+DEFAULT_THRESHOLD = 0.8
+
+BATCH_SIZE = 500
+
+# С каким числом вопросов корзины полосы сравнивается каждый следующий
+MAX_BUCKET_MEMBERS = 50
+
+# Сколько кластеров показывать на странице админки
+CLUSTERS_SHOWN = 100
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_SIGNATURE_FORMAT = f'<{NUM_PERM}I'
+
+# Коэффициенты хэш-функций (a * x + b) mod p; фиксированное зерно -
+# подписи, посчитанные разными процессами, сравнимы
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_pending = threading.local()
+
+
+def _normalize(text):
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+
+def question_document(text, answers):
+    """Текст для сравнения: вопрос и варианты ответов (порядок вариантов не важен)"""
+    return ' '.join([_normalize(text)] + sorted(_normalize(answer) for answer in answers))
+
+
+def shingles(document):
+    if len(document) <= SHINGLE_SIZE:
+        return {document}
+    return {document[i:i + SHINGLE_SIZE] for i in range(len(document) - SHINGLE_SIZE + 1)}
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=4).digest(), 'little')
+
+
+def minhash(document):
+    hashes = [_hash(shingle) for shingle in shingles(document)]
+    return [
+        min(((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH for x in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def band_buckets(signature):
+    """Хэши полос подписи (знаковые 64-битные - для BigIntegerField)"""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                struct.pack(f'<{ROWS}I', *signature[band * ROWS:(band + 1) * ROWS]),
+                digest_size=8
+            ).digest(),
+            'little',
+            signed=True
+        )
+        for band in range(BANDS)
+    ]
+
+
+def pack_signature(signature):
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack_signature(data):
+    return struct.unpack(_SIGNATURE_FORMAT, bytes(data))
+
+
+def similarity(first, second):
+    """Оценка коэффициента Жаккара по двум подписям"""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def update_signatures(question_ids):
+    """Пересчитать подписи и полосы вопросов (удалённые вопросы пропускаются)"""
+    question_ids = list(question_ids)
+    texts = dict(Question.objects.filter(id__in=question_ids).values_list('id', 'text'))
+    answers = defaultdict(list)
+    for question_id, text in Answer.objects.filter(question_id__in=texts).values_list('question_id', 'text'):
+        answers[question_id].append(text)
+
+    signatures = []
+    bands = []
+    for question_id, text in texts.items():
+        signature = minhash(question_document(text, answers[question_id]))
+        signatures.append(QuestionSignature(question_id=question_id, signature=pack_signature(signature)))
+        bands.extend(
+            QuestionBand(question_id=question_id, band=band, bucket=bucket)
+            for band, bucket in enumerate(band_buckets(signature))
+        )
+
+    with transaction.atomic():
+        QuestionBand.objects.filter(question_id__in=question_ids).delete()
+        QuestionSignature.objects.bulk_create(
+            signatures,
+            update_conflicts=True,
+            unique_fields=['question'],
+            update_fields=['signature', 'updated_at'],
+        )
+        QuestionBand.objects.bulk_create(bands, batch_size=BATCH_SIZE)
+
+
+def _flush_pending():
+    question_ids = getattr(_pending, 'question_ids', None)
+    if not question_ids:
+        return
+    _pending.question_ids = set()
+    update_signatures(question_ids)
+
+
+def schedule_signature(question_id):
+    """
+    Пересчитать подпись вопроса после фиксации транзакции.
+    Сохранения вопроса и всех его ответов в одной транзакции
+    дают один пересчёт.
+    """
+    if not hasattr(_pending, 'question_ids'):
+        _pending.question_ids = set()
+    _pending.question_ids.add(question_id)
+    transaction.on_commit(_flush_pending)
+
+
+def index_missing(batch_size=BATCH_SIZE):
+    """Посчитать подписи вопросов, у которых их нет. Возвращает количество"""
+    count = 0
+    while True:
+        question_ids = list(
+            Question.objects.filter(signature__isnull=True).values_list('id', flat=True)[:batch_size]
+        )
+        if not question_ids:
+            return count
+        update_signatures(question_ids)
+        count += len(question_ids)
+
+
+def rebuild_signatures(batch_size=BATCH_SIZE):
+    """Пересчитать подписи всех вопросов"""
+    QuestionSignature.objects.all().delete()
+    return index_missing(batch_size)
+
+
+def _candidate_pairs():
+    """
+    Пары вопросов с общим хэшем полосы: один проход по индексу
+    (band, bucket). Каждый вопрос корзины сравнивается со всеми
+    предыдущими - похожесть не транзитивна, и сравнение только
+    с первым теряло пары, в которых первый вопрос ниже порога
+    с обоими. В очень большой корзине (общая шаблонная полоса)
+    сравнение идёт с первыми MAX_BUCKET_MEMBERS вопросами.
+    """
+    pairs = set()
+    current = None
+    members = []
+    rows = QuestionBand.objects.order_by('band', 'bucket', 'question_id').values_list(
+        'band', 'bucket', 'question_id'
+    ).iterator(chunk_size=5000)
+    for band, bucket, question_id in rows:
+        if (band, bucket) != current:
+            current = (band, bucket)
+            members = []
+        pairs.update((member, question_id) for member in members)
+        if len(members) < MAX_BUCKET_MEMBERS:
+            members.append(question_id)
+    return pairs
+
+
+def _load_signatures(question_ids):
+    question_ids = list(question_ids)
+    signatures = {}
+    for start in range(0, len(question_ids), BATCH_SIZE):
+        chunk = question_ids[start:start + BATCH_SIZE]
+        for question_id, data in QuestionSignature.objects.filter(question_id__in=chunk).values_list(
+            'question_id', 'signature'
+        ):
+            signatures[question_id] = unpack_signature(data)
+    return signatures
+
+
+def find_clusters(threshold=DEFAULT_THRESHOLD):
+    """
+    Кластеры почти одинаковых вопросов: списки вопросов (id, text,
+    test_id, test_title) с наименьшей похожестью связей кластера,
+    крупные кластеры первыми.
+    """
+    pairs = _candidate_pairs()
+    signatures = _load_signatures({question_id for pair in pairs for question_id in pair})
+
+    parent = {}
+
+    def root(question_id):
+        parent.setdefault(question_id, question_id)
+        while parent[question_id] != question_id:
+            parent[question_id] = parent[parent[question_id]]
+            question_id = parent[question_id]
+        return question_id
+
+    links = []
+    for first, second in pairs:
+        if first not in signatures or second not in signatures:
+            continue
+        score = similarity(signatures[first], signatures[second])
+        if score >= threshold:
+            links.append((first, score))
+            parent[root(second)] = root(first)
+
+    members = defaultdict(list)
+    for question_id in parent:
+        members[root(question_id)].append(question_id)
+
+    lowest = {}
+    for question_id, score in links:
+        key = root(question_id)
+        lowest[key] = min(lowest.get(key, 1.0), score)
+
+    questions = {}
+    clustered = [question_id for group in members.values() if len(group) > 1 for question_id in group]
+    for start in range(0, len(clustered), BATCH_SIZE):
+        for row in Question.objects.filter(id__in=clustered[start:start + BATCH_SIZE]).values(
+            'id', 'text', 'test_id', 'test__title'
+        ):
+            questions[row['id']] = {
+                'id': row['id'],
+                'text': row['text'],
+                'test_id': row['test_id'],
+                'test_title': row['test__title'],
+            }
+
+    clusters = []
+    for key, group in members.items():
+        cluster = [questions[question_id] for question_id in sorted(group) if question_id in questions]
+        if len(cluster) > 1:
+            clusters.append({'similarity': lowest.get(key, 1.0), 'questions': cluster})
+    clusters.sort(key=lambda cluster: (-len(cluster['questions']), cluster['questions'][0]['id']))
+    return clusters
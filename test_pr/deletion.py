@@ -0,0 +1,160 @@
+"""
+Фоновое удаление тестов и участников.
+
+Каскадное delete() популярного теста собирает в памяти все его
+результаты и ответы участников и удаляет их одной долгой транзакцией.
+Вместо этого объект сразу помечается удалённым (deleted_at - менеджер
+objects его больше не видит) и ставится задача DeletionJob. Команда
+`manage.py purge_deleted` удаляет зависимые строки пачками по
+первичному ключу через _raw_delete, без сбора объектов и сигналов:
+то, что делали сигналы (гистограмма, кэш результатов, поисковый
+индекс), делается здесь явно.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import result_meta_key, result_page_key
+from .db import retry_on_locked
+from .leaderboard import forget_scores
+from .models import (
+    Test, Question, Answer, Participant, TestResult, UserAnswer, Submission,
+    ScoreBucket, HourlyResultStat, DailyResultStat, QuestionSignature, QuestionBand,
+    QuestionTiming, QuestionTimingStat, DeletionJob,
+)
+from .search import QUESTION_INDEX, ANSWER_INDEX, unindex
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _drop_result_pages(result_ids):
+    """Перед удалением результатов теста: сбросить кэш их страниц (гистограмма удаляется целиком)"""
+    cache.delete_many(
+        [result_meta_key(result_id) for result_id in result_ids]
+        + [result_page_key(result_id) for result_id in result_ids]
+    )
+
+
+def _forget_results(result_ids):
+    """Перед удалением результатов участника: ещё и убрать их из гистограмм тестов"""
+    forget_scores(list(
+        TestResult.objects.filter(id__in=result_ids, is_completed=True).values_list('test_id', 'percentage')
+    ))
+    _drop_result_pages(result_ids)
+
+
+def _steps(job):
+    """
+    Что удалять, в порядке от зависимых строк к объекту:
+    (запрос строк, действие перед удалением пачки или None)
+    """
+    object_id = job.object_id
+
+    if job.kind == DeletionJob.KIND_TEST:
+        return [
+            (UserAnswer.objects.filter(test_result__test_id=object_id), None),
+            (Submission.objects.filter(test_result__test_id=object_id), None),
+            (TestResult.objects.filter(test_id=object_id), _drop_result_pages),
+            (ScoreBucket.objects.filter(test_id=object_id), None),
+            (HourlyResultStat.objects.filter(test_id=object_id), None),
+            (DailyResultStat.objects.filter(test_id=object_id), None),
+            (QuestionBand.objects.filter(question__test_id=object_id), None),
+            (QuestionSignature.objects.filter(question__test_id=object_id), None),
+            (QuestionTiming.objects.filter(question__test_id=object_id), None),
+            (QuestionTimingStat.objects.filter(question__test_id=object_id), None),
+            (Answer.objects.filter(question__test_id=object_id), lambda ids: unindex(ANSWER_INDEX, ids)),
+            (Question.objects.filter(test_id=object_id), lambda ids: unindex(QUESTION_INDEX, ids)),
+            (Test.all_objects.filter(id=object_id), None),
+        ]
+
+    return [
+        (UserAnswer.objects.filter(test_result__participant_id=object_id), None),
+        (Submission.objects.filter(test_result__participant_id=object_id), None),
+        (TestResult.objects.filter(participant_id=object_id), _forget_results),
+        (Participant.all_objects.filter(id=object_id), None),
+    ]
+
+
+def schedule_deletion(obj):
+    """Пометить тест или участника удалённым и поставить задачу на удаление данных"""
+    kind = DeletionJob.KIND_TEST if isinstance(obj, Test) else DeletionJob.KIND_PARTICIPANT
+    with transaction.atomic():
+        obj.deleted_at = timezone.now()
+        # save() - чтобы сигналы сбросили кэш теста и версию каталога
+        obj.save(update_fields=['deleted_at'])
+        return DeletionJob.objects.create(kind=kind, object_id=obj.pk, title=str(obj)[:255])
+
+
+@retry_on_locked
+def purge_batch(job, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Удалить следующую пачку строк задачи (не больше batch_size).
+    Возвращает количество удалённых строк; 0 - задача выполнена.
+    """
+    with transaction.atomic():
+        steps = _steps(job)
+        # Строка объекта блокируется до проверки шагов: результат, который
+        # сохраняется одновременно, ждёт конца пачки. Шаги проверяются
+        # заново в каждой пачке, поэтому строки, добавленные после прохода
+        # своего шага, удаляются раньше самого объекта
+        list(steps[-1][0].select_for_update().values_list('pk', flat=True))
+        for queryset, before_delete in steps:
+            ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                continue
+            if before_delete:
+                before_delete(ids)
+            model = queryset.model
+            model._base_manager.filter(pk__in=ids)._raw_delete(model._base_manager.db)
+
+            job.deleted += len(ids)
+            job.save(update_fields=['deleted'])
+            return len(ids)
+
+        job.status = DeletionJob.STATUS_DONE
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at'])
+        return 0
+
+
+def start_job(job):
+    """Посчитать объём задачи и отметить её выполняемой"""
+    job.total = job.deleted + sum(queryset.count() for queryset, _ in _steps(job))
+    job.status = DeletionJob.STATUS_RUNNING
+    job.save(update_fields=['total', 'status'])
+
+
+def next_job():
+    """Следующая задача; прерванные (running) продолжаются первыми"""
+    return DeletionJob.objects.filter(
+        status__in=[DeletionJob.STATUS_PENDING, DeletionJob.STATUS_RUNNING]
+    ).order_by('-status', 'id').first()
+
+
+def active_jobs():
+    """Задачи для отображения прогресса в конструкторе"""
+    return list(DeletionJob.objects.exclude(status=DeletionJob.STATUS_DONE).order_by('id'))
+
+
+class BackgroundDeletionAdminMixin:
+    """
+    Удаление в ModelAdmin через фоновую задачу: без сбора
+    связанных объектов на странице подтверждения и без каскада в запросе
+    """
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            set(),
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        schedule_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            schedule_deletion(obj)
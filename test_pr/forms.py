@@ -6,7 +6,7 @@ class TestForm(forms.ModelForm):
     """Форма для создания/редактирования теста"""
     class Meta:
         model = Test
-        fields = ['title', 'description', 'status', 'timer_minutes', 'show_answers', 'show_result']
+        fields = ['title', 'description', 'status', 'timer_minutes', 'pool_size', 'show_answers', 'show_result']
         widgets = {
             'title': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -22,6 +22,10 @@ class TestForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Оставьте пусто для неограниченного времени'
             }),
+            'pool_size': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'placeholder': 'Оставьте пусто, чтобы задавать все вопросы'
+            }),
             'show_answers': forms.Select(attrs={'class': 'form-control'}),
             'show_result': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
@@ -0,0 +1,52 @@
+"""
+Подсчёт результатов теста.
+
+Функции модуля не обращаются к БД: вопросы и варианты ответов передаются
+из синхронных и асинхронных views, которые загружают их своими средствами.
+"""
+
+
+def parse_answer_id(value):
+    """Преобразовать ID ответа из формы в число (None, если ответа нет)"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def grade_answers(question_ids, answers, submitted):
+    """
+    Проверить ответы участника.
+
+    question_ids - ID вопросов теста в порядке отображения
+    answers - словарь {answer_id: (question_id, is_correct)}
+    submitted - данные формы вида {'answer_<question_id>': answer_id}
+
+    Возвращает список кортежей (question_id, answer_id, is_correct)
+    и количество правильных ответов.
+    """
+    graded = []
+    correct_count = 0
+
+    for question_id in question_ids:
+        answer_id = parse_answer_id(submitted.get(f'answer_{question_id}'))
+        answer = answers.get(answer_id)
+
+        # Ответ должен принадлежать этому вопросу
+        if answer is None or answer[0] != question_id:
+            graded.append((question_id, None, False))
+            continue
+
+        is_correct = answer[1]
+        if is_correct:
+            correct_count += 1
+        graded.append((question_id, answer_id, is_correct))
+
+    return graded, correct_count
+
+
+def calculate_percentage(correct_answers, total_questions):
+    """Процент правильных ответов"""
+    if total_questions <= 0:
+        return 0
+    return correct_answers / total_questions * 100
@@ -0,0 +1,35 @@
+"""
+Условные HTTP-запросы (ETag / Last-Modified).
+"""
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def set_validators(response, etag=None, last_modified=None, **cache_control):
+    """Проставить ETag, Last-Modified и Cache-Control"""
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    if cache_control:
+        patch_cache_control(response, **cache_control)
+    return response
+
+
+def not_modified_response(request, etag=None, last_modified=None, **cache_control):
+    """
+    Ответ 304, если у клиента актуальная версия (If-None-Match /
+    If-Modified-Since), иначе None.
+    """
+    headers = set_validators(HttpResponse(), etag, last_modified, **cache_control)
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+        response=headers
+    )
+    if response is headers:
+        return None
+    return response
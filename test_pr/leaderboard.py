@@ -0,0 +1,131 @@
+"""
+Место участника и таблица лидеров теста.
+
+Место и процентиль считаются по гистограмме результатов (ScoreBucket):
+в ней не больше 1001 строки на тест, сколько бы результатов ни было.
+Гистограмма обновляется в той же транзакции, что и проверенный результат.
+Таблица лидеров читается по индексу (test, -percentage, completed_at).
+"""
+
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+
+from .models import ScoreBucket, TestResult
+
+LEADERBOARD_SIZE = 10
+LEADERBOARD_CACHE_TIMEOUT = 30
+
+
+def score_bucket(percentage):
+    """Интервал гистограммы: процент с точностью до десятой (0-1000)"""
+    return round(percentage * 10)
+
+
+def _change_buckets(scores, delta):
+    counts = Counter((test_id, score_bucket(percentage)) for test_id, percentage in scores)
+
+    for (test_id, score), count in sorted(counts.items()):
+        updated = ScoreBucket.objects.filter(test_id=test_id, score=score).update(
+            count=F('count') + count * delta
+        )
+        if updated or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                ScoreBucket.objects.create(test_id=test_id, score=score, count=count)
+        except IntegrityError:
+            # Интервал одновременно создал другой процесс
+            ScoreBucket.objects.filter(test_id=test_id, score=score).update(count=F('count') + count)
+
+
+def record_scores(scores):
+    """Учесть проверенные результаты: scores - пары (test_id, percentage)"""
+    _change_buckets(scores, 1)
+
+
+def forget_scores(scores):
+    """Убрать удалённые результаты из гистограммы"""
+    _change_buckets(scores, -1)
+
+
+def _rank_query(test_id, percentage):
+    score = score_bucket(percentage)
+    return ScoreBucket.objects.filter(test_id=test_id), {
+        'total': Sum('count'),
+        'above': Sum('count', filter=Q(score__gt=score)),
+    }
+
+
+def _rank(stats):
+    total = stats['total'] or 0
+    above = stats['above'] or 0
+    if not total:
+        return None
+
+    return {
+        'rank': above + 1,
+        'total': total,
+        'percentile': round((total - above) * 100 / total, 1),
+    }
+
+
+def get_rank(test_id, percentage):
+    """
+    Место результата в тесте (одинаковые баллы делят место),
+    число результатов и процентиль - доля результатов не выше этого.
+    """
+    buckets, aggregates = _rank_query(test_id, percentage)
+    return _rank(buckets.aggregate(**aggregates))
+
+
+async def aget_rank(test_id, percentage):
+    """Асинхронная версия get_rank"""
+    buckets, aggregates = _rank_query(test_id, percentage)
+    return _rank(await buckets.aaggregate(**aggregates))
+
+
+def _leaderboard_key(test_id, limit):
+    return f'test:{test_id}:leaderboard:{limit}'
+
+
+def _leaders_query(test_id, limit):
+    return TestResult.objects.filter(test_id=test_id, is_completed=True).order_by(
+        '-percentage', 'completed_at'
+    ).values(
+        'id', 'percentage', 'correct_answers', 'total_questions',
+        'participant__first_name', 'participant__last_name',
+    )[:limit]
+
+
+def _leader(row):
+    return {
+        'result_id': row['id'],
+        # Фамилия сокращается до инициала
+        'name': f"{row['participant__first_name']} {row['participant__last_name'][:1]}.",
+        'percentage': row['percentage'],
+        'correct_answers': row['correct_answers'],
+        'total_questions': row['total_questions'],
+    }
+
+
+def get_leaderboard(test_id, limit=LEADERBOARD_SIZE):
+    """Лучшие результаты теста (кэшируются на LEADERBOARD_CACHE_TIMEOUT секунд)"""
+    key = _leaderboard_key(test_id, limit)
+    leaders = cache.get(key)
+    if leaders is None:
+        leaders = [_leader(row) for row in _leaders_query(test_id, limit)]
+        cache.set(key, leaders, LEADERBOARD_CACHE_TIMEOUT)
+    return leaders
+
+
+async def aget_leaderboard(test_id, limit=LEADERBOARD_SIZE):
+    """Асинхронная версия get_leaderboard"""
+    key = _leaderboard_key(test_id, limit)
+    leaders = await cache.aget(key)
+    if leaders is None:
+        leaders = [_leader(row) async for row in _leaders_query(test_id, limit)]
+        await cache.aset(key, leaders, LEADERBOARD_CACHE_TIMEOUT)
+    return leaders
@@ -0,0 +1,164 @@
+"""
+Сравнение синхронного (WSGI) и асинхронного (ASGI) пути участника.
+
+Команда вызывает views напрямую в одном процессе: синхронные - из пула
+потоков размером с воркер gunicorn, асинхронные - из одного event loop,
+как это делает ASGI-сервер. Пример:
+
+    python manage.py bench_concurrency --participants 300 --threads 8 --db-latency-ms 20
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+
+from test_pr import views, async_views
+from test_pr.models import Test, Answer
+from test_pr.sessions import PARTICIPANT_ID_KEY, PARTICIPANT_FIRST_NAME_KEY, PARTICIPANT_LAST_NAME_KEY
+
+VIEW_CHOICES = ['take_test', 'get_test_timer', 'save_answer']
+
+# Несуществующий участник: take_test только читает данные и не создаёт результат
+BENCH_PARTICIPANT_ID = -1
+
+
+class Command(BaseCommand):
+    help = 'Сравнить, сколько одновременных участников обслуживает один процесс в WSGI и ASGI режимах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test-id', type=int, help='ID теста (по умолчанию - первый активный)')
+        parser.add_argument('--participants', type=int, default=200, help='Одновременных участников')
+        parser.add_argument('--rounds', type=int, default=3, help='Запросов на участника')
+        parser.add_argument('--threads', type=int, default=8, help='Потоков WSGI-воркера')
+        parser.add_argument('--db-latency-ms', type=float, default=0, help='Искусственная задержка каждого SQL-запроса')
+        parser.add_argument('--views', nargs='+', choices=VIEW_CHOICES, default=VIEW_CHOICES)
+
+    def handle(self, *args, **options):
+        test = self._get_test(options['test_id'])
+        self.factory = RequestFactory()
+        self.test_id = test.id
+        self.answer = Answer.objects.filter(question__test=test).values('id', 'question_id').first()
+
+        latency = options['db_latency_ms'] / 1000
+
+        def add_latency(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def install_latency(sender, connection, **kwargs):
+            connection.execute_wrappers.append(add_latency)
+
+        if latency:
+            # Задержка добавляется в каждое новое соединение (у каждого потока своё)
+            connections.close_all()
+            connection_created.connect(install_latency)
+
+        try:
+            for view_name in options['views']:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'\n{view_name}'))
+                sync_stats = self._run_sync(view_name, options)
+                self._report('WSGI', sync_stats)
+                async_stats = asyncio.run(self._run_async(view_name, options))
+                self._report('ASGI', async_stats)
+        finally:
+            connection_created.disconnect(install_latency)
+
+    def _get_test(self, test_id):
+        tests = Test.objects.filter(status='active')
+        if test_id:
+            tests = tests.filter(id=test_id)
+        test = tests.first()
+        if not test:
+            raise CommandError('Нет активного теста для замера')
+        return test
+
+    def _make_request(self, view_name):
+        """Запрос участника с сессией, как после регистрации"""
+        if view_name == 'save_answer':
+            body = {'question_id': None, 'answer_id': None}
+            if self.answer:
+                body = {'question_id': self.answer['question_id'], 'answer_id': self.answer['id']}
+            request = self.factory.post(
+                f'/test/{self.test_id}/save-answer/',
+                data=json.dumps(body),
+                content_type='application/json'
+            )
+        elif view_name == 'get_test_timer':
+            request = self.factory.get(f'/api/test/{self.test_id}/timer/')
+        else:
+            request = self.factory.get(f'/test/{self.test_id}/take/')
+
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[PARTICIPANT_ID_KEY] = BENCH_PARTICIPANT_ID
+        session[PARTICIPANT_FIRST_NAME_KEY] = 'Bench'
+        session[PARTICIPANT_LAST_NAME_KEY] = 'User'
+        request.session = session
+        request.user = AnonymousUser()
+        return request
+
+    def _run_sync(self, view_name, options):
+        view = getattr(views, view_name)
+        latencies = []
+
+        def participant(submitted_at):
+            # Первый запрос ждёт свободный поток - это время тоже входит в задержку
+            started = submitted_at
+            for _ in range(options['rounds']):
+                response = view(self._make_request(view_name), test_id=self.test_id)
+                finished = time.perf_counter()
+                latencies.append((finished - started, response.status_code))
+                started = finished
+            connections.close_all()
+
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            futures = [
+                pool.submit(participant, time.perf_counter())
+                for _ in range(options['participants'])
+            ]
+        for future in futures:
+            future.result()
+        return latencies, time.perf_counter() - wall_started
+
+    async def _run_async(self, view_name, options):
+        view = getattr(async_views, view_name)
+        latencies = []
+
+        async def participant():
+            # Как ASGIHandler: у каждого запроса свой поток для синхронных операций ORM
+            async with ThreadSensitiveContext():
+                for _ in range(options['rounds']):
+                    started = time.perf_counter()
+                    response = await view(self._make_request(view_name), test_id=self.test_id)
+                    latencies.append((time.perf_counter() - started, response.status_code))
+
+        wall_started = time.perf_counter()
+        await asyncio.gather(*(participant() for _ in range(options['participants'])))
+        return latencies, time.perf_counter() - wall_started
+
+    def _report(self, label, stats):
+        latencies, wall = stats
+        if not latencies:
+            self.stdout.write(f'  {label}: нет запросов')
+            return
+
+        durations = sorted(duration for duration, status in latencies)
+        errors = sum(1 for duration, status in latencies if status >= 400)
+        p50 = statistics.median(durations) * 1000
+        p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000
+
+        self.stdout.write(
+            f'  {label}: {len(durations)} запросов за {wall:.2f} с, '
+            f'{len(durations) / wall:.0f} запр/с, p50 {p50:.1f} мс, p99 {p99:.1f} мс, ошибок {errors}'
+        )
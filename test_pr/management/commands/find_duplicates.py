@@ -0,0 +1,46 @@
+"""
+Найти кластеры почти одинаковых вопросов по MinHash-подписям.
+Сначала досчитывает подписи вопросов, у которых их нет:
+
+    python manage.py find_duplicates
+    python manage.py find_duplicates --threshold 0.9
+    python manage.py find_duplicates --rebuild   # пересчитать все подписи
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from test_pr.dedup import DEFAULT_THRESHOLD, find_clusters, index_missing, rebuild_signatures
+
+
+class Command(BaseCommand):
+    help = 'Найти почти одинаковые вопросы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='Минимальная похожесть (0-1)')
+        parser.add_argument('--rebuild', action='store_true', help='Пересчитать подписи всех вопросов')
+        parser.add_argument('--limit', type=int, default=50, help='Сколько кластеров вывести')
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError('Порог похожести должен быть от 0 до 1')
+
+        if options['rebuild']:
+            indexed = rebuild_signatures()
+        else:
+            indexed = index_missing()
+        if indexed:
+            self.stdout.write(f'Посчитано подписей: {indexed}')
+
+        clusters = find_clusters(options['threshold'])
+        for cluster in clusters[:options['limit']]:
+            self.stdout.write(self.style.WARNING(
+                f"\nВопросов: {len(cluster['questions'])}, похожесть от {cluster['similarity']:.0%}"
+            ))
+            for question in cluster['questions']:
+                self.stdout.write(f"  #{question['id']} [{question['test_title']}] {question['text'][:80]}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nКластеров: {len(clusters)}, '
+            f"вопросов в них: {sum(len(cluster['questions']) for cluster in clusters)}"
+        ))
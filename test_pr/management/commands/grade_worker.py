@@ -0,0 +1,93 @@
+"""
+Обработчик очереди проверки (GRADING_QUEUE=True).
+
+    python manage.py grade_worker --processes 4 --batch-size 200
+    python manage.py grade_worker --once     # проверить очередь и выйти
+"""
+
+import multiprocessing
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections, OperationalError
+
+
+def run_worker(batch_size, poll_interval, stale_after, once):
+    """Цикл одного процесса: взять пачку, проверить, повторить"""
+    # Импорт здесь, а не в модуле: при запуске через spawn (macOS, Windows)
+    # дочерний процесс импортирует этот модуль до django.setup()
+    from test_pr.submissions import claim_batch, grade_batch, release_stale
+
+    graded = 0
+    while True:
+        try:
+            release_stale(stale_after)
+            submissions = claim_batch(batch_size)
+            if submissions:
+                graded += grade_batch(submissions)
+                continue
+        except OperationalError:
+            # БД занята другим процессом: взятые отправки вернутся в очередь по таймауту
+            time.sleep(poll_interval)
+            continue
+        if once:
+            return graded
+        time.sleep(poll_interval)
+
+
+def _process_main(batch_size, poll_interval, stale_after, once):
+    # При spawn дочерний процесс начинает с чистого интерпретатора
+    django.setup()
+    # При fork соединение родителя не используется в дочернем процессе
+    connections.close_all()
+    try:
+        run_worker(batch_size, poll_interval, stale_after, once)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Проверять отправленные тесты из очереди пачками в нескольких процессах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2, help='Количество процессов')
+        parser.add_argument('--batch-size', type=int, default=100, help='Отправок за одну транзакцию')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Пауза при пустой очереди, с')
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help='Через сколько секунд вернуть в очередь отправку зависшего обработчика')
+        parser.add_argument('--once', action='store_true', help='Проверить очередь и завершиться')
+
+    def handle(self, *args, **options):
+        worker_args = (
+            options['batch_size'],
+            options['poll_interval'],
+            options['stale_after'],
+            options['once'],
+        )
+
+        if options['processes'] <= 1:
+            try:
+                graded = run_worker(*worker_args)
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(self.style.SUCCESS(f'Проверено отправок: {graded}'))
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_process_main, args=worker_args, daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f'Запущено обработчиков: {len(processes)}')
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+
+        self.stdout.write(self.style.SUCCESS('Обработчики остановлены'))
@@ -0,0 +1,415 @@
+"""
+Нагрузочный прогон полного пути участника по HTTP.
+
+В отличие от bench_concurrency и stress_submissions команда не вызывает
+views в своём процессе, а ходит на работающий сервер (runserver,
+gunicorn или ASGI-сервер), как браузеры класса в день экзамена:
+регистрация → список тестов → открытие теста → клики по ответам
+(save_answer) → отправка → страница результата. HTTP-клиент - на
+asyncio из стандартной библиотеки, у каждого участника своё
+keep-alive соединение и свои cookie. Пример:
+
+    python manage.py load_journey --url http://127.0.0.1:8000 --participants 300 --ramp-up 60 --think-time 5
+
+Участники создаются на сервере с именем LOAD_FIRST_NAME и фамилией
+с номером прогона; удалить их можно в админке.
+"""
+
+import asyncio
+import json
+import random
+import re
+import ssl
+import statistics
+import time
+import uuid
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+LOAD_FIRST_NAME = 'Нагрузка'
+
+# Шаги пути участника в порядке отчёта
+STEPS = [
+    'register_page',
+    'register',
+    'test_list',
+    'take_test',
+    'questions_api',
+    'save_answer',
+    'submit',
+    'test_result',
+]
+
+CSRF_INPUT_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+TEST_LINK_RE = re.compile(r'/test/(\d+)/take/')
+ANSWER_INPUT_RE = re.compile(r'name="answer_(\d+)"\s+value="(\d+)"')
+QUESTIONS_URL_RE = re.compile(r'data-questions-url="([^"]+)"')
+
+
+class StepFailed(Exception):
+    """Шаг завершился ошибкой - путь участника прерывается"""
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+    @property
+    def location(self):
+        return self.headers.get('location', '')
+
+
+class HttpSession:
+    """
+    Минимальный HTTP/1.1 клиент участника: одно keep-alive соединение,
+    cookie и CSRF-токен как у браузера. Редиректы не выполняются -
+    каждый запрос замеряется отдельно.
+    """
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.netloc = parts.netloc
+        self.timeout = timeout
+        self.cookies = {}
+        self.reader = None
+        self.writer = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+        self.reader = self.writer = None
+
+    async def _connect(self):
+        context = ssl.create_default_context() if self.scheme == 'https' else None
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=context)
+
+    async def request(self, method, path, body=b'', headers=None):
+        return await asyncio.wait_for(self._request(method, path, body, headers or {}), self.timeout)
+
+    async def _request(self, method, path, body, headers):
+        reused = self.writer is not None
+        if not reused:
+            await self._connect()
+        try:
+            return await self._exchange(method, path, body, headers)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+            # Сервер закрыл простаивавшее соединение - повторяем на новом
+            await self._connect()
+            return await self._exchange(method, path, body, headers)
+
+    async def _exchange(self, method, path, body, headers):
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.netloc}',
+            'Connection: keep-alive',
+            f'Content-Length: {len(body)}',
+            # Для проверки CSRF по HTTPS
+            f'Referer: {self.base_url}/',
+        ]
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{name}={value}' for name, value in self.cookies.items()))
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            name = name.strip().lower()
+            value = value.strip()
+            if name == 'set-cookie':
+                self._store_cookie(value)
+            else:
+                response_headers[name] = value
+
+        if method == 'HEAD' or status in (204, 304):
+            content = b''
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = await self._read_chunked()
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            content = await self.reader.read()
+            response_headers['connection'] = 'close'
+
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return Response(status, response_headers, content)
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            if size == 0:
+                # Завершающие заголовки не используются
+                while await self.reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readexactly(2)
+
+    def _store_cookie(self, header):
+        name, _, value = header.split(';', 1)[0].partition('=')
+        name = name.strip()
+        attributes = header.lower()
+        # Django удаляет cookie пустым значением с max-age=0
+        if not value or 'max-age=0' in attributes:
+            self.cookies.pop(name, None)
+        else:
+            self.cookies[name] = value.strip()
+
+    async def get(self, path):
+        return await self.request('GET', path)
+
+    async def post_form(self, path, data):
+        return await self.request(
+            'POST', path, urlencode(data).encode(),
+            {'Content-Type': 'application/x-www-form-urlencoded'}
+        )
+
+    async def post_json(self, path, data):
+        return await self.request('POST', path, json.dumps(data).encode(), {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': self.cookies.get('csrftoken', ''),
+        })
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный прогон пути участника по HTTP: задержки p50/p99 и ошибки по шагам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument('--test-id', type=int, help='ID теста (по умолчанию - первый в списке тестов)')
+        parser.add_argument('--participants', type=int, default=50, help='Участников')
+        parser.add_argument('--ramp-up', type=float, default=10, help='За сколько секунд приходят все участники')
+        parser.add_argument('--think-time', type=float, default=2, help='Средняя пауза между страницами, с')
+        parser.add_argument('--answer-time', type=float, default=5, help='Средняя пауза между ответами, с')
+        parser.add_argument('--clicks', type=int, default=1, help='Кликов save_answer на вопрос')
+        parser.add_argument('--timeout', type=float, default=30, help='Таймаут одного запроса, с')
+        parser.add_argument('--seed', type=int, help='Зерно случайных пауз и ответов')
+
+    def handle(self, *args, **options):
+        if urlsplit(options['url']).scheme not in ('http', 'https'):
+            raise CommandError('--url должен начинаться с http:// или https://')
+        if options['participants'] < 1:
+            raise CommandError('--participants должен быть положительным')
+
+        self.options = options
+        self.base_url = options['url'].rstrip('/')
+        self.random = random.Random(options['seed'])
+        self.run_id = uuid.uuid4().hex[:8]
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(Counter)
+        self.completed = 0
+
+        self.stdout.write(
+            f'{options["participants"]} участников на {self.base_url}, '
+            f'приход за {options["ramp_up"]:.0f} с, прогон {self.run_id}'
+        )
+        wall = asyncio.run(self._run())
+        self._report(wall)
+
+    async def _run(self):
+        count = self.options['participants']
+        ramp_up = self.options['ramp_up']
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self._participant(number, ramp_up * number / count)
+            for number in range(count)
+        ))
+        return time.perf_counter() - started
+
+    async def _think(self, mean):
+        # Разброс ±50%, чтобы участники не синхронизировались
+        if mean > 0:
+            await asyncio.sleep(mean * self.random.uniform(0.5, 1.5))
+
+    async def _step(self, name, call, check):
+        """Выполнить запрос шага, записать задержку; check(response) - текст ошибки или None"""
+        started = time.perf_counter()
+        try:
+            response = await call
+            error = check(response)
+        except asyncio.TimeoutError:
+            response, error = None, 'таймаут'
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            response, error = None, f'{type(e).__name__}: {e}'
+        self.samples[name].append(time.perf_counter() - started)
+        if error:
+            self.errors[name][error] += 1
+            raise StepFailed(error)
+        return response
+
+    async def _participant(self, number, delay):
+        await asyncio.sleep(delay)
+        session = HttpSession(self.base_url, self.options['timeout'])
+        try:
+            await self._journey(session, number)
+            self.completed += 1
+        except StepFailed:
+            pass
+        finally:
+            await session.close()
+
+    async def _journey(self, session, number):
+        think_time = self.options['think_time']
+
+        page = await self._step('register_page', session.get('/'), expect_form)
+        await self._think(think_time)
+        await self._step('register', session.post_form('/', {
+            'csrfmiddlewaretoken': csrf_token(page),
+            'first_name': LOAD_FIRST_NAME,
+            'last_name': f'{self.run_id}-{number}',
+        }), expect_redirect('/tests/'))
+
+        test_list = await self._step('test_list', session.get('/tests/'), expect_status(200))
+        test_id = self.options['test_id']
+        if test_id is None:
+            match = TEST_LINK_RE.search(test_list.text)
+            if not match:
+                self.errors['test_list']['нет доступных тестов'] += 1
+                raise StepFailed('нет доступных тестов')
+            test_id = int(match.group(1))
+        await self._think(think_time)
+
+        take_url = f'/test/{test_id}/take/'
+        page = await self._step('take_test', session.get(take_url), expect_form)
+        questions = await self._questions(session, page.text)
+
+        answers = {}
+        for question_id, options in questions.items():
+            for _ in range(self.options['clicks']):
+                await self._think(self.options['answer_time'])
+                answers[question_id] = self.random.choice(options)
+                await self._step('save_answer', session.post_json(f'/test/{test_id}/save-answer/', {
+                    'question_id': question_id,
+                    'answer_id': answers[question_id],
+                }), expect_success)
+
+        await self._think(think_time)
+        data = [('csrfmiddlewaretoken', csrf_token(page))]
+        data.extend((f'answer_{question_id}', answer_id) for question_id, answer_id in answers.items())
+        submitted = await self._step('submit', session.post_form(take_url, data), expect_redirect('/result/'))
+
+        result_path = urlsplit(urljoin(self.base_url + '/', submitted.location)).path
+        await self._step('test_result', session.get(result_path), expect_status(200))
+
+    async def _questions(self, session, html):
+        """Варианты ответов по вопросам; длинный тест догружается порциями через API"""
+        questions = defaultdict(list)
+        for question_id, answer_id in ANSWER_INPUT_RE.findall(html):
+            questions[int(question_id)].append(int(answer_id))
+
+        match = QUESTIONS_URL_RE.search(html)
+        if match:
+            url = match.group(1)
+            # Первая порция уже на странице, как в take_test.js
+            page = 2 if questions else 1
+            pages = page
+            while page <= pages:
+                response = await self._step('questions_api', session.get(f'{url}?page={page}'), expect_questions)
+                data = json.loads(response.body)
+                pages = data['pages']
+                for question in data['questions']:
+                    questions[question['id']] = [answer['id'] for answer in question['answers']]
+                page += 1
+        return {question_id: options for question_id, options in questions.items() if options}
+
+    def _report(self, wall):
+        total = sum(len(durations) for durations in self.samples.values())
+        total_errors = sum(sum(errors.values()) for errors in self.errors.values())
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\n{total} запросов за {wall:.1f} с ({total / wall:.1f} запр/с), '
+            f'путь прошли {self.completed} из {self.options["participants"]} участников'
+        ))
+        self.stdout.write(
+            f'  {"шаг":<14} {"запросов":>9} {"запр/с":>8} {"p50, мс":>9} {"p99, мс":>9} {"ошибок":>8}'
+        )
+        for step in STEPS:
+            durations = sorted(self.samples.get(step, []))
+            if not durations:
+                continue
+            errors = sum(self.errors[step].values())
+            p50 = statistics.median(durations) * 1000
+            p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000
+            line = (
+                f'  {step:<14} {len(durations):>9} {len(durations) / wall:>8.1f} '
+                f'{p50:>9.1f} {p99:>9.1f} {errors / len(durations):>7.1%}'
+            )
+            self.stdout.write(self.style.ERROR(line) if errors else line)
+            for error, count in self.errors[step].most_common(3):
+                self.stdout.write(f'      {count} x {error}')
+
+        if total_errors:
+            raise CommandError(f'Ошибок: {total_errors}')
+        self.stdout.write(self.style.SUCCESS('Все запросы выполнены без ошибок'))
+
+
+def csrf_token(response):
+    # Страница уже проверена expect_form
+    return CSRF_INPUT_RE.search(response.text).group(1)
+
+
+def expect_status(status):
+    def check(response):
+        return None if response.status == status else f'HTTP {response.status}'
+    return check
+
+
+def expect_redirect(prefix):
+    def check(response):
+        if response.status != 302:
+            return f'HTTP {response.status}'
+        if urlsplit(response.location).path.startswith(prefix):
+            return None
+        return f'редирект на {response.location}'
+    return check
+
+
+def expect_form(response):
+    # Редирект вместо формы - например, тест закрыт или уже пройден
+    if response.status != 200:
+        return f'HTTP {response.status} {response.location}'.strip()
+    return None if CSRF_INPUT_RE.search(response.text) else 'на странице нет формы с CSRF-токеном'
+
+
+def expect_questions(response):
+    if response.status != 200:
+        return f'HTTP {response.status}'
+    data = json.loads(response.body)
+    if 'pages' not in data or 'questions' not in data:
+        return 'нет вопросов в ответе'
+    return None
+
+
+def expect_success(response):
+    if response.status != 200:
+        return f'HTTP {response.status}'
+    if not json.loads(response.body).get('success'):
+        return 'success: false'
+    return None
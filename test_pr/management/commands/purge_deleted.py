@@ -0,0 +1,60 @@
+"""
+Удалять данные помеченных удалёнными тестов и участников пачками.
+
+    python manage.py purge_deleted                     # обрабатывать задачи постоянно
+    python manage.py purge_deleted --once              # выполнить задачи и выйти
+    python manage.py purge_deleted --pause 0.1         # пауза между пачками, чтобы не мешать экзамену
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+from django.utils import timezone
+
+from test_pr.deletion import DEFAULT_BATCH_SIZE, next_job, purge_batch, start_job
+from test_pr.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = 'Удалять данные удалённых тестов и участников пачками в фоне'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Строк за одну транзакцию')
+        parser.add_argument('--pause', type=float, default=0.0, help='Пауза между пачками, с')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Пауза при пустой очереди, с')
+        parser.add_argument('--once', action='store_true', help='Выполнить задачи и завершиться')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                job = next_job()
+                if job is None:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+                self.run_job(job, options['batch_size'], options['pause'])
+        except KeyboardInterrupt:
+            return
+
+    def run_job(self, job, batch_size, pause):
+        self.stdout.write(f'{job.get_kind_display()} "{job.title}": удаление...')
+        try:
+            start_job(job)
+            while purge_batch(job, batch_size):
+                if pause:
+                    time.sleep(pause)
+        except OperationalError:
+            # БД занята: задача остаётся выполняемой и продолжится со следующей пачки
+            time.sleep(1)
+            return
+        except Exception as e:
+            job.status = DeletionJob.STATUS_FAILED
+            job.error = str(e)
+            job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'finished_at'])
+            self.stdout.write(self.style.ERROR(f'Ошибка: {e}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Удалено строк: {job.deleted}'))
@@ -0,0 +1,27 @@
+"""
+Пересобрать полнотекстовый индекс вопросов и ответов для поиска в админке.
+Нужен после изменений в обход сигналов (bulk_create, update, загрузка фикстур):
+
+    python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from test_pr.search import is_supported, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Пересобрать поисковый индекс вопросов и ответов'
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            self.stdout.write(self.style.WARNING(
+                f'Полнотекстовый поиск не поддерживается для {connection.vendor}, используется обычный поиск'
+            ))
+            return
+
+        with transaction.atomic():
+            rebuild_index()
+
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересобран'))
@@ -0,0 +1,46 @@
+"""
+Перепроверить результаты теста после исправления правильных ответов:
+
+    python manage.py regrade_results 5 --dry-run   # показать, чьи баллы изменятся
+    python manage.py regrade_results 5 7           # перепроверить тесты 5 и 7
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from test_pr.models import Test
+from test_pr.regrade import diff, regrade
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать правильность ответов и баллы результатов теста по текущему ключу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_ids', nargs='+', type=int, help='ID тестов')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать изменения')
+        parser.add_argument('--limit', type=int, default=50, help='Сколько изменений вывести на тест')
+
+    def handle(self, *args, **options):
+        tests = Test.objects.in_bulk(options['test_ids'])
+        missing = [test_id for test_id in options['test_ids'] if test_id not in tests]
+        deleted = set(Test.all_objects.filter(id__in=missing).values_list('id', flat=True))
+        if deleted:
+            raise CommandError(
+                f'Тесты удалены, их результаты удалит purge_deleted: {", ".join(map(str, sorted(deleted)))}'
+            )
+        if missing:
+            raise CommandError(f'Тесты не найдены: {", ".join(map(str, missing))}')
+
+        for test_id in options['test_ids']:
+            changes = diff(test_id) if options['dry_run'] else regrade(test_id)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{tests[test_id].title}'))
+            for change in changes[:options['limit']]:
+                self.stdout.write(
+                    f"  {change['participant']}: {change['old_correct']} → {change['new_correct']} "
+                    f"из {change['total_questions']} "
+                    f"({change['old_percentage']:.1f}% → {change['new_percentage']:.1f}%)"
+                )
+            if len(changes) > options['limit']:
+                self.stdout.write(f'  ... и ещё {len(changes) - options["limit"]}')
+
+            verb = 'Изменится' if options['dry_run'] else 'Изменено'
+            self.stdout.write(self.style.SUCCESS(f'{verb} результатов: {len(changes)}'))
@@ -0,0 +1,32 @@
+"""
+Добавить новые результаты в почасовые и дневные сводки для аналитики.
+Запускается периодически (например, из cron раз в несколько минут):
+
+    python manage.py rollup_results
+    python manage.py rollup_results --rebuild   # пересчитать сводки с нуля
+"""
+
+from django.core.management.base import BaseCommand
+
+from test_pr.rollups import rollup_batch, reset_rollups
+
+
+class Command(BaseCommand):
+    help = 'Обновить сводки результатов по часам и дням'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Результатов за одну транзакцию')
+        parser.add_argument('--rebuild', action='store_true', help='Удалить сводки и посчитать заново')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            reset_rollups()
+
+        processed = 0
+        while True:
+            count = rollup_batch(options['batch_size'])
+            if not count:
+                break
+            processed += count
+
+        self.stdout.write(self.style.SUCCESS(f'Учтено результатов: {processed}'))
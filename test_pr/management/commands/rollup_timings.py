@@ -0,0 +1,27 @@
+"""
+Перенести журнал времени на вопросах в сводки QuestionTimingStat.
+Запускается периодически (например, из cron раз в несколько минут):
+
+    python manage.py rollup_timings
+"""
+
+from django.core.management.base import BaseCommand
+
+from test_pr.timings import rollup_batch
+
+
+class Command(BaseCommand):
+    help = 'Обновить сводки времени на вопросах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Записей за одну транзакцию')
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            count = rollup_batch(options['batch_size'])
+            if not count:
+                break
+            processed += count
+
+        self.stdout.write(self.style.SUCCESS(f'Перенесено записей: {processed}'))
@@ -0,0 +1,121 @@
+"""
+Нагрузочная проверка одновременной отправки теста целым классом.
+
+Участники регистрируются, открывают тест и по общему сигналу
+одновременно отправляют ответы из нескольких процессов:
+
+    SQLITE_PROFILE=production python manage.py stress_submissions --participants 40 --processes 8
+"""
+
+import multiprocessing
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+from test_pr.models import Test, Answer, Participant, TestResult
+
+STRESS_FIRST_NAME = 'Нагрузка'
+
+
+def _submit_worker(test_id, answers, last_names, barrier, queue):
+    """Процесс-участник: регистрация, открытие теста и отправка по сигналу"""
+    connections.close_all()
+
+    clients = []
+    for last_name in last_names:
+        client = Client()
+        client.post('/', {'first_name': STRESS_FIRST_NAME, 'last_name': last_name}, secure=True)
+        client.get(f'/test/{test_id}/take/', secure=True)
+        clients.append(client)
+
+    barrier.wait()
+
+    for client in clients:
+        started = time.perf_counter()
+        try:
+            response = client.post(f'/test/{test_id}/take/', answers, secure=True)
+            error = None if response.status_code == 302 else f'HTTP {response.status_code}'
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        queue.put((time.perf_counter() - started, error))
+
+
+class Command(BaseCommand):
+    help = 'Одновременно отправить тест от класса участников из нескольких процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--test-id', type=int, help='ID теста (по умолчанию - первый активный)')
+        parser.add_argument('--participants', type=int, default=40, help='Участников (размер класса)')
+        parser.add_argument('--processes', type=int, default=8, help='Процессов-отправителей')
+        parser.add_argument('--keep', action='store_true', help='Не удалять созданных участников')
+
+    def handle(self, *args, **options):
+        tests = Test.objects.filter(status='active')
+        if options['test_id']:
+            tests = tests.filter(id=options['test_id'])
+        test = tests.first()
+        if not test:
+            raise CommandError('Нет активного теста для проверки')
+
+        # Все участники отвечают правильно - удобно проверить итоговые результаты
+        answers = {
+            f'answer_{question_id}': answer_id
+            for answer_id, question_id in Answer.objects.filter(
+                question__test=test, is_correct=True
+            ).values_list('id', 'question_id')
+        }
+
+        run_id = uuid.uuid4().hex[:8]
+        last_names = [f'{run_id}-{n}' for n in range(options['participants'])]
+        processes_count = max(1, min(options['processes'], len(last_names)))
+        chunks = [last_names[i::processes_count] for i in range(processes_count)]
+
+        barrier = multiprocessing.Barrier(processes_count + 1)
+        queue = multiprocessing.Queue()
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=_submit_worker, args=(test.id, answers, chunk, barrier, queue))
+            for chunk in chunks
+        ]
+        for process in processes:
+            process.start()
+
+        barrier.wait()
+        started = time.perf_counter()
+        outcomes = [queue.get() for _ in last_names]
+        wall = time.perf_counter() - started
+        for process in processes:
+            process.join()
+
+        self._report(test, outcomes, wall, last_names)
+
+        if not options['keep']:
+            Participant.objects.filter(first_name=STRESS_FIRST_NAME, last_name__startswith=f'{run_id}-').delete()
+
+    def _report(self, test, outcomes, wall, last_names):
+        durations = sorted(duration for duration, error in outcomes)
+        errors = [error for duration, error in outcomes if error]
+        saved = TestResult.objects.filter(
+            test=test,
+            participant__first_name=STRESS_FIRST_NAME,
+            participant__last_name__in=last_names
+        ).count()
+
+        self.stdout.write(f'Тест: {test.title}')
+        self.stdout.write(f'Отправок: {len(outcomes)} за {wall:.2f} с')
+        self.stdout.write(
+            f'Задержка: p50 {statistics.median(durations) * 1000:.0f} мс, '
+            f'max {durations[-1] * 1000:.0f} мс'
+        )
+        self.stdout.write(f'Сохранено результатов: {saved}')
+
+        if errors:
+            for error in sorted(set(errors)):
+                self.stdout.write(self.style.ERROR(f'  {errors.count(error)} x {error}'))
+            raise CommandError(f'Ошибок: {len(errors)}')
+        self.stdout.write(self.style.SUCCESS('Все отправки сохранены без ошибок'))
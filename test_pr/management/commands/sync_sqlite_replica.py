@@ -0,0 +1,35 @@
+"""
+Копирование основной SQLite-базы в файл реплики для локальной проверки
+чтения отчётов с реплики (SQLITE_REPLICA=True).
+
+    SQLITE_REPLICA=True python manage.py sync_sqlite_replica
+"""
+
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Скопировать основную SQLite-базу в файл реплики'
+
+    def handle(self, *args, **options):
+        replica = settings.DATABASES.get(settings.REPORTING_DATABASE)
+        default = settings.DATABASES['default']
+        if not replica:
+            raise CommandError('Реплика не настроена (SQLITE_REPLICA=True)')
+        for database in (default, replica):
+            if database['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError('Команда работает только с SQLite')
+
+        # Онлайн-копия: основная база продолжает принимать запросы
+        source = sqlite3.connect(default['NAME'])
+        target = sqlite3.connect(replica['NAME'])
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Реплика обновлена: {replica["NAME"]}'))
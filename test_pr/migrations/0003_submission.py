@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0002_alter_answer_options_alter_answer_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Submission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.TextField(help_text='Ответы участника в компактном JSON: {"ID вопроса": ID ответа}', verbose_name='Ответы')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает проверки'), ('processing', 'Проверяется'), ('done', 'Проверено'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток проверки')),
+                ('claimed_by', models.CharField(blank=True, max_length=32, verbose_name='Обработчик')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Взято в обработку')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('test_result', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='submission', to='test_pr.testresult', verbose_name='Результат теста')),
+            ],
+            options={
+                'verbose_name': 'Отправка на проверку',
+                'verbose_name_plural': 'Очередь проверки',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='submission_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:17
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_score_buckets(apps, schema_editor):
+    """Гистограммы по уже проверенным результатам"""
+    TestResult = apps.get_model('test_pr', 'TestResult')
+    ScoreBucket = apps.get_model('test_pr', 'ScoreBucket')
+
+    counts = Counter(
+        (test_id, round(percentage * 10))
+        for test_id, percentage in TestResult.objects.filter(is_completed=True)
+        .values_list('test_id', 'percentage').iterator(chunk_size=2000)
+    )
+    ScoreBucket.objects.bulk_create(
+        [ScoreBucket(test_id=test_id, score=score, count=count) for (test_id, score), count in counts.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0003_submission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(help_text='Процент правильных ответов с точностью до десятой (0-1000)', verbose_name='Балл')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Результатов')),
+            ],
+            options={
+                'verbose_name': 'Интервал гистограммы результатов',
+                'verbose_name_plural': 'Гистограмма результатов',
+                'ordering': ['test', '-score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['test', '-percentage', 'completed_at'], name='result_leaderboard_idx'),
+        ),
+        migrations.AddField(
+            model_name='scorebucket',
+            name='test',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_buckets', to='test_pr.test', verbose_name='Тест'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='scorebucket',
+            unique_together={('test', 'score')},
+        ),
+        migrations.RunPython(fill_score_buckets, migrations.RunPython.noop),
+    ]
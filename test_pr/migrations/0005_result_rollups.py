@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0004_score_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Сводка')),
+                ('last_result_id', models.PositiveBigIntegerField(default=0, verbose_name='Последний учтённый результат')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлена')),
+            ],
+            options={
+                'verbose_name': 'Отметка сводок',
+                'verbose_name_plural': 'Отметки сводок',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyResultStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('score_sum', models.FloatField(default=0, verbose_name='Сумма процентов')),
+                ('histogram', models.JSONField(default=list, help_text='Число результатов по интервалам 0-10%, 10-20%, ..., 90-100%', verbose_name='Распределение')),
+                ('day', models.DateField(verbose_name='День')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='test_pr.test', verbose_name='Тест')),
+            ],
+            options={
+                'verbose_name': 'Сводка за день',
+                'verbose_name_plural': 'Сводки по дням',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day'], name='daily_stat_day_idx')],
+                'unique_together': {('test', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyResultStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('score_sum', models.FloatField(default=0, verbose_name='Сумма процентов')),
+                ('histogram', models.JSONField(default=list, help_text='Число результатов по интервалам 0-10%, 10-20%, ..., 90-100%', verbose_name='Распределение')),
+                ('hour', models.DateTimeField(verbose_name='Час')),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='test_pr.test', verbose_name='Тест')),
+            ],
+            options={
+                'verbose_name': 'Сводка за час',
+                'verbose_name_plural': 'Сводки по часам',
+                'ordering': ['-hour'],
+                'indexes': [models.Index(fields=['hour'], name='hourly_stat_hour_idx')],
+                'unique_together': {('test', 'hour')},
+            },
+        ),
+    ]
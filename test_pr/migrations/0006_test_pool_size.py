@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:21
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0005_result_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='pool_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Каждый участник получает столько случайных вопросов теста. Оставьте пусто, чтобы задавать все', null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Вопросов в попытке'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations
+
+# Схема и заполнение индекса (test_pr/search.py на момент миграции).
+# Копия, а не импорт: миграция должна создавать те же таблицы,
+# как бы ни менялся модуль поиска
+
+SQLITE_SCHEMA = [
+    "CREATE VIRTUAL TABLE test_pr_question_search USING fts5("
+    "text, test_title, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    "CREATE VIRTUAL TABLE test_pr_answer_search USING fts5("
+    "text, question_text, test_title, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+]
+
+POSTGRES_SCHEMA = [
+    "CREATE TABLE test_pr_question_search ("
+    "object_id bigint PRIMARY KEY REFERENCES test_pr_question (id) ON DELETE CASCADE, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX test_pr_question_search_document ON test_pr_question_search USING GIN (document)",
+    "CREATE TABLE test_pr_answer_search ("
+    "object_id bigint PRIMARY KEY REFERENCES test_pr_answer (id) ON DELETE CASCADE, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX test_pr_answer_search_document ON test_pr_answer_search USING GIN (document)",
+]
+
+SQLITE_BACKFILL = [
+    "INSERT INTO test_pr_question_search (rowid, text, test_title) "
+    "SELECT q.id, q.text, t.title "
+    "FROM test_pr_question q JOIN test_pr_test t ON t.id = q.test_id",
+    "INSERT INTO test_pr_answer_search (rowid, text, question_text, test_title) "
+    "SELECT a.id, a.text, q.text, t.title "
+    "FROM test_pr_answer a "
+    "JOIN test_pr_question q ON q.id = a.question_id "
+    "JOIN test_pr_test t ON t.id = q.test_id",
+]
+
+POSTGRES_BACKFILL = [
+    "INSERT INTO test_pr_question_search (object_id, document) "
+    "SELECT q.id, setweight(to_tsvector('simple', q.text), 'A') "
+    "|| setweight(to_tsvector('simple', t.title), 'B') "
+    "FROM test_pr_question q JOIN test_pr_test t ON t.id = q.test_id",
+    "INSERT INTO test_pr_answer_search (object_id, document) "
+    "SELECT a.id, setweight(to_tsvector('simple', a.text), 'A') "
+    "|| setweight(to_tsvector('simple', q.text), 'B') "
+    "|| setweight(to_tsvector('simple', t.title), 'C') "
+    "FROM test_pr_answer a "
+    "JOIN test_pr_question q ON q.id = a.question_id "
+    "JOIN test_pr_test t ON t.id = q.test_id",
+]
+
+STATEMENTS = {
+    'sqlite': SQLITE_SCHEMA + SQLITE_BACKFILL,
+    'postgresql': POSTGRES_SCHEMA + POSTGRES_BACKFILL,
+}
+
+
+def create_index(apps, schema_editor):
+    """Таблицы полнотекстового индекса и заполнение по существующим вопросам"""
+    for statement in STATEMENTS.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in STATEMENTS:
+        for table in ('test_pr_question_search', 'test_pr_answer_search'):
+            schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0006_test_pool_size'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSignature',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='test_pr.question', verbose_name='Вопрос')),
+                ('signature', models.BinaryField(verbose_name='Подпись')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлена')),
+            ],
+            options={
+                'verbose_name': 'Подпись вопроса',
+                'verbose_name_plural': 'Подписи вопросов',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Полоса')),
+                ('bucket', models.BigIntegerField(verbose_name='Хэш полосы')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='test_pr.question', verbose_name='Вопрос')),
+            ],
+            options={
+                'verbose_name': 'Полоса LSH',
+                'verbose_name_plural': 'Полосы LSH',
+                'indexes': [models.Index(fields=['band', 'bucket'], name='question_band_bucket_idx')],
+            },
+        ),
+    ]
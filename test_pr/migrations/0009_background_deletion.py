@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0008_question_signatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Удалён'),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Удалён'),
+        ),
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('test', 'Тест'), ('participant', 'Участник')], max_length=20, verbose_name='Что удаляется')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID объекта')),
+                ('title', models.CharField(max_length=255, verbose_name='Название')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('running', 'Выполняется'), ('done', 'Завершено'), ('failed', 'Ошибка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Строк к удалению')),
+                ('deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено строк')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Фоновое удаление',
+                'verbose_name_plural': 'Фоновые удаления',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='deletion_job_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:30
+
+import struct
+
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 500
+
+# Формат версии 1 (test_pr/packing.py на момент миграции). Копия, а не импорт:
+# миграция должна писать тот же формат, как бы ни менялся код приложения
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BBI')
+ID_FORMATS = {4: 'I', 8: 'Q'}
+
+
+def pack_answers(graded):
+    """graded - тройки (question_id, answer_id или None, is_correct) в порядке вопросов"""
+    graded = list(graded)
+    count = len(graded)
+    largest = max((max(question_id, answer_id or 0) for question_id, answer_id, _ in graded), default=0)
+    width = 4 if largest < 2 ** 32 else 8
+    code = ID_FORMATS[width]
+
+    bitmap = bytearray((count + 7) // 8)
+    for i, (_, _, is_correct) in enumerate(graded):
+        if is_correct:
+            bitmap[i // 8] |= 1 << (i % 8)
+
+    return (
+        HEADER.pack(FORMAT_VERSION, width, count)
+        + struct.pack(f'<{count}{code}', *(question_id for question_id, _, _ in graded))
+        + struct.pack(f'<{count}{code}', *(answer_id or 0 for _, answer_id, _ in graded))
+        + bytes(bitmap)
+    )
+
+
+def unpack_answers(data):
+    """Обратно в тройки (question_id, answer_id или None, is_correct)"""
+    data = bytes(data)
+    version, width, count = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Неизвестная версия упакованных ответов: {version}')
+
+    ids = struct.Struct(f'<{count}{ID_FORMATS[width]}')
+    question_ids = ids.unpack_from(data, HEADER.size)
+    answer_ids = ids.unpack_from(data, HEADER.size + ids.size)
+    bitmap = data[HEADER.size + 2 * ids.size:]
+
+    return [
+        (question_id, answer_id or None, bool(bitmap[i // 8] & (1 << (i % 8))))
+        for i, (question_id, answer_id) in enumerate(zip(question_ids, answer_ids))
+    ]
+
+
+def pack_user_answers(apps, schema_editor):
+    """
+    Перевести строки UserAnswer в TestResult.answers_packed пачками
+    результатов, каждая пачка - своя транзакция; переведённые строки удаляются
+    """
+    TestResult = apps.get_model('test_pr', 'TestResult')
+    UserAnswer = apps.get_model('test_pr', 'UserAnswer')
+
+    last_id = 0
+    while True:
+        result_ids = list(
+            UserAnswer.objects.filter(test_result_id__gt=last_id)
+            .order_by('test_result_id').values_list('test_result_id', flat=True).distinct()[:BATCH_SIZE]
+        )
+        if not result_ids:
+            return
+        last_id = result_ids[-1]
+
+        graded = {result_id: [] for result_id in result_ids}
+        rows = UserAnswer.objects.filter(test_result_id__in=result_ids).order_by(
+            'test_result_id', 'question__order', 'question_id'
+        ).values_list('test_result_id', 'question_id', 'selected_answer_id', 'is_correct')
+        for result_id, question_id, answer_id, is_correct in rows:
+            graded[result_id].append((question_id, answer_id, is_correct))
+
+        with transaction.atomic():
+            TestResult.objects.bulk_update(
+                [TestResult(id=result_id, answers_packed=pack_answers(answers)) for result_id, answers in graded.items()],
+                ['answers_packed']
+            )
+            UserAnswer.objects.filter(test_result_id__in=result_ids).delete()
+
+
+def unpack_user_answers(apps, schema_editor):
+    """Обратно в строки UserAnswer"""
+    TestResult = apps.get_model('test_pr', 'TestResult')
+    UserAnswer = apps.get_model('test_pr', 'UserAnswer')
+
+    packed = TestResult.objects.filter(answers_packed__isnull=False).order_by('id')
+    last_id = 0
+    while True:
+        results = list(packed.filter(id__gt=last_id).values_list('id', 'answers_packed')[:BATCH_SIZE])
+        if not results:
+            return
+        last_id = results[-1][0]
+
+        with transaction.atomic():
+            UserAnswer.objects.bulk_create([
+                UserAnswer(
+                    test_result_id=result_id,
+                    question_id=question_id,
+                    selected_answer_id=answer_id,
+                    is_correct=is_correct
+                )
+                for result_id, data in results
+                for question_id, answer_id, is_correct in unpack_answers(data)
+            ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    # Пачки переводятся отдельными транзакциями
+    atomic = False
+
+    dependencies = [
+        ('test_pr', '0009_background_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testresult',
+            name='answers_packed',
+            field=models.BinaryField(blank=True, help_text='Выбранные ответы и их правильность в упакованном виде (см. test_pr/packing.py)', null=True, verbose_name='Ответы участника'),
+        ),
+        migrations.RunPython(pack_user_answers, unpack_user_answers),
+    ]
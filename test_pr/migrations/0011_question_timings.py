@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0010_packed_answers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionTimingStat',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='timing_stat', serialize=False, to='test_pr.question', verbose_name='Вопрос')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Открытий')),
+                ('total_ms', models.PositiveBigIntegerField(default=0, verbose_name='Суммарное время, мс')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлена')),
+            ],
+            options={
+                'verbose_name': 'Время на вопросе',
+                'verbose_name_plural': 'Время на вопросах',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionTiming',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duration_ms', models.PositiveIntegerField(verbose_name='Время, мс')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='test_pr.question', verbose_name='Вопрос')),
+            ],
+            options={
+                'verbose_name': 'Запись времени на вопросе',
+                'verbose_name_plural': 'Журнал времени на вопросах',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0011_question_timings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Растёт с каждым сохранением конструктора: защита от одновременного редактирования', verbose_name='Версия'),
+        ),
+    ]
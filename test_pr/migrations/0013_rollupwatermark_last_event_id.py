@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:09
+
+from django.db import migrations, models
+from django.db.models import F
+
+# Отметка переноса журнала времени на вопросах (test_pr/timings.py)
+TIMINGS_WATERMARK = 'question_timings'
+
+
+def move_timings_watermark(apps, schema_editor):
+    """Отметка журнала хранилась в last_result_id - переносится в своё поле"""
+    RollupWatermark = apps.get_model('test_pr', 'RollupWatermark')
+    RollupWatermark.objects.filter(name=TIMINGS_WATERMARK).update(
+        last_event_id=F('last_result_id'), last_result_id=0
+    )
+
+
+def restore_timings_watermark(apps, schema_editor):
+    RollupWatermark = apps.get_model('test_pr', 'RollupWatermark')
+    RollupWatermark.objects.filter(name=TIMINGS_WATERMARK).update(last_result_id=F('last_event_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_pr', '0012_test_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupwatermark',
+            name='last_event_id',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Последняя перенесённая запись журнала'),
+        ),
+        migrations.RunPython(move_timings_watermark, restore_timings_watermark),
+    ]
@@ -3,6 +3,13 @@ from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 
 
+class AliveManager(models.Manager):
+    """Записи без пометки об удалении (помеченные удаляет purge_deleted)"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Test(models.Model):
     """Модель теста"""
     STATUS_CHOICES = [
@@ -51,8 +58,25 @@ class Test(models.Model):
         verbose_name='Таймер (в минутах)',
         help_text='Оставьте пусто для отсутствия ограничения по времени'
     )
+    pool_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        verbose_name='Вопросов в попытке',
+        help_text='Каждый участник получает столько случайных вопросов теста. Оставьте пусто, чтобы задавать все'
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Версия',
+        help_text='Растёт с каждым сохранением конструктора: защита от одновременного редактирования'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлён')
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Удалён')
+    
+    objects = AliveManager()
+    all_objects = models.Manager()
     
     class Meta:
         verbose_name = 'Тест'
@@ -156,6 +180,10 @@ class Participant(models.Model):
     first_name = models.CharField(max_length=100, verbose_name='Имя')
     last_name = models.CharField(max_length=100, verbose_name='Фамилия')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Удалён')
+    
+    objects = AliveManager()
+    all_objects = models.Manager()
     
     class Meta:
         verbose_name = 'Участник'
@@ -186,19 +214,34 @@ class TestResult(models.Model):
     started_at = models.DateTimeField(verbose_name='Начало')
     completed_at = models.DateTimeField(auto_now_add=True, verbose_name='Завершение')
     is_completed = models.BooleanField(default=True, verbose_name='Завершён')
+    answers_packed = models.BinaryField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Ответы участника',
+        help_text='Выбранные ответы и их правильность в упакованном виде (см. test_pr/packing.py)'
+    )
     
     class Meta:
         verbose_name = 'Результат теста'
         verbose_name_plural = 'Результаты тестов'
         ordering = ['-completed_at']
         unique_together = ('test', 'participant')
+        indexes = [
+            # Таблица лидеров: лучшие результаты теста без сортировки всей таблицы
+            models.Index(fields=['test', '-percentage', 'completed_at'], name='result_leaderboard_idx'),
+        ]
     
     def __str__(self):
         return f"{self.participant} - {self.test.title} ({self.percentage}%)"
 
 
 class UserAnswer(models.Model):
-    """Модель ответа пользователя на вопрос"""
+    """
+    Модель ответа пользователя на вопрос (прежний формат хранения).
+    Новые ответы хранятся в TestResult.answers_packed, читать ответы
+    результата - через packing.answers_for_result.
+    """
     test_result = models.ForeignKey(
         TestResult,
         on_delete=models.CASCADE,
@@ -230,3 +273,313 @@ class UserAnswer(models.Model):
     def __str__(self):
         answer_text = self.selected_answer.text if self.selected_answer else "Не ответил"
         return f"{self.test_result.participant} - {answer_text}"
+
+
+class Submission(models.Model):
+    """Очередь отправленных ответов на проверку"""
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Ожидает проверки'),
+        (STATUS_PROCESSING, 'Проверяется'),
+        (STATUS_DONE, 'Проверено'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    test_result = models.OneToOneField(
+        TestResult,
+        on_delete=models.CASCADE,
+        related_name='submission',
+        verbose_name='Результат теста'
+    )
+    payload = models.TextField(
+        verbose_name='Ответы',
+        help_text='Ответы участника в компактном JSON: {"ID вопроса": ID ответа}'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток проверки')
+    claimed_by = models.CharField(max_length=32, blank=True, verbose_name='Обработчик')
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name='Взято в обработку')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+
+    class Meta:
+        verbose_name = 'Отправка на проверку'
+        verbose_name_plural = 'Очередь проверки'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='submission_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} ({self.get_status_display()})"
+
+
+class ScoreBucket(models.Model):
+    """
+    Гистограмма результатов теста: сколько проверенных результатов
+    набрали данный балл. Поддерживается при проверке и удалении
+    результатов, по ней считаются место и процентиль участника.
+    """
+    test = models.ForeignKey(
+        Test,
+        on_delete=models.CASCADE,
+        related_name='score_buckets',
+        verbose_name='Тест'
+    )
+    score = models.PositiveSmallIntegerField(
+        verbose_name='Балл',
+        help_text='Процент правильных ответов с точностью до десятой (0-1000)'
+    )
+    count = models.PositiveIntegerField(default=0, verbose_name='Результатов')
+
+    class Meta:
+        verbose_name = 'Интервал гистограммы результатов'
+        verbose_name_plural = 'Гистограмма результатов'
+        ordering = ['test', '-score']
+        unique_together = ('test', 'score')
+
+    def __str__(self):
+        return f"{self.test_id}: {self.score / 10}% x {self.count}"
+
+
+class ResultRollup(models.Model):
+    """Сводка проверенных результатов теста за период (общие поля)"""
+    HISTOGRAM_BUCKETS = 10
+
+    test = models.ForeignKey(
+        Test,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Тест'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Попыток')
+    score_sum = models.FloatField(default=0, verbose_name='Сумма процентов')
+    histogram = models.JSONField(
+        default=list,
+        verbose_name='Распределение',
+        help_text='Число результатов по интервалам 0-10%, 10-20%, ..., 90-100%'
+    )
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average_score(self):
+        return self.score_sum / self.attempts if self.attempts else 0
+
+
+class HourlyResultStat(ResultRollup):
+    """Почасовая сводка результатов теста"""
+    hour = models.DateTimeField(verbose_name='Час')
+
+    class Meta:
+        verbose_name = 'Сводка за час'
+        verbose_name_plural = 'Сводки по часам'
+        ordering = ['-hour']
+        unique_together = ('test', 'hour')
+        indexes = [
+            models.Index(fields=['hour'], name='hourly_stat_hour_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.test_id} {self.hour:%d.%m.%Y %H}:00"
+
+
+class DailyResultStat(ResultRollup):
+    """Дневная сводка результатов теста"""
+    day = models.DateField(verbose_name='День')
+
+    class Meta:
+        verbose_name = 'Сводка за день'
+        verbose_name_plural = 'Сводки по дням'
+        ordering = ['-day']
+        unique_together = ('test', 'day')
+        indexes = [
+            models.Index(fields=['day'], name='daily_stat_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.test_id} {self.day:%d.%m.%Y}"
+
+
+class RollupWatermark(models.Model):
+    """
+    До какого результата сводки уже посчитаны; для сводок журнала
+    времени на вопросах - до какой записи журнала
+    """
+    name = models.CharField(max_length=50, unique=True, verbose_name='Сводка')
+    last_result_id = models.PositiveBigIntegerField(default=0, verbose_name='Последний учтённый результат')
+    last_event_id = models.PositiveBigIntegerField(default=0, verbose_name='Последняя перенесённая запись журнала')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлена')
+
+    class Meta:
+        verbose_name = 'Отметка сводок'
+        verbose_name_plural = 'Отметки сводок'
+
+    def __str__(self):
+        return f"{self.name}: #{self.last_event_id or self.last_result_id}"
+
+
+class QuestionSignature(models.Model):
+    """
+    MinHash-подпись вопроса (текст вопроса и вариантов ответов)
+    для поиска почти одинаковых вопросов
+    """
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+        verbose_name='Вопрос'
+    )
+    signature = models.BinaryField(verbose_name='Подпись')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлена')
+
+    class Meta:
+        verbose_name = 'Подпись вопроса'
+        verbose_name_plural = 'Подписи вопросов'
+
+    def __str__(self):
+        return f"Подпись вопроса #{self.question_id}"
+
+
+class QuestionBand(models.Model):
+    """
+    Полоса LSH: хэш части MinHash-подписи. Вопросы с совпадающим
+    хэшем хотя бы в одной полосе - кандидаты в дубликаты.
+    """
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Вопрос'
+    )
+    band = models.PositiveSmallIntegerField(verbose_name='Полоса')
+    bucket = models.BigIntegerField(verbose_name='Хэш полосы')
+
+    class Meta:
+        verbose_name = 'Полоса LSH'
+        verbose_name_plural = 'Полосы LSH'
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='question_band_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.question_id}: {self.band}/{self.bucket}"
+
+
+class QuestionTiming(models.Model):
+    """
+    Время, проведённое участником на вопросе (одно открытие вопроса).
+    Журнал только пополняется пачками со страницы прохождения;
+    команда rollup_timings переносит записи в QuestionTimingStat и удаляет их.
+    """
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Вопрос'
+    )
+    duration_ms = models.PositiveIntegerField(verbose_name='Время, мс')
+
+    class Meta:
+        verbose_name = 'Запись времени на вопросе'
+        verbose_name_plural = 'Журнал времени на вопросах'
+
+    def __str__(self):
+        return f"#{self.question_id}: {self.duration_ms} мс"
+
+
+class QuestionTimingStat(models.Model):
+    """Сводка времени на вопросе по всем открытиям"""
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='timing_stat',
+        verbose_name='Вопрос'
+    )
+    views = models.PositiveIntegerField(default=0, verbose_name='Открытий')
+    total_ms = models.PositiveBigIntegerField(default=0, verbose_name='Суммарное время, мс')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлена')
+
+    class Meta:
+        verbose_name = 'Время на вопросе'
+        verbose_name_plural = 'Время на вопросах'
+
+    def __str__(self):
+        return f"Вопрос #{self.question_id}: {self.average_seconds:.1f} с"
+
+    @property
+    def average_seconds(self):
+        return self.total_ms / self.views / 1000 if self.views else 0
+
+
+class DeletionJob(models.Model):
+    """
+    Фоновое удаление теста или участника: объект помечен удалённым,
+    зависимые строки удаляются пачками командой purge_deleted
+    """
+    KIND_TEST = 'test'
+    KIND_PARTICIPANT = 'participant'
+
+    KIND_CHOICES = [
+        (KIND_TEST, 'Тест'),
+        (KIND_PARTICIPANT, 'Участник'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Ожидает'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Завершено'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Что удаляется')
+    object_id = models.PositiveBigIntegerField(verbose_name='ID объекта')
+    title = models.CharField(max_length=255, verbose_name='Название')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name='Статус'
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name='Строк к удалению')
+    deleted = models.PositiveIntegerField(default=0, verbose_name='Удалено строк')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершено')
+
+    class Meta:
+        verbose_name = 'Фоновое удаление'
+        verbose_name_plural = 'Фоновые удаления'
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='deletion_job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.title} ({self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """Процент удалённых строк"""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(self.deleted * 100 // self.total, 99)
@@ -0,0 +1,170 @@
+"""
+Порядок вопросов с промежутками.
+
+Порядок вопроса уникален в тесте (unique_together test, order).
+Номера идут с шагом ORDER_STEP, поэтому перенос вопроса между соседями
+обычно меняет одну строку: новый номер - середина промежутка между ними.
+Когда промежуток исчерпан, тест уплотняется: все вопросы получают
+номера с шагом ORDER_STEP одним UPDATE с CASE WHEN. Новый диапазон
+берётся целиком ниже или выше текущих номеров теста, поэтому
+уникальность не нарушается ни на одной строке UPDATE.
+
+На тех же функциях - массовые действия админки (в начало, в конец,
+сдвиг, перенумерация): новый порядок считается в Python, тест
+записывается одним UPDATE.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Value, When
+
+from .caching import touch_test, touch_tests
+from .models import Question
+
+ORDER_STEP = 1024
+
+
+class StaleOrder(Exception):
+    """Соседи вопроса не соседствуют в тесте - порядок у клиента устарел"""
+
+
+def compact(question_ids, current_orders):
+    """
+    Пронумеровать вопросы теста (все, в порядке question_ids) с шагом
+    ORDER_STEP одним UPDATE. current_orders - текущие номера вопросов теста.
+    Возвращает новые номера {question_id: order}.
+    """
+    count = len(question_ids)
+    lowest = min(current_orders, default=0)
+    highest = max(current_orders, default=0)
+
+    # Ниже текущих номеров, если там хватает места, иначе выше:
+    # номера остаются неотрицательными и не растут бесконечно
+    start = lowest - count * ORDER_STEP
+    if start < 0:
+        start = highest + ORDER_STEP
+
+    new_orders = {question_id: start + i * ORDER_STEP for i, question_id in enumerate(question_ids)}
+    Question.objects.filter(id__in=question_ids).update(order=Case(
+        *[When(id=question_id, then=Value(order)) for question_id, order in new_orders.items()]
+    ))
+    return new_orders
+
+
+def _test_orders(question_ids):
+    """Вопросы тестов, к которым относятся question_ids: {test_id: [(id, order) по порядку]}"""
+    test_ids = Question.objects.filter(id__in=question_ids).values('test_id')
+    tests = defaultdict(list)
+    for question_id, test_id, order in Question.objects.filter(test_id__in=test_ids).order_by(
+        'test_id', 'order', 'id'
+    ).values_list('id', 'test_id', 'order'):
+        tests[test_id].append((question_id, order))
+    return tests
+
+
+def _reorder(question_ids, arrange):
+    """
+    Переставить вопросы тестов выбранных вопросов: arrange(ids теста, выбранные)
+    возвращает новый порядок id. Тест, порядок которого изменился,
+    уплотняется одним UPDATE. Возвращает число переставленных вопросов.
+    """
+    selected = set(question_ids)
+    moved = 0
+    with transaction.atomic():
+        tests = _test_orders(question_ids)
+        changed = []
+        for test_id, rows in tests.items():
+            ids = [question_id for question_id, _ in rows]
+            arranged = arrange(ids, selected)
+            if arranged == ids:
+                continue
+            compact(arranged, [order for _, order in rows])
+            moved += sum(1 for old, new in zip(ids, arranged) if old != new)
+            changed.append(test_id)
+
+        if changed:
+            touch_tests(changed)
+    return moved
+
+
+def move_question(test_id, question_id, after_id=None, before_id=None):
+    """
+    Поставить вопрос между соседями after_id и before_id (None - начало
+    или конец теста). Обычно меняется одна строка; если между соседями
+    нет свободного номера, тест уплотняется.
+    Возвращает (новые номера {question_id: order}, уплотнён ли тест).
+    """
+    with transaction.atomic():
+        rows = list(
+            Question.objects.select_for_update().filter(test_id=test_id)
+            .order_by('order', 'id').values_list('id', 'order')
+        )
+        orders = dict(rows)
+        if question_id not in orders or any(
+            neighbour is not None and (neighbour not in orders or neighbour == question_id)
+            for neighbour in (after_id, before_id)
+        ):
+            raise Question.DoesNotExist('Вопрос не найден в тесте')
+
+        ids = [row_id for row_id, _ in rows if row_id != question_id]
+        position = ids.index(after_id) + 1 if after_id is not None else 0
+        expected_before = ids[position] if position < len(ids) else None
+        if before_id is not None and before_id != expected_before:
+            raise StaleOrder('Порядок вопросов изменился, обновите страницу')
+
+        low = orders[after_id] if after_id is not None else -1
+        high = orders[expected_before] if expected_before is not None else low + 2 * ORDER_STEP
+
+        if high - low > 1:
+            order = (low + high) // 2
+            if order != orders[question_id]:
+                Question.objects.filter(id=question_id).update(order=order)
+                touch_test(test_id)
+            return {question_id: order}, False
+
+        ids.insert(position, question_id)
+        new_orders = compact(ids, list(orders.values()))
+        touch_test(test_id)
+        return new_orders, True
+
+
+def move_to_top(question_ids):
+    """Выбранные вопросы - в начало теста (между собой - в прежнем порядке)"""
+    return _reorder(question_ids, lambda ids, selected: (
+        [i for i in ids if i in selected] + [i for i in ids if i not in selected]
+    ))
+
+
+def move_to_bottom(question_ids):
+    """Выбранные вопросы - в конец теста"""
+    return _reorder(question_ids, lambda ids, selected: (
+        [i for i in ids if i not in selected] + [i for i in ids if i in selected]
+    ))
+
+
+def shift(question_ids, step):
+    """
+    Сдвинуть выбранные вопросы на одну позицию: step < 0 - выше, step > 0 - ниже.
+    Стоящие рядом выбранные вопросы сдвигаются вместе.
+    """
+    def arrange(ids, selected):
+        ids = list(ids)
+        positions = range(1, len(ids)) if step < 0 else range(len(ids) - 2, -1, -1)
+        neighbour = -1 if step < 0 else 1
+        for i in positions:
+            if ids[i] in selected and ids[i + neighbour] not in selected:
+                ids[i], ids[i + neighbour] = ids[i + neighbour], ids[i]
+        return ids
+
+    return _reorder(question_ids, arrange)
+
+
+def renumber(question_ids):
+    """Уплотнить номера вопросов тестов (шаг ORDER_STEP), сохранив порядок"""
+    with transaction.atomic():
+        tests = _test_orders(question_ids)
+        for rows in tests.values():
+            compact([question_id for question_id, _ in rows], [order for _, order in rows])
+        touch_tests(tests)
+    return sum(len(rows) for rows in tests.values())
@@ -0,0 +1,104 @@
+"""
+Упакованные ответы попытки.
+
+Вместо строки UserAnswer на каждый вопрос ответы попытки хранятся
+в одном двоичном столбце TestResult.answers_packed:
+
+    заголовок  <BBI: версия формата, ширина ID (4 или 8 байт), число вопросов
+    ID вопросов в порядке вопросов теста
+    ID выбранных ответов (0 - нет ответа)
+    битовая карта правильности (бит i - вопрос i)
+
+Результаты, сохранённые до перехода (ещё не переведённые миграцией 0010),
+читаются из UserAnswer: answers_for_result возвращает один и тот же вид
+для обоих вариантов хранения.
+"""
+
+import struct
+
+from .models import Question
+
+# Миграция 0010 хранит копию формата версии 1: новый формат - новая версия
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BBI')
+ID_FORMATS = {4: 'I', 8: 'Q'}
+
+
+def pack_answers(graded):
+    """graded - тройки (question_id, answer_id или None, is_correct) в порядке вопросов"""
+    graded = list(graded)
+    count = len(graded)
+    largest = max((max(question_id, answer_id or 0) for question_id, answer_id, _ in graded), default=0)
+    width = 4 if largest < 2 ** 32 else 8
+    code = ID_FORMATS[width]
+
+    bitmap = bytearray((count + 7) // 8)
+    for i, (_, _, is_correct) in enumerate(graded):
+        if is_correct:
+            bitmap[i // 8] |= 1 << (i % 8)
+
+    return (
+        HEADER.pack(FORMAT_VERSION, width, count)
+        + struct.pack(f'<{count}{code}', *(question_id for question_id, _, _ in graded))
+        + struct.pack(f'<{count}{code}', *(answer_id or 0 for _, answer_id, _ in graded))
+        + bytes(bitmap)
+    )
+
+
+def unpack_answers(data):
+    """Обратно в тройки (question_id, answer_id или None, is_correct)"""
+    data = bytes(data)
+    version, width, count = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Неизвестная версия упакованных ответов: {version}')
+
+    ids = struct.Struct(f'<{count}{ID_FORMATS[width]}')
+    question_ids = ids.unpack_from(data, HEADER.size)
+    answer_ids = ids.unpack_from(data, HEADER.size + ids.size)
+    bitmap = data[HEADER.size + 2 * ids.size:]
+
+    return [
+        (question_id, answer_id or None, bool(bitmap[i // 8] & (1 << (i % 8))))
+        for i, (question_id, answer_id) in enumerate(zip(question_ids, answer_ids))
+    ]
+
+
+class StoredAnswer:
+    """Ответ на вопрос попытки - те же поля, что у UserAnswer"""
+    __slots__ = ('question_id', 'selected_answer_id', 'is_correct', 'question', 'selected_answer')
+
+    def __init__(self, question, selected_answer, is_correct):
+        self.question = question
+        self.question_id = question.id
+        self.selected_answer = selected_answer
+        self.selected_answer_id = selected_answer.id if selected_answer else None
+        self.is_correct = is_correct
+
+
+def answers_for_result(result):
+    """
+    Ответы результата по порядку вопросов, с вопросом (и его вариантами
+    в prefetch-кэше) и выбранным ответом. Удалённые вопросы пропускаются,
+    удалённый выбранный ответ - как «не ответил», как и у UserAnswer.
+    """
+    if result.answers_packed is None:
+        return list(
+            result.user_answers.select_related('question', 'selected_answer')
+            .prefetch_related('question__answers').order_by('question__order')
+        )
+
+    graded = unpack_answers(result.answers_packed)
+    questions = Question.objects.prefetch_related('answers').in_bulk(
+        [question_id for question_id, _, _ in graded]
+    )
+
+    answers = []
+    for question_id, answer_id, is_correct in graded:
+        question = questions.get(question_id)
+        if question is None:
+            continue
+        selected = next((answer for answer in question.answers.all() if answer.id == answer_id), None)
+        answers.append(StoredAnswer(question, selected, is_correct))
+
+    answers.sort(key=lambda answer: answer.question.order)
+    return answers
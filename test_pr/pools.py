@@ -0,0 +1,51 @@
+"""
+Случайный набор вопросов для каждой попытки (Test.pool_size).
+
+Вопросы выбираются из списка вопросов теста в кэше генератором
+со своим зерном для пары (тест, участник): набор воспроизводится
+по зерну при показе и при проверке, без хранения в БД и без
+ORDER BY RANDOM(). Выбор стоит O(pool_size), а не O(размер теста).
+"""
+
+import random
+
+from django.utils.crypto import salted_hmac
+
+
+def attempt_seed(test_id, participant_id):
+    """Зерно попытки: участник не может подобрать его сам (зависит от SECRET_KEY)"""
+    return int(salted_hmac('test_pr.pools', f'{test_id}:{participant_id}').hexdigest()[:16], 16)
+
+
+def draw_positions(total, pool_size, test_id, participant_id):
+    """
+    Позиции вопросов попытки в списке вопросов теста (по возрастанию),
+    None - если задаются все вопросы.
+    """
+    if not pool_size or pool_size >= total:
+        return None
+    positions = random.Random(attempt_seed(test_id, participant_id)).sample(range(total), pool_size)
+    return sorted(positions)
+
+
+def attempt_question_ids(answer_key, test_id, participant_id):
+    """ID вопросов попытки участника по ключу ответов теста"""
+    question_ids = answer_key['question_ids']
+    positions = draw_positions(len(question_ids), answer_key.get('pool_size'), test_id, participant_id)
+    if positions is None:
+        return question_ids
+    return [question_ids[position] for position in positions]
+
+
+def attempt_sheet(sheet, participant_id):
+    """Лист теста только с вопросами попытки участника"""
+    questions = sheet['questions']
+    positions = draw_positions(len(questions), sheet.get('pool_size'), sheet['id'], participant_id)
+    if positions is None:
+        return sheet
+    return {**sheet, 'questions': [questions[position] for position in positions]}
+
+
+def attempt_tag(sheet, participant_id):
+    """Суффикс ETag и ключей кэша: у наборов вопросов разных участников своя версия"""
+    return f'-p{participant_id}' if sheet.get('pool_size') else ''
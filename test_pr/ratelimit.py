@@ -0,0 +1,187 @@
+"""
+Ограничение частоты запросов участника.
+
+Маркерная корзина в виде GCRA: для каждого ключа (участник, сессия
+или IP) в кэше хранится одно число - теоретическое время прихода
+следующего запроса (TAT). Запрос принимается, если TAT опережает
+текущее время не больше чем на burst интервалов. Так корзина на
+burst запросов пополняется со скоростью rate, а состояние ключа -
+одно значение с временем жизни не больше заполнения корзины.
+
+На Redis проверка и обновление TAT - один Lua-скрипт со временем
+сервера Redis, поэтому лимит общий для всех воркеров и атомарен
+между процессами. На других общих кэшах - чтение и запись под
+блокировкой процесса (между процессами лимит может быть превышен
+на несколько запросов). Локальный кэш (LocMemCache, без REDIS_URL)
+у каждого процесса свой: каждый воркер считает лимит отдельно, и
+N воркеров пропускают до N лимитов - об этом предупреждает проверка
+test_pr.W001.
+
+Лимиты задаются настройкой RATE_LIMITS по имени view; проверка
+выполняется в декораторе до кода view, то есть до запросов к БД.
+"""
+
+import functools
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpResponse, JsonResponse
+
+from .sessions import PARTICIPANT_ID_KEY
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600}
+
+KEY_PREFIX = 'ratelimit'
+
+_GCRA_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local wait = new_tat - now - capacity
+if wait > 0 then
+    return math.ceil(wait)
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return 0
+"""
+
+_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """'30/m' -> интервал между запросами в миллисекундах"""
+    count, _, period = rate.partition('/')
+    return PERIODS[period] * 1000 / int(count)
+
+
+def _acquire_redis(key, interval, capacity):
+    client = cache._cache.get_client(key, write=True)
+    return client.eval(_GCRA_SCRIPT, 1, cache.make_and_validate_key(key), interval, capacity)
+
+
+def _acquire_local(key, interval, capacity):
+    with _lock:
+        now = time.time() * 1000
+        tat = max(cache.get(key, now), now)
+        new_tat = tat + interval
+        wait = new_tat - now - capacity
+        if wait > 0:
+            return wait
+        cache.set(key, new_tat, math.ceil((new_tat - now) / 1000))
+        return 0
+
+
+def acquire(key, interval, capacity):
+    """
+    Взять маркер из корзины ключа. Возвращает 0, если запрос
+    принят, иначе сколько миллисекунд ждать следующего маркера.
+    """
+    if isinstance(caches['default'], RedisCache):
+        return _acquire_redis(key, interval, capacity)
+    return _acquire_local(key, interval, capacity)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """Системная проверка: лимит без общего кэша действует в пределах процесса"""
+    if not settings.RATE_LIMIT_ENABLED or not settings.RATE_LIMITS:
+        return []
+    if not isinstance(caches['default'], (LocMemCache, DummyCache)):
+        return []
+    return [checks.Warning(
+        'Ограничение частоты запросов работает на локальном кэше процесса: '
+        'каждый воркер считает лимит отдельно',
+        hint='Задайте REDIS_URL, чтобы лимит был общим для всех воркеров, '
+             'или запускайте один процесс',
+        id='test_pr.W001',
+    )]
+
+
+def client_ip(request):
+    """IP клиента; за прокси - последний адрес из заголовка RATE_LIMIT_IP_HEADER"""
+    header = settings.RATE_LIMIT_IP_HEADER
+    if header and request.META.get(header):
+        return request.META[header].split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _identities(request, keys):
+    """Ключи корзин запроса; если ни один не определён - IP"""
+    identities = []
+    for name in keys:
+        if name == 'participant':
+            value = request.session.get(PARTICIPANT_ID_KEY)
+        elif name == 'session':
+            # У подписанных cookie ключа сессии нет
+            value = request.session.session_key
+        else:
+            value = client_ip(request)
+        if value:
+            identities.append(f'{name}:{value}')
+    return identities or [f'ip:{client_ip(request)}']
+
+
+def check(request, name):
+    """
+    Проверить лимит view name для запроса.
+    Возвращает None или сколько секунд ждать (запрос отклоняется).
+    """
+    limit = settings.RATE_LIMITS.get(name)
+    if not settings.RATE_LIMIT_ENABLED or not limit:
+        return None
+    if request.method not in limit.get('methods', ['POST']):
+        return None
+
+    interval = parse_rate(limit['rate'])
+    capacity = interval * limit.get('burst', 1)
+    wait = 0
+    for identity in _identities(request, limit.get('keys', ['ip'])):
+        wait = max(wait, acquire(f'{KEY_PREFIX}:{name}:{identity}', interval, capacity))
+    return math.ceil(wait / 1000) if wait else None
+
+
+def too_many_requests(request, retry_after):
+    """Ответ по умолчанию: 429 с Retry-After (JSON для AJAX-запросов)"""
+    message = f'Слишком много запросов, повторите через {retry_after} с'
+    if request.content_type == 'application/json':
+        response = JsonResponse({'success': False, 'error': message}, status=429)
+    else:
+        response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(name, rejected=too_many_requests):
+    """
+    Декоратор view (синхронной или асинхронной): запросы сверх
+    RATE_LIMITS[name] получают ответ rejected(request, retry_after)
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            async def wrapper(request, *args, **kwargs):
+                retry_after = await sync_to_async(check)(request, name)
+                if retry_after:
+                    return rejected(request, retry_after)
+                return await view(request, *args, **kwargs)
+        else:
+            def wrapper(request, *args, **kwargs):
+                retry_after = check(request, name)
+                if retry_after:
+                    return rejected(request, retry_after)
+                return view(request, *args, **kwargs)
+
+        return functools.wraps(view)(wrapper)
+    return decorator
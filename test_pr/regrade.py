@@ -0,0 +1,176 @@
+"""
+Перепроверка результатов теста после исправления ключа ответов.
+
+Правильность ответа берётся из текущего Answer.is_correct выбранного
+варианта. Результаты прежнего формата пересчитываются двумя UPDATE
+на весь тест: правильность строк UserAnswer и баллы TestResult
+по подзапросу. Упакованные ответы (answers_packed) распаковываются
+пачками и записываются одним bulk_update на пачку. Гистограмма мест
+и сводки аналитики меняются только для результатов, у которых
+изменился балл; кэш страниц сбрасывается у всех результатов теста -
+на странице видна правильность каждого ответа.
+"""
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .caching import build_answer_key, invalidate_results
+from .db import retry_on_locked
+from .grading import calculate_percentage
+from .leaderboard import forget_scores, record_scores
+from .models import Answer, TestResult, UserAnswer
+from .packing import pack_answers, unpack_answers
+from .rollups import adjust_rollups
+
+BATCH_SIZE = 500
+
+
+def _correct_now():
+    """Правильность выбранного ответа строки UserAnswer по текущему ключу"""
+    return Coalesce(
+        Subquery(
+            Answer.objects.filter(
+                id=OuterRef('selected_answer_id'),
+                question_id=OuterRef('question_id')
+            ).values('is_correct')[:1]
+        ),
+        Value(False)
+    )
+
+
+def _legacy_correct_count():
+    """Число правильных ответов результата прежнего формата по текущему ключу"""
+    return Coalesce(
+        Subquery(
+            UserAnswer.objects.filter(
+                test_result=OuterRef('pk'),
+                selected_answer__is_correct=True,
+                selected_answer__question_id=F('question_id')
+            ).values('test_result').annotate(count=Count('id')).values('count')
+        ),
+        Value(0)
+    )
+
+
+def _change(row, correct_answers):
+    return {
+        'result_id': row['id'],
+        'participant': f"{row['participant__first_name']} {row['participant__last_name']}",
+        'test_id': row['test_id'],
+        'completed_at': row['completed_at'],
+        'total_questions': row['total_questions'],
+        'old_correct': row['correct_answers'],
+        'new_correct': correct_answers,
+        'old_percentage': row['percentage'],
+        'new_percentage': calculate_percentage(correct_answers, row['total_questions']),
+    }
+
+
+RESULT_FIELDS = (
+    'id', 'test_id', 'participant__first_name', 'participant__last_name',
+    'completed_at', 'total_questions', 'correct_answers', 'percentage',
+)
+
+
+def _regraded_packed(data, answers):
+    """Упакованные ответы с правильностью по ключу answers и число правильных"""
+    graded = [
+        (question_id, answer_id, answer_id in answers and answers[answer_id] == (question_id, True))
+        for question_id, answer_id, _ in unpack_answers(data)
+    ]
+    return pack_answers(graded), sum(1 for _, _, is_correct in graded if is_correct)
+
+
+def _packed_batches(test_id, answers):
+    """
+    Пачки упакованных результатов теста: (строки результатов,
+    {result_id: (новые упакованные ответы, правильных)})
+    """
+    last_id = 0
+    while True:
+        rows = list(
+            TestResult.objects.filter(
+                test_id=test_id, is_completed=True, answers_packed__isnull=False, id__gt=last_id
+            ).order_by('id').values(*RESULT_FIELDS, 'answers_packed')[:BATCH_SIZE]
+        )
+        if not rows:
+            return
+        last_id = rows[-1]['id']
+        yield rows, {row['id']: _regraded_packed(row['answers_packed'], answers) for row in rows}
+
+
+def diff(test_id):
+    """
+    Результаты теста, балл которых изменится при перепроверке,
+    без записи в БД: словари с участником и старым и новым баллом.
+    """
+    answer_key = build_answer_key(test_id)
+    if not answer_key:
+        return []
+
+    changes = [
+        _change(row, row['new_correct'])
+        for row in TestResult.objects.filter(
+            test_id=test_id, is_completed=True, answers_packed__isnull=True
+        ).annotate(new_correct=_legacy_correct_count()).values(*RESULT_FIELDS, 'new_correct')
+        if row['new_correct'] != row['correct_answers']
+    ]
+    for rows, regraded in _packed_batches(test_id, answer_key['answers']):
+        changes.extend(
+            _change(row, regraded[row['id']][1])
+            for row in rows
+            if regraded[row['id']][1] != row['correct_answers']
+        )
+    changes.sort(key=lambda change: change['result_id'])
+    return changes
+
+
+@retry_on_locked
+def regrade(test_id):
+    """
+    Перепроверить все результаты теста. Возвращает изменения, как diff.
+    Тест, помеченный удалённым, не перепроверяется: ключа ответов у него
+    нет, и все ответы стали бы неверными (результаты удалит purge_deleted)
+    """
+    with transaction.atomic():
+        answer_key = build_answer_key(test_id)
+        if not answer_key:
+            return []
+        changes = diff(test_id)
+        answers = answer_key['answers']
+
+        # Прежний формат: правильность ответов и баллы - по одному UPDATE
+        UserAnswer.objects.filter(test_result__test_id=test_id).update(is_correct=_correct_now())
+        correct = _legacy_correct_count()
+        TestResult.objects.filter(
+            test_id=test_id, is_completed=True, answers_packed__isnull=True
+        ).update(
+            correct_answers=correct,
+            percentage=Case(
+                When(total_questions__gt=0, then=Cast(correct, FloatField()) / F('total_questions') * 100),
+                default=Value(0.0),
+            ),
+        )
+
+        # Упакованные ответы: по одному bulk_update на пачку
+        for rows, regraded in _packed_batches(test_id, answers):
+            results = []
+            for row in rows:
+                packed, correct_answers = regraded[row['id']]
+                if packed == bytes(row['answers_packed']):
+                    continue
+                results.append(TestResult(
+                    id=row['id'],
+                    answers_packed=packed,
+                    correct_answers=correct_answers,
+                    percentage=calculate_percentage(correct_answers, row['total_questions']),
+                ))
+            TestResult.objects.bulk_update(results, ['answers_packed', 'correct_answers', 'percentage'])
+
+        forget_scores([(change['test_id'], change['old_percentage']) for change in changes])
+        record_scores([(change['test_id'], change['new_percentage']) for change in changes])
+        adjust_rollups(changes)
+        invalidate_results(TestResult.objects.filter(test_id=test_id).values_list('id', flat=True))
+
+    return changes
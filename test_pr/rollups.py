@@ -0,0 +1,276 @@
+"""
+Почасовые и дневные сводки результатов для аналитики.
+
+Команда `manage.py rollup_results` добавляет в сводки только результаты
+новее отметки (RollupWatermark), поэтому отчёты не читают всю таблицу
+TestResult. Отметка не обгоняет результаты, ожидающие проверки
+в очереди: они попадут в сводку, когда будут проверены.
+
+ID результата выдаётся при вставке, а виден он после фиксации
+транзакции, поэтому на PostgreSQL результат с меньшим ID может появиться
+позже результата с большим. Отметка не обгоняет результаты моложе
+SETTLE_SECONDS: к этому времени транзакции с меньшими ID уже
+зафиксированы, и ни один результат не остаётся за отметкой неучтённым.
+Удаление результатов сводки не уменьшает - это история попыток.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    TestResult, Submission, HourlyResultStat, DailyResultStat,
+    ResultRollup, RollupWatermark,
+)
+from .db import retry_on_locked
+
+WATERMARK_NAME = 'results'
+
+# Дольше транзакция сохранения результата не длится (с повторами при блокировке)
+SETTLE_SECONDS = 60
+
+
+def histogram_bucket(percentage):
+    return min(int(percentage // 10), ResultRollup.HISTOGRAM_BUCKETS - 1)
+
+
+def _first_pending_result_id(after_id):
+    """Первый результат в очереди проверки после отметки"""
+    return TestResult.objects.filter(
+        id__gt=after_id,
+        is_completed=False,
+        submission__status__in=[Submission.STATUS_PENDING, Submission.STATUS_PROCESSING]
+    ).order_by('id').values_list('id', flat=True).first()
+
+
+def _first_recent_result_id(after_id):
+    """Первый результат после отметки моложе SETTLE_SECONDS"""
+    return TestResult.objects.filter(
+        id__gt=after_id,
+        completed_at__gte=timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    ).order_by('id').values_list('id', flat=True).first()
+
+
+def _add(totals, key, percentage):
+    attempts, score_sum, histogram = totals.get(key) or (0, 0.0, [0] * ResultRollup.HISTOGRAM_BUCKETS)
+    histogram[histogram_bucket(percentage)] += 1
+    totals[key] = (attempts + 1, score_sum + percentage, histogram)
+
+
+def _merge(model, period_field, totals):
+    """Прибавить посчитанные итоги к строкам сводки (новые строки создаются)"""
+    if not totals:
+        return
+
+    existing = {
+        (row.test_id, getattr(row, period_field)): row
+        for row in model.objects.filter(
+            test_id__in={test_id for test_id, period in totals},
+            **{f'{period_field}__in': {period for test_id, period in totals}}
+        )
+    }
+
+    changed = []
+    created = []
+    for (test_id, period), (attempts, score_sum, histogram) in totals.items():
+        row = existing.get((test_id, period))
+        if row is None:
+            created.append(model(
+                test_id=test_id,
+                attempts=attempts,
+                score_sum=score_sum,
+                histogram=histogram,
+                **{period_field: period}
+            ))
+            continue
+
+        row.attempts += attempts
+        row.score_sum += score_sum
+        row.histogram = [
+            old + new
+            for old, new in zip(row.histogram or [0] * ResultRollup.HISTOGRAM_BUCKETS, histogram)
+        ]
+        changed.append(row)
+
+    model.objects.bulk_update(changed, ['attempts', 'score_sum', 'histogram'])
+    model.objects.bulk_create(created)
+
+
+@retry_on_locked
+def rollup_batch(batch_size):
+    """
+    Добавить в сводки следующую пачку результатов после отметки.
+    Возвращает количество просмотренных результатов (0 - всё учтено).
+    """
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+
+        results = TestResult.objects.filter(id__gt=watermark.last_result_id)
+        stop_ids = [
+            result_id
+            for result_id in (
+                _first_pending_result_id(watermark.last_result_id),
+                _first_recent_result_id(watermark.last_result_id),
+            )
+            if result_id
+        ]
+        if stop_ids:
+            results = results.filter(id__lt=min(stop_ids))
+
+        rows = list(
+            results.order_by('id').values_list(
+                'id', 'test_id', 'percentage', 'completed_at', 'is_completed'
+            )[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        hourly = {}
+        daily = {}
+        for result_id, test_id, percentage, completed_at, is_completed in rows:
+            # Непроверенный результат вне очереди - отправка с ошибкой проверки
+            if not is_completed:
+                continue
+            local = timezone.localtime(completed_at)
+            _add(hourly, (test_id, local.replace(minute=0, second=0, microsecond=0)), percentage)
+            _add(daily, (test_id, local.date()), percentage)
+
+        _merge(HourlyResultStat, 'hour', hourly)
+        _merge(DailyResultStat, 'day', daily)
+
+        watermark.last_result_id = rows[-1][0]
+        watermark.save(update_fields=['last_result_id', 'updated_at'])
+
+    return len(rows)
+
+
+def _shift(model, period_field, shifts):
+    """Сдвинуть сумму и распределение строк сводки: shifts - {(test_id, период): [(старый %, новый %)]}"""
+    rows = model.objects.filter(
+        test_id__in={test_id for test_id, period in shifts},
+        **{f'{period_field}__in': {period for test_id, period in shifts}}
+    )
+    changed = []
+    for row in rows:
+        moves = shifts.get((row.test_id, getattr(row, period_field)))
+        if not moves:
+            continue
+        histogram = list(row.histogram or [0] * ResultRollup.HISTOGRAM_BUCKETS)
+        for old, new in moves:
+            row.score_sum += new - old
+            histogram[histogram_bucket(old)] -= 1
+            histogram[histogram_bucket(new)] += 1
+        row.histogram = histogram
+        changed.append(row)
+    model.objects.bulk_update(changed, ['score_sum', 'histogram'])
+
+
+def adjust_rollups(changes):
+    """
+    Учесть в сводках перепроверку: changes - словари с result_id, test_id,
+    completed_at, old_percentage и new_percentage. Результаты новее
+    отметки ещё не в сводках и попадут в них с новым баллом.
+    """
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+    if watermark is None:
+        return
+
+    hourly = {}
+    daily = {}
+    for change in changes:
+        if change['result_id'] > watermark.last_result_id:
+            continue
+        local = timezone.localtime(change['completed_at'])
+        move = (change['old_percentage'], change['new_percentage'])
+        hourly.setdefault((change['test_id'], local.replace(minute=0, second=0, microsecond=0)), []).append(move)
+        daily.setdefault((change['test_id'], local.date()), []).append(move)
+
+    if hourly:
+        _shift(HourlyResultStat, 'hour', hourly)
+        _shift(DailyResultStat, 'day', daily)
+
+
+def reset_rollups():
+    """Удалить сводки и отметку, чтобы посчитать всё заново"""
+    with transaction.atomic():
+        HourlyResultStat.objects.all().delete()
+        DailyResultStat.objects.all().delete()
+        RollupWatermark.objects.filter(name=WATERMARK_NAME).delete()
+
+
+def _bars(values):
+    """Значения со шириной полосы в процентах от максимального"""
+    top = max(values, default=0) or 1
+    return [{'value': value, 'width': round(value * 100 / top)} for value in values]
+
+
+def dashboard_data(days):
+    """
+    Данные страницы аналитики за последние days дней - только из сводок:
+    попытки и средний балл по дням, тесты с распределением баллов
+    и динамикой среднего, попытки по часам суток.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    period = [since + timedelta(days=n) for n in range(days)]
+
+    totals = {day: [0, 0.0] for day in period}
+    tests = {}
+    for row in DailyResultStat.objects.filter(day__gte=since).select_related('test'):
+        totals[row.day][0] += row.attempts
+        totals[row.day][1] += row.score_sum
+
+        test = tests.setdefault(row.test_id, {
+            'title': row.test.title,
+            'attempts': 0,
+            'score_sum': 0.0,
+            'histogram': [0] * ResultRollup.HISTOGRAM_BUCKETS,
+            'by_day': {},
+        })
+        test['attempts'] += row.attempts
+        test['score_sum'] += row.score_sum
+        test['histogram'] = [old + new for old, new in zip(test['histogram'], row.histogram)]
+        test['by_day'][row.day] = row.average_score
+
+    hours = [0] * 24
+    since_hour = timezone.make_aware(datetime.combine(since, time.min))
+    for hour, attempts in HourlyResultStat.objects.filter(hour__gte=since_hour).values_list('hour', 'attempts'):
+        hours[timezone.localtime(hour).hour] += attempts
+
+    daily = [
+        {
+            'day': day,
+            'attempts': bar['value'],
+            'width': bar['width'],
+            'average': totals[day][1] / totals[day][0] if totals[day][0] else None,
+        }
+        for day, bar in zip(period, _bars([totals[day][0] for day in period]))
+    ]
+
+    test_rows = []
+    for test in sorted(tests.values(), key=lambda test: -test['attempts']):
+        test_rows.append({
+            'title': test['title'],
+            'attempts': test['attempts'],
+            'average': test['score_sum'] / test['attempts'] if test['attempts'] else 0,
+            'histogram': [
+                {'label': f'{n * 10}-{n * 10 + 10}%', **bar}
+                for n, bar in enumerate(_bars(test['histogram']))
+            ],
+            'trend': [
+                {'day': day, 'average': test['by_day'].get(day)}
+                for day in period
+            ],
+        })
+
+    return {
+        'days': days,
+        'daily': daily,
+        'tests': test_rows,
+        'hours': [
+            {'hour': hour, 'attempts': bar['value'], 'width': bar['width']}
+            for hour, bar in enumerate(_bars(hours))
+        ],
+        'attempts': sum(day['attempts'] for day in daily),
+        'watermark': RollupWatermark.objects.filter(name=WATERMARK_NAME).first(),
+    }
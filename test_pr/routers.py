@@ -0,0 +1,102 @@
+"""
+Чтение отчётов с реплики БД.
+
+Тяжёлые чтения админки (списки результатов, ответов, тестов, вопросов
+и участников со статистикой, аналитика)
+выполняются на реплике (settings.REPORTING_DATABASE), чтобы не мешать
+записи результатов участников. После записи в той же сессии чтения
+REPLICA_STICKY_SECONDS секунд идут в основную БД, чтобы администратор
+видел свои изменения.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+WRITE_AT_SESSION_KEY = 'db_write_at'
+
+_read_alias = ContextVar('reporting_read_alias', default=None)
+
+
+def reporting_database():
+    """Псевдоним БД для отчётов (None, если реплика не настроена)"""
+    alias = getattr(settings, 'REPORTING_DATABASE', None)
+    if alias and alias in settings.DATABASES:
+        return alias
+    return None
+
+
+def is_pinned_to_primary(request):
+    """Была ли запись в этой сессии недавно"""
+    if request is None or not hasattr(request, 'session'):
+        return False
+    written_at = request.session.get(WRITE_AT_SESSION_KEY)
+    return bool(written_at) and time.time() - written_at < settings.REPLICA_STICKY_SECONDS
+
+
+@contextmanager
+def reporting_reads(request=None):
+    """Направить чтения внутри блока на реплику"""
+    alias = reporting_database()
+    if not alias or is_pinned_to_primary(request):
+        yield DEFAULT_DB_ALIAS
+        return
+
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Чтения в блоке reporting_reads() - с реплики, все записи - в основную БД"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и основная БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
+
+
+class ReplicaStickinessMiddleware:
+    """Запоминает время записи персонала, чтобы следующие чтения шли в основную БД"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            reporting_database()
+            and request.method not in ('GET', 'HEAD', 'OPTIONS')
+            and getattr(request, 'user', None) is not None
+            and request.user.is_staff
+        ):
+            request.session[WRITE_AT_SESSION_KEY] = time.time()
+        return response
+
+
+class ReportingAdminMixin:
+    """Списки ModelAdmin читаются с реплики"""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+
+        with reporting_reads(request):
+            response = super().changelist_view(request, extra_context)
+            # Строки списка читаются при отрисовке шаблона - рендерим внутри блока
+            if hasattr(response, 'render'):
+                response.render()
+            return response
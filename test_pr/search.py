@@ -0,0 +1,209 @@
+"""
+Полнотекстовый поиск вопросов и ответов для админки.
+
+Индекс хранится в отдельных таблицах: в SQLite - виртуальные таблицы
+FTS5, в PostgreSQL - столбцы tsvector с GIN-индексом (схема -
+в миграции 0007). Строки индекса обновляются сигналами при сохранении
+и удалении тестов, вопросов и ответов. Поиск - по всем словам запроса
+с совпадением по началу слова, результаты упорядочены по релевантности.
+На других СУБД используется обычный поиск админки (icontains).
+"""
+
+import re
+
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+QUESTION_INDEX = 'test_pr_question_search'
+ANSWER_INDEX = 'test_pr_answer_search'
+
+# Минимальная длина слова для поиска по началу слова
+MIN_PREFIX_LENGTH = 2
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Документы индекса: откуда берутся и какие столбцы входят
+# (в порядке важности для ранжирования)
+DOCUMENTS = {
+    QUESTION_INDEX: {
+        'from': 'test_pr_question q JOIN test_pr_test t ON t.id = q.test_id',
+        'id': 'q.id',
+        'columns': ['q.text', 't.title'],
+        'fts_columns': ['text', 'test_title'],
+    },
+    ANSWER_INDEX: {
+        'from': (
+            'test_pr_answer a '
+            'JOIN test_pr_question q ON q.id = a.question_id '
+            'JOIN test_pr_test t ON t.id = q.test_id'
+        ),
+        'id': 'a.id',
+        'columns': ['a.text', 'q.text', 't.title'],
+        'fts_columns': ['text', 'question_text', 'test_title'],
+    },
+}
+
+# Веса столбцов для ранжирования
+SQLITE_RANK = {
+    QUESTION_INDEX: f'bm25({QUESTION_INDEX}, 10.0, 2.0)',
+    ANSWER_INDEX: f'bm25({ANSWER_INDEX}, 10.0, 3.0, 1.0)',
+}
+POSTGRES_WEIGHTS = 'ABC'
+
+
+def is_supported(using=None):
+    vendor = (using or connection).vendor
+    return vendor in ('sqlite', 'postgresql')
+
+
+def _reindex(cursor, table, where, params):
+    """Пересобрать строки индекса документов, выбранных условием where"""
+    document = DOCUMENTS[table]
+    source = f"FROM {document['from']} WHERE {where}"
+
+    if cursor.db.vendor == 'sqlite':
+        cursor.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT {document['id']} {source})",
+            params
+        )
+        cursor.execute(
+            f"INSERT INTO {table} (rowid, {', '.join(document['fts_columns'])}) "
+            f"SELECT {document['id']}, {', '.join(document['columns'])} {source}",
+            params
+        )
+        return
+
+    vector = ' || '.join(
+        f"setweight(to_tsvector('simple', {column}), '{weight}')"
+        for column, weight in zip(document['columns'], POSTGRES_WEIGHTS)
+    )
+    cursor.execute(
+        f"INSERT INTO {table} (object_id, document) "
+        f"SELECT {document['id']}, {vector} {source} "
+        f"ON CONFLICT (object_id) DO UPDATE SET document = EXCLUDED.document",
+        params
+    )
+
+
+def index_questions(where, params=()):
+    """
+    Обновить индекс вопросов и их ответов (в документ ответа входит текст вопроса).
+    where - условие на таблицы q (вопрос) и t (тест).
+    """
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        _reindex(cursor, QUESTION_INDEX, where, params)
+        _reindex(cursor, ANSWER_INDEX, where, params)
+
+
+def index_answers(where, params=()):
+    """Обновить индекс ответов; where - условие на таблицы a, q и t"""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        _reindex(cursor, ANSWER_INDEX, where, params)
+
+
+def rebuild_index(using=None):
+    """Пересобрать весь индекс (после миграции или массовых изменений в обход сигналов)"""
+    using = using or connection
+    if not is_supported(using):
+        return
+    with using.cursor() as cursor:
+        for table in (QUESTION_INDEX, ANSWER_INDEX):
+            cursor.execute(f'DELETE FROM {table}')
+            _reindex(cursor, table, '1 = 1', ())
+
+
+def unindex(table, object_ids):
+    """Удалить документы из индекса"""
+    if not is_supported() or not object_ids:
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'object_id'
+    placeholders = ', '.join(['%s'] * len(object_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', list(object_ids))
+
+
+def build_query(term, vendor):
+    """
+    Запрос к индексу: все слова, последнее и длинные - по началу слова.
+    None, если в строке нет слов.
+    """
+    words = [word.lower() for word in WORD_RE.findall(term)]
+    if not words:
+        return None
+
+    if vendor == 'sqlite':
+        return ' '.join(
+            f'"{word}"*' if len(word) >= MIN_PREFIX_LENGTH else f'"{word}"'
+            for word in words
+        )
+    return ' & '.join(
+        f'{word}:*' if len(word) >= MIN_PREFIX_LENGTH else word
+        for word in words
+    )
+
+
+def search(queryset, table, term):
+    """
+    Отфильтровать queryset вопросов или ответов по индексу table
+    и упорядочить по релевантности. None - если поиск по индексу
+    недоступен и нужно использовать обычный поиск.
+    """
+    vendor = connection.vendor
+    if not is_supported():
+        return None
+    query = build_query(term, vendor)
+    if query is None:
+        return None
+
+    db_table = queryset.model._meta.db_table
+    if vendor == 'sqlite':
+        matched = RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [query])
+        rank = RawSQL(
+            f'SELECT {SQLITE_RANK[table]} FROM {table} '
+            f'WHERE {table} MATCH %s AND rowid = {db_table}.id',
+            [query]
+        )
+    else:
+        matched = RawSQL(
+            f"SELECT object_id FROM {table} WHERE document @@ to_tsquery('simple', %s)",
+            [query]
+        )
+        rank = RawSQL(
+            f"SELECT -ts_rank(document, to_tsquery('simple', %s)) FROM {table} "
+            f"WHERE object_id = {db_table}.id",
+            [query]
+        )
+
+    # Меньшее значение - более релевантный результат
+    return queryset.filter(id__in=matched).annotate(search_rank=rank).order_by('search_rank', 'id')
+
+
+class RankedChangeList(ChangeList):
+    """Список админки: результаты поиска по индексу - по релевантности"""
+
+    def get_ordering(self, request, queryset):
+        if ORDER_VAR not in self.params and 'search_rank' in queryset.query.annotations:
+            return ['search_rank', '-pk']
+        return super().get_ordering(request, queryset)
+
+
+class FullTextSearchAdminMixin:
+    """
+    Поиск ModelAdmin (список и автозаполнение) по полнотекстовому индексу
+    search_index. Если сортировка не выбрана, список упорядочен по релевантности.
+    """
+    search_index = None
+
+    def get_search_results(self, request, queryset, search_term):
+        results = search(queryset, self.search_index, search_term)
+        if results is None:
+            return super().get_search_results(request, queryset, search_term)
+        return results, False
+
+    def get_changelist(self, request, **kwargs):
+        return RankedChangeList
@@ -0,0 +1,61 @@
+"""
+Сессия участника тестирования.
+
+В сессии хранятся ID и имя участника, поэтому страницы участника
+могут проверить регистрацию и вывести приветствие без запросов к БД.
+"""
+
+PARTICIPANT_ID_KEY = 'participant_id'
+PARTICIPANT_FIRST_NAME_KEY = 'participant_first_name'
+PARTICIPANT_LAST_NAME_KEY = 'participant_last_name'
+PARTICIPANT_NAME_KEY = 'participant_name'
+
+
+class SessionParticipant:
+    """Участник, восстановленный из данных сессии (без обращения к БД)"""
+
+    def __init__(self, id, first_name, last_name):
+        self.id = id
+        self.pk = id
+        self.first_name = first_name
+        self.last_name = last_name
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name}"
+
+
+def login_participant(request, participant):
+    """Сохранить участника в сессии"""
+    request.session[PARTICIPANT_ID_KEY] = participant.id
+    request.session[PARTICIPANT_FIRST_NAME_KEY] = participant.first_name
+    request.session[PARTICIPANT_LAST_NAME_KEY] = participant.last_name
+    request.session[PARTICIPANT_NAME_KEY] = str(participant)
+
+
+def get_session_participant(request):
+    """
+    Получить участника из сессии.
+    Возвращает None, если участник не зарегистрирован.
+    """
+    participant_id = request.session.get(PARTICIPANT_ID_KEY)
+    if not participant_id:
+        return None
+
+    return SessionParticipant(
+        participant_id,
+        request.session.get(PARTICIPANT_FIRST_NAME_KEY, ''),
+        request.session.get(PARTICIPANT_LAST_NAME_KEY, ''),
+    )
+
+
+async def aget_session_participant(request):
+    """Асинхронная версия get_session_participant"""
+    participant_id = await request.session.aget(PARTICIPANT_ID_KEY)
+    if not participant_id:
+        return None
+
+    return SessionParticipant(
+        participant_id,
+        await request.session.aget(PARTICIPANT_FIRST_NAME_KEY, ''),
+        await request.session.aget(PARTICIPANT_LAST_NAME_KEY, ''),
+    )
@@ -0,0 +1,87 @@
+"""
+Сигналы моделей: сброс кэша теста при изменении его данных,
+обновление поискового индекса админки и подписей для поиска дубликатов
+и учёт удалённых результатов в гистограмме.
+"""
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Test, Question, Answer, TestResult
+from .caching import invalidate_test, touch_test, invalidate_result
+from .leaderboard import forget_scores
+from .dedup import schedule_signature
+from .search import QUESTION_INDEX, ANSWER_INDEX, index_questions, index_answers, unindex
+
+
+@receiver([post_save, post_delete], sender=Test)
+def test_changed(sender, instance, **kwargs):
+    invalidate_test(instance.id)
+
+
+@receiver(pre_save, sender=Test)
+def test_saving(sender, instance, **kwargs):
+    # Старое название: при переименовании нужно переиндексировать вопросы
+    instance._indexed_title = (
+        Test.objects.filter(id=instance.id).values_list('title', flat=True).first()
+        if instance.id else None
+    )
+
+
+@receiver(post_save, sender=Test)
+def test_saved(sender, instance, created, **kwargs):
+    if not created and instance.title != getattr(instance, '_indexed_title', None):
+        index_questions('q.test_id = %s', [instance.id])
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, **kwargs):
+    index_questions('q.id = %s', [instance.id])
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    unindex(QUESTION_INDEX, [instance.id])
+
+
+@receiver(post_save, sender=Answer)
+def answer_saved(sender, instance, **kwargs):
+    index_answers('a.id = %s', [instance.id])
+
+
+@receiver(post_delete, sender=Answer)
+def answer_deleted(sender, instance, **kwargs):
+    unindex(ANSWER_INDEX, [instance.id])
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    touch_test(instance.test_id)
+
+
+@receiver(post_save, sender=Question)
+def question_signature(sender, instance, **kwargs):
+    schedule_signature(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def answer_signature(sender, instance, **kwargs):
+    schedule_signature(instance.question_id)
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    test_id = Question.objects.filter(id=instance.question_id).values_list('test_id', flat=True).first()
+    if test_id:
+        touch_test(test_id)
+
+
+@receiver([post_save, post_delete], sender=TestResult)
+def result_changed(sender, instance, **kwargs):
+    invalidate_result(instance.id)
+
+
+@receiver(post_delete, sender=TestResult)
+def result_deleted(sender, instance, **kwargs):
+    if instance.is_completed:
+        forget_scores([(instance.test_id, instance.percentage)])
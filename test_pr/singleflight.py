@@ -0,0 +1,79 @@
+"""
+Объединение одинаковых запросов к кэшу (single-flight).
+
+Когда значения нет в кэше, его строит только один запрос: потоки одного
+процесса ждут на локальной блокировке ключа, другие процессы - на блокировке
+в общем кэше (cache.add) с ограниченным временем ожидания. Блокировка
+своя у каждого ключа, поэтому долгое построение одного значения не
+задерживает промахи по другим ключам.
+"""
+
+import threading
+import time
+import weakref
+
+from django.core.cache import cache
+
+# Сколько секунд держится блокировка построения в общем кэше
+LOCK_TIMEOUT = 10
+# Сколько секунд ждать значение, которое строит другой процесс
+WAIT_TIMEOUT = 5
+POLL_INTERVAL = 0.05
+
+# Блокировки ключей внутри процесса; блокировка живёт, пока её ждёт
+# или держит хотя бы один поток
+_local_locks = weakref.WeakValueDictionary()
+_local_locks_guard = threading.Lock()
+
+_MISSING = object()
+
+
+def _local_lock(key):
+    with _local_locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = _local_locks[key] = threading.Lock()
+        return lock
+
+
+def _build_and_store(key, build, timeout):
+    value = build()
+    cache.set(key, value, timeout)
+    return value
+
+
+def single_flight(key, build, timeout=None):
+    """
+    Получить значение по ключу из кэша или построить его функцией build.
+
+    Одновременные промахи по одному ключу приводят к одному вызову build.
+    Если строящий процесс не успел за WAIT_TIMEOUT, значение строится заново.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    with _local_lock(key):
+        # Пока ждали блокировку, значение мог построить другой поток
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock_key = f'{key}:lock'
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            try:
+                return _build_and_store(key, build, timeout)
+            finally:
+                cache.delete(lock_key)
+
+        # Значение строит другой процесс - ждём его в кэше
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            if cache.get(lock_key) is None:
+                break
+
+        return _build_and_store(key, build, timeout)
@@ -0,0 +1,96 @@
+"""
+Снимок теста для клиентов-киосков.
+
+Все вопросы и варианты ответов (без отметки правильности) одним ответом
+в поколоночном виде: вместо списка объектов - по списку на каждое поле.
+Снимок строится из листа теста, сериализуется и сжимается один раз
+на версию теста и формат.
+
+MessagePack поддерживается, если установлен пакет msgpack.
+"""
+
+import gzip
+import json
+import re
+
+from django.conf import settings
+
+from .singleflight import single_flight
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'msgpack': 'application/msgpack',
+}
+
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+
+
+def snapshot_key(test_id, version, fmt, tag=''):
+    return f'test:{test_id}:snapshot:{version}{tag}:{fmt}'
+
+
+def available_formats():
+    return [fmt for fmt in CONTENT_TYPES if fmt != 'msgpack' or msgpack is not None]
+
+
+def accepts_gzip(request):
+    return bool(ACCEPTS_GZIP_RE.search(request.headers.get('Accept-Encoding', '')))
+
+
+def build_snapshot(sheet):
+    """
+    Поколоночный снимок листа теста.
+    Варианты вопроса i: answers[answer_offsets[i]:answer_offsets[i + 1]].
+    """
+    questions = sheet['questions']
+    answers = [answer for question in questions for answer in question['answers']]
+
+    answer_offsets = [0]
+    for question in questions:
+        answer_offsets.append(answer_offsets[-1] + len(question['answers']))
+
+    return {
+        'id': sheet['id'],
+        'version': sheet['version'],
+        'title': sheet['title'],
+        'description': sheet['description'],
+        'timer_minutes': sheet['timer_minutes'],
+        'questions': {
+            'id': [question['id'] for question in questions],
+            'text': [question['text'] for question in questions],
+        },
+        'answer_offsets': answer_offsets,
+        'answers': {
+            'id': [answer['id'] for answer in answers],
+            'text': [answer['text'] for answer in answers],
+        },
+    }
+
+
+def serialize_snapshot(snapshot, fmt):
+    if fmt == 'msgpack':
+        return msgpack.packb(snapshot, use_bin_type=True)
+    return json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def get_snapshot(sheet, fmt, tag=''):
+    """
+    Сериализованный снимок и его gzip-копия из кэша.
+    Ключ содержит версию теста, поэтому после изменения теста
+    строится новый снимок, а старый истекает сам. tag различает
+    наборы вопросов участников в тестах с pool_size.
+    """
+    def build():
+        body = serialize_snapshot(build_snapshot(sheet), fmt)
+        return body, gzip.compress(body, mtime=0)
+
+    return single_flight(
+        snapshot_key(sheet['id'], sheet['version'], fmt, tag),
+        build,
+        settings.TEST_CACHE_TIMEOUT
+    )
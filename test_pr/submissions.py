@@ -0,0 +1,200 @@
+"""
+Очередь проверки отправленных тестов.
+
+При отправке теста сохраняются только ответы участника в компактном виде,
+а проверку пачками выполняют процессы `manage.py grade_worker`.
+Пока результат не проверен, у него is_completed=False.
+"""
+
+import json
+import uuid
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TestResult, Submission
+from .caching import get_answer_key
+from .grading import grade_answers, parse_answer_id, calculate_percentage
+from .db import retry_on_locked
+from .leaderboard import record_scores
+from .pools import attempt_question_ids
+from .packing import pack_answers
+
+# Сколько раз повторять проверку отправки, завершившуюся ошибкой
+MAX_ATTEMPTS = 3
+
+
+def encode_payload(data):
+    """Ответы из формы take_test в компактный JSON {"<question_id>": answer_id}"""
+    answers = {}
+    for name, value in data.items():
+        if not name.startswith('answer_'):
+            continue
+        answer_id = parse_answer_id(value)
+        if answer_id is not None:
+            answers[name[len('answer_'):]] = answer_id
+    return json.dumps(answers, separators=(',', ':'))
+
+
+def decode_payload(payload):
+    """Обратное преобразование в вид данных формы (answer_<question_id>)"""
+    return {f'answer_{question_id}': answer_id for question_id, answer_id in json.loads(payload).items()}
+
+
+@retry_on_locked
+def enqueue_submission(test_id, participant_id, data):
+    """
+    Принять ответы участника без проверки.
+    Создаёт непроверенный результат и запись в очереди одной транзакцией.
+    """
+    with transaction.atomic():
+        result = TestResult.objects.create(
+            test_id=test_id,
+            participant_id=participant_id,
+            total_questions=0,
+            correct_answers=0,
+            percentage=0,
+            started_at=timezone.now(),
+            is_completed=False
+        )
+        Submission.objects.create(test_result=result, payload=encode_payload(data))
+    return result
+
+
+@retry_on_locked
+def save_graded_result(test_id, participant_id, data):
+    """
+    Проверить ответы сразу (без очереди) и сохранить результат.
+    Возвращает None, если тест не найден.
+    """
+    answer_key = get_answer_key(test_id)
+    if not answer_key:
+        return None
+
+    question_ids = attempt_question_ids(answer_key, test_id, participant_id)
+    graded, correct_count = grade_answers(question_ids, answer_key['answers'], data)
+
+    with transaction.atomic():
+        result = TestResult.objects.create(
+            test_id=test_id,
+            participant_id=participant_id,
+            total_questions=len(question_ids),
+            correct_answers=correct_count,
+            percentage=calculate_percentage(correct_count, len(question_ids)),
+            started_at=timezone.now(),
+            is_completed=True,
+            answers_packed=pack_answers(graded)
+        )
+        record_scores([(test_id, result.percentage)])
+    return result
+
+
+@retry_on_locked
+def release_stale(stale_after):
+    """Вернуть в очередь отправки, взятые упавшим обработчиком"""
+    return Submission.objects.filter(
+        status=Submission.STATUS_PROCESSING,
+        claimed_at__lt=timezone.now() - timedelta(seconds=stale_after)
+    ).update(status=Submission.STATUS_PENDING, claimed_by='')
+
+
+@retry_on_locked
+def claim_batch(batch_size):
+    """
+    Взять в обработку до batch_size отправок.
+    Отправку получает только один обработчик: строки помечаются
+    уникальным токеном одним UPDATE с условием status=pending.
+    """
+    token = uuid.uuid4().hex
+
+    with transaction.atomic():
+        pending = Submission.objects.filter(status=Submission.STATUS_PENDING).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        ids = list(pending.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+
+        Submission.objects.filter(id__in=ids, status=Submission.STATUS_PENDING).update(
+            status=Submission.STATUS_PROCESSING,
+            claimed_by=token,
+            claimed_at=timezone.now(),
+            attempts=F('attempts') + 1
+        )
+
+    return list(
+        Submission.objects.filter(claimed_by=token, status=Submission.STATUS_PROCESSING)
+        .select_related('test_result')
+    )
+
+
+def grade_batch(submissions):
+    """
+    Проверить пачку отправок и сохранить результаты.
+    Возвращает количество проверенных отправок.
+    """
+    results = []
+    done_ids = []
+    failed = []
+
+    for submission in submissions:
+        result = submission.test_result
+        try:
+            answer_key = get_answer_key(result.test_id)
+            if not answer_key:
+                raise ValueError(f'Тест {result.test_id} не найден')
+
+            question_ids = attempt_question_ids(answer_key, result.test_id, result.participant_id)
+            graded, correct_count = grade_answers(
+                question_ids,
+                answer_key['answers'],
+                decode_payload(submission.payload)
+            )
+        except Exception as e:
+            failed.append((submission, str(e)))
+            continue
+
+        result.total_questions = len(question_ids)
+        result.correct_answers = correct_count
+        result.percentage = calculate_percentage(correct_count, len(question_ids))
+        result.is_completed = True
+        result.answers_packed = pack_answers(graded)
+        results.append(result)
+        done_ids.append(submission.id)
+
+    _save_batch(results, done_ids, failed)
+    return len(done_ids)
+
+
+@retry_on_locked
+def _save_batch(results, done_ids, failed):
+    """Сохранить проверенную пачку одной транзакцией"""
+    with transaction.atomic():
+        # Результат мог уже проверить обработчик, потерявший отправку по таймауту:
+        # в гистограмму попадают только впервые проверенные
+        newly_completed = set(TestResult.objects.filter(
+            id__in=[result.id for result in results],
+            is_completed=False
+        ).values_list('id', flat=True))
+
+        TestResult.objects.bulk_update(
+            results,
+            ['total_questions', 'correct_answers', 'percentage', 'is_completed', 'answers_packed']
+        )
+        record_scores([
+            (result.test_id, result.percentage)
+            for result in results
+            if result.id in newly_completed
+        ])
+        Submission.objects.filter(id__in=done_ids).update(
+            status=Submission.STATUS_DONE,
+            error=''
+        )
+
+        for submission, error in failed:
+            status = Submission.STATUS_PENDING
+            if submission.attempts >= MAX_ATTEMPTS:
+                status = Submission.STATUS_FAILED
+            Submission.objects.filter(id=submission.id).update(status=status, claimed_by='', error=error)
@@ -1,3 +1,1063 @@
-from django.test import TestCase
+import gzip
+import importlib
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.servers.basehttp import WSGIServer
+from django.db import OperationalError, connection
+from django.test import (
+    AsyncClient, Client, LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+from django.test.testcases import LiveServerThread, QuietWSGIRequestHandler
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, clear_url_caches, resolve, reverse
+from django.utils import timezone
+
+from . import async_views, ratelimit, rollups, timings
+from .caching import get_answer_key
+from .db import RETRY_ATTEMPTS, retry_on_locked
+from .dedup import NUM_PERM, ROWS, find_clusters, index_missing, pack_signature
+from .deletion import purge_batch, schedule_deletion, start_job
+from .management.commands.grade_worker import run_worker
+from .management.commands.load_journey import LOAD_FIRST_NAME
+from .models import (
+    Answer, DailyResultStat, DeletionJob, Participant, Question, QuestionBand, QuestionSignature,
+    QuestionTiming, QuestionTimingStat, RollupWatermark, Submission, Test, TestResult,
+)
+from .ordering import ORDER_STEP
+from .packing import answers_for_result, pack_answers, unpack_answers
+from .regrade import diff, regrade
+from .routers import WRITE_AT_SESSION_KEY, ReplicaRouter, ReplicaStickinessMiddleware, reporting_reads
+from .search import ANSWER_INDEX, QUESTION_INDEX, rebuild_index
+from .singleflight import single_flight
+from .timings import MAX_DURATION_MS, rollup_batch
+
+
+def make_test(questions=3, title='Тест', **fields):
+    """Тест с вопросами по три варианта; правильный - второй"""
+    test = Test.objects.create(title=title, status='active', **fields)
+    for i in range(questions):
+        question = Question.objects.create(test=test, text=f'Вопрос {i}', order=i * ORDER_STEP)
+        for j in range(3):
+            Answer.objects.create(question=question, text=f'Ответ {j}', is_correct=j == 1, order=j)
+    return test
+
+
+def correct_answers(test):
+    """Данные формы прохождения со всеми правильными ответами"""
+    return {
+        f'answer_{question_id}': answer_id
+        for answer_id, question_id in Answer.objects.filter(
+            question__test=test, is_correct=True
+        ).values_list('id', 'question_id')
+    }
+
+
+def make_result(test, participant, percentage=50.0, **fields):
+    return TestResult.objects.create(
+        test=test, participant=participant, total_questions=2,
+        correct_answers=round(percentage / 50), percentage=percentage,
+        started_at=timezone.now(), **fields
+    )
+
+
+def _reload_urls():
+    from core import urls as root_urls
+    from test_pr import urls as app_urls
+    importlib.reload(app_urls)
+    importlib.reload(root_urls)
+    clear_url_caches()
+
+
+@contextmanager
+def async_participant_views():
+    """Маршруты участника ведут на асинхронные views, как под ASGI"""
+    try:
+        with override_settings(ASYNC_PARTICIPANT_VIEWS=True):
+            _reload_urls()
+            yield
+    finally:
+        _reload_urls()
+
+
+def admin_client():
+    user = User.objects.filter(username='admin').first()
+    if user is None:
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+class CacheTestCase(TestCase):
+    """Кэш процесса общий для всех тестов - очищается перед каждым"""
+
+    def setUp(self):
+        cache.clear()
+
+    def register(self, first_name='Иван', last_name='Петров'):
+        self.client.post(reverse('register'), {'first_name': first_name, 'last_name': last_name})
+        return Participant.objects.get(first_name=first_name, last_name=last_name)
+
+    def submit(self, test, answers=None):
+        """Отправить ответы теста; возвращает результат участника"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('take_test', args=[test.id]), answers if answers is not None else correct_answers(test))
+        return TestResult.objects.filter(test=test).latest('id')
+
+    def admin_action(self, model, action, objects, **data):
+        """Действие списка админки; сброс кэша после фиксации выполняется сразу"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return admin_client().post(reverse(f'admin:test_pr_{model}_changelist'), {
+                'action': action,
+                '_selected_action': [obj.pk for obj in objects],
+                'index': 0,
+                **data,
+            })
+
+
+class StaticFilesTests(CacheTestCase):
+    """Страницы отрисовываются без collectstatic (user-034)"""
+
+    def test_take_page_links_page_script(self):
+        test = make_test()
+        self.register()
+
+        response = self.client.get(reverse('take_test', args=[test.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/static/js/take_test.js')
+
+
+class SingleFlightTests(CacheTestCase):
+    """Одно построение значения на одновременные промахи и сброс кэша теста (user-028)"""
+
+    def test_concurrent_misses_build_once(self):
+        calls = []
+
+        def build():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'sheet'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight('sheet-key', build)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['sheet'] * 5)
+
+    def test_deactivated_test_is_not_takeable(self):
+        test = make_test()
+        self.register()
+        self.assertEqual(self.client.get(reverse('take_test', args=[test.id])).status_code, 200)
+
+        self.admin_action('test', 'make_inactive', [test])
+
+        response = self.client.get(reverse('take_test', args=[test.id]))
+        self.assertRedirects(response, reverse('test_list'), fetch_redirect_response=False)
+
+
+class ConditionalCatalogTests(CacheTestCase):
+    """ETag каталога и таймера (user-033)"""
+
+    def test_catalog_etag_changes_after_admin_deactivation(self):
+        test = make_test(title='Скрываемый тест')
+        self.register()
+        etag = self.client.get(reverse('test_list'))['ETag']
+        self.assertEqual(self.client.get(reverse('test_list'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.admin_action('test', 'make_inactive', [test])
+
+        response = self.client.get(reverse('test_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotContains(response, 'Скрываемый тест')
+
+    def test_timer_revalidates_with_304(self):
+        test = make_test(timer_minutes=15)
+        self.register()
+        response = self.client.get(reverse('get_test_timer', args=[test.id]))
+        self.assertEqual(response.json()['timer_minutes'], 15)
+
+        response = self.client.get(reverse('get_test_timer', args=[test.id]), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+class PackedAnswersTests(CacheTestCase):
+    """Ответы попытки одним столбцом и их показ в админке (user-043)"""
+
+    def test_pack_round_trip(self):
+        graded = [(1, 10, True), (2, None, False), (3, 2 ** 33, True)] + [(i, i, i % 2 == 0) for i in range(4, 14)]
+        self.assertEqual(unpack_answers(pack_answers(graded)), graded)
+        self.assertEqual(unpack_answers(pack_answers([])), [])
+
+    def test_result_answers_shown_in_result_admin(self):
+        test = make_test(questions=2)
+        self.register()
+        first = test.questions.order_by('order').first()
+        result = self.submit(test, {f'answer_{first.id}': first.answers.get(is_correct=True).id})
+
+        self.assertIsNotNone(result.answers_packed)
+        self.assertFalse(result.user_answers.exists())
+        self.assertEqual(
+            [(answer.question.text, answer.is_correct) for answer in answers_for_result(result)],
+            [('Вопрос 0', True), ('Вопрос 1', False)]
+        )
+
+        response = admin_client().get(reverse('admin:test_pr_testresult_change', args=[result.id]))
+        self.assertContains(response, 'Вопрос 1')
+        self.assertContains(response, 'Не ответил')
+        with self.assertRaises(NoReverseMatch):
+            reverse('admin:test_pr_useranswer_changelist')
+
+
+class AsyncParticipantViewsTests(CacheTestCase):
+    """Асинхронные views участника (user-027)"""
+
+    def get_async(self, name, *args):
+        client = AsyncClient()
+        client.cookies = self.client.cookies
+        return async_to_sync(client.get)(reverse(name, args=args))
+
+    def test_rank_and_leaderboard_are_native_async(self):
+        test = make_test(questions=2)
+        self.register()
+        result = self.submit(test)
+
+        with async_participant_views():
+            self.assertIs(resolve(reverse('get_result_rank', args=[result.id])).func, async_views.get_result_rank)
+            rank = self.get_async('get_result_rank', result.id).json()
+            leaders = self.get_async('get_test_leaderboard', test.id).json()
+            missing = self.get_async('get_result_rank', result.id + 1)
+
+        self.assertEqual((rank['rank'], rank['total'], rank['percentile']), (1, 1, 100.0))
+        self.assertEqual(rank['leaders'][0]['result_id'], result.id)
+        self.assertEqual(leaders['leaders'], rank['leaders'])
+        self.assertEqual(leaders['leaders'][0]['name'], 'Иван П.')
+        self.assertEqual(missing.status_code, 404)
+
+
+class BackgroundDeletionTests(CacheTestCase):
+    """Фоновое удаление участника пачками (user-042)"""
+
+    def test_deleted_participant_cannot_submit(self):
+        test = make_test()
+        participant = self.register()
+        schedule_deletion(participant)
+
+        response = self.client.post(reverse('take_test', args=[test.id]), correct_answers(test))
+
+        self.assertRedirects(response, reverse('register'), fetch_redirect_response=False)
+        self.assertFalse(TestResult.objects.exists())
+        self.assertNotIn('participant_id', self.client.session)
+
+    def test_purge_sweeps_results_saved_after_their_step(self):
+        test = make_test()
+        participant = self.register()
+        self.submit(test)
+        job = schedule_deletion(participant)
+        start_job(job)
+
+        # Шаг результатов пройден, затем запрос успел сохранить ещё один
+        self.assertEqual(purge_batch(job, batch_size=10), 1)
+        make_result(make_test(title='Второй'), participant)
+
+        while purge_batch(job, batch_size=10):
+            pass
+
+        self.assertFalse(TestResult.objects.exists())
+        self.assertFalse(Participant.all_objects.exists())
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.STATUS_DONE)
+
+
+class SearchIndexTests(CacheTestCase):
+    """Полнотекстовый поиск админки (user-040)"""
+
+    def index_rows(self):
+        with connection.cursor() as cursor:
+            rows = {}
+            for table in (QUESTION_INDEX, ANSWER_INDEX):
+                cursor.execute(f'SELECT rowid, * FROM {table} ORDER BY rowid')
+                rows[table] = cursor.fetchall()
+        return rows
+
+    def test_admin_search_matches_word_prefix(self):
+        test = make_test(questions=1, title='Физика')
+        Question.objects.create(test=test, text='Скорость света в вакууме', order=ORDER_STEP)
+
+        response = admin_client().get(reverse('admin:test_pr_question_changelist'), {'q': 'скор'})
+
+        self.assertContains(response, 'Скорость света')
+        self.assertNotContains(response, 'Вопрос 0')
+
+    def test_migration_backfill_matches_rebuild(self):
+        make_test(title='Химия')
+        rebuild_index()
+        expected = self.index_rows()
+
+        migration = importlib.import_module('test_pr.migrations.0007_search_index')
+        with connection.cursor() as cursor:
+            for table in (QUESTION_INDEX, ANSWER_INDEX):
+                cursor.execute(f'DELETE FROM {table}')
+            for statement in migration.SQLITE_BACKFILL:
+                cursor.execute(statement)
+
+        self.assertEqual(self.index_rows(), expected)
+        self.assertEqual(len(expected[ANSWER_INDEX]), 9)
+
+
+class QuestionTimingsTests(CacheTestCase):
+    """Журнал времени на вопросах и его перенос в сводки (user-047)"""
+
+    def post_timings(self, test, timings):
+        return self.client.post(
+            reverse('record_question_timings', args=[test.id]),
+            json.dumps({'timings': timings}), content_type='text/plain'
+        )
+
+    def test_batches_roll_up_under_their_own_watermark(self):
+        test = make_test(questions=2)
+        first, second = test.questions.order_by('order')
+        self.register()
+
+        self.assertEqual(self.post_timings(test, [[first.id, 1000], [second.id, 3000], [first.id, 2000]]).status_code, 204)
+        self.assertEqual(self.post_timings(test, [[first.id, 10 ** 9], [999999, 500]]).status_code, 204)
+        last_event_id = QuestionTiming.objects.latest('id').id
+
+        self.assertEqual(rollup_batch(100), 4)
+        self.assertEqual(rollup_batch(100), 0)
+
+        stat = QuestionTimingStat.objects.get(question=first)
+        self.assertEqual((stat.views, stat.total_ms), (3, 3000 + MAX_DURATION_MS))
+        watermark = RollupWatermark.objects.get(name=timings.WATERMARK_NAME)
+        self.assertEqual((watermark.last_event_id, watermark.last_result_id), (last_event_id, 0))
+
+    def test_oversized_and_repeated_batches_are_rejected(self):
+        test = make_test(questions=1)
+        question = test.questions.get()
+        self.register()
+
+        response = self.post_timings(test, [[question.id, 100]] * (timings.MAX_BATCH + 1))
+        self.assertEqual(response.status_code, 400)
+
+        # Отклонённая пачка тоже израсходовала маркер: 9 из оставшихся 12 принимаются
+        statuses = [self.post_timings(test, [[question.id, 100]]).status_code for _ in range(12)]
+        self.assertEqual(statuses, [204] * 9 + [429] * 3)
+        self.assertEqual(QuestionTiming.objects.count(), 9)
+
+
+class RegradeTests(CacheTestCase):
+    """Перепроверка результатов после исправления ключа (user-049)"""
+
+    def submit_with_key_fixed(self):
+        """Участник ответил первым вариантом; затем первый вариант признан правильным"""
+        test = make_test(questions=2)
+        self.register()
+        first = test.questions.order_by('order').first()
+        picked = first.answers.get(order=0)
+        result = self.submit(test, {f'answer_{first.id}': picked.id})
+        self.assertEqual(result.correct_answers, 0)
+        Answer.objects.filter(id=picked.id).update(is_correct=True)
+        return test, result
+
+    def test_diff_previews_and_regrade_applies(self):
+        test, result = self.submit_with_key_fixed()
+
+        changes = diff(test.id)
+        self.assertEqual([(c['result_id'], c['old_correct'], c['new_correct']) for c in changes], [(result.id, 0, 1)])
+        result.refresh_from_db()
+        self.assertEqual(result.correct_answers, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(len(regrade(test.id)), 1)
+        result.refresh_from_db()
+        self.assertEqual((result.correct_answers, result.percentage), (1, 50.0))
+        self.assertEqual(diff(test.id), [])
+
+    def test_deleted_test_is_not_regraded(self):
+        test = make_test(questions=2)
+        self.register()
+        result = self.submit(test)
+        schedule_deletion(test)
+
+        self.assertEqual(diff(test.id), [])
+        self.assertEqual(regrade(test.id), [])
+        result.refresh_from_db()
+        self.assertEqual(result.correct_answers, 2)
+        self.assertTrue(all(is_correct for _, _, is_correct in unpack_answers(result.answers_packed)))
+        with self.assertRaisesMessage(CommandError, 'удалены'):
+            call_command('regrade_results', str(test.id), stdout=io.StringIO())
+
+
+class DuplicateQuestionsTests(CacheTestCase):
+    """Поиск почти одинаковых вопросов (user-041)"""
+
+    def test_copied_questions_are_clustered(self):
+        texts = ['Сколько планет в Солнечной системе?', 'Какой химический символ у золота?']
+        for title in ('Оригинал', 'Копия'):
+            test = Test.objects.create(title=title, status='active')
+            for order, text in enumerate(texts):
+                question = Question.objects.create(test=test, text=text, order=order * ORDER_STEP)
+                Answer.objects.create(question=question, text='Ответ', is_correct=True)
+
+        self.assertEqual(index_missing(), 4)
+        clusters = find_clusters()
+
+        self.assertEqual(
+            sorted([question['text'] for question in cluster['questions']] for cluster in clusters),
+            [[texts[1]] * 2, [texts[0]] * 2]
+        )
+        self.assertEqual({cluster['similarity'] for cluster in clusters}, {1.0})
+
+    def test_bucket_members_are_compared_with_every_earlier_member(self):
+        test = make_test(questions=3)
+        first, second, third = test.questions.order_by('id')
+        QuestionBand.objects.all().delete()
+        QuestionSignature.objects.all().delete()
+        # Общая у всех троих - только полоса 0; второй и третий
+        # совпадают целиком, первый похож на них лишь этой полосой
+        signatures = {
+            first.id: [0] * NUM_PERM,
+            second.id: [0] * ROWS + [1] * (NUM_PERM - ROWS),
+            third.id: [0] * ROWS + [1] * (NUM_PERM - ROWS),
+        }
+        for question_id, signature in signatures.items():
+            QuestionSignature.objects.create(question_id=question_id, signature=pack_signature(signature))
+            QuestionBand.objects.create(question_id=question_id, band=0, bucket=42)
+
+        clusters = find_clusters()
+
+        self.assertEqual([[question['id'] for question in cluster['questions']] for cluster in clusters],
+                         [[second.id, third.id]])
+
+
+class GradingQueueTests(CacheTestCase):
+    """Очередь проверки и обработчик grade_worker (user-029)"""
+
+    @override_settings(GRADING_QUEUE=True)
+    def test_queued_submission_is_graded_by_worker(self):
+        test = make_test(questions=2)
+        self.register()
+        result = self.submit(test)
+        self.assertFalse(result.is_completed)
+        self.assertContains(self.client.get(reverse('test_result', args=[result.id])), 'Проверка')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(run_worker(batch_size=10, poll_interval=0, stale_after=300, once=True), 1)
+
+        result.refresh_from_db()
+        self.assertEqual((result.is_completed, result.correct_answers, result.percentage), (True, 2, 100.0))
+        self.assertEqual(result.submission.status, Submission.STATUS_DONE)
+
+    def test_worker_module_imports_before_django_setup(self):
+        """Дочерний процесс spawn импортирует модуль команды до django.setup()"""
+        subprocess.run(
+            [sys.executable, '-c', 'import test_pr.management.commands.grade_worker'],
+            cwd=settings.BASE_DIR, check=True, capture_output=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'core.settings'},
+        )
+
+
+class SignedCookieSessionTests(CacheTestCase):
+    """Сессия участника без БД (user-026)"""
+
+    def test_participant_pages_do_not_touch_session_or_participant_tables(self):
+        make_test(title='Тест из каталога')
+        participant = self.register()
+        self.assertEqual(self.client.session['participant_id'], participant.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('test_list'))
+
+        self.assertContains(response, 'Тест из каталога')
+        self.assertContains(response, 'Иван')
+        tables = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('test_pr_participant', tables)
+
+    def test_tampered_cookie_is_not_trusted(self):
+        self.register()
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME]
+        cookie.set(cookie.key, cookie.value[:-2] + 'xx', cookie.value[:-2] + 'xx')
+
+        response = self.client.get(reverse('test_list'))
+
+        self.assertRedirects(response, reverse('register'), fetch_redirect_response=False)
+
+
+class RetryOnLockedTests(SimpleTestCase):
+    """Повтор записи при занятой SQLite (user-030)"""
+
+    def flaky(self, failures, message='database is locked'):
+        calls = []
+
+        @retry_on_locked
+        def write():
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return 'saved'
+
+        return write, calls
+
+    @mock.patch('test_pr.db.time.sleep')
+    def test_locked_write_is_retried_with_growing_pause(self, sleep):
+        write, calls = self.flaky(2)
+
+        self.assertEqual(write(), 'saved')
+        self.assertEqual(len(calls), 3)
+        first, second = (call.args[0] for call in sleep.call_args_list)
+        self.assertLess(first, second)
+
+    @mock.patch('test_pr.db.time.sleep')
+    def test_other_errors_and_exhausted_retries_are_raised(self, sleep):
+        write, calls = self.flaky(1, 'no such table: test_pr_test')
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), 1)
+
+        write, calls = self.flaky(RETRY_ATTEMPTS)
+        with self.assertRaises(OperationalError):
+            write()
+        self.assertEqual(len(calls), RETRY_ATTEMPTS)
+
+
+@override_settings(REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Чтение отчётов с реплики и «прилипание» к основной БД после записи (user-031)"""
+
+    def request(self, method='get', staff=True, session=None):
+        request = getattr(RequestFactory(), method)('/admin/')
+        request.user = mock.Mock(is_staff=staff)
+        request.session = session if session is not None else {}
+        return request
+
+    @mock.patch('test_pr.routers.reporting_database', return_value='replica')
+    def test_reads_in_block_go_to_replica(self, _):
+        router = ReplicaRouter()
+        with reporting_reads(self.request()) as alias:
+            self.assertEqual(alias, 'replica')
+            self.assertEqual(router.db_for_read(Test), 'replica')
+            self.assertEqual(router.db_for_write(Test), 'default')
+        self.assertIsNone(router.db_for_read(Test))
+
+    @mock.patch('test_pr.routers.reporting_database', return_value='replica')
+    def test_staff_write_pins_session_to_primary(self, _):
+        session = {}
+        middleware = ReplicaStickinessMiddleware(lambda request: None)
+        middleware(self.request('get', session=session))
+        middleware(self.request('post', staff=False, session=session))
+        self.assertNotIn(WRITE_AT_SESSION_KEY, session)
+
+        middleware(self.request('post', session=session))
+        with reporting_reads(self.request(session=session)) as alias:
+            self.assertEqual(alias, 'default')
+
+        session[WRITE_AT_SESSION_KEY] -= 10
+        with reporting_reads(self.request(session=session)) as alias:
+            self.assertEqual(alias, 'replica')
+
+    def test_without_replica_everything_reads_primary(self):
+        with reporting_reads(self.request()) as alias:
+            self.assertEqual(alias, 'default')
+            self.assertIsNone(ReplicaRouter().db_for_read(Test))
+
+
+class ResultPageCachingTests(CacheTestCase):
+    """Неизменная страница результата с условными запросами (user-032)"""
+
+    def test_result_page_revalidates_without_queries(self):
+        test = make_test(questions=2)
+        self.register()
+        result = self.submit(test)
+        url = reverse('test_result', args=[result.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+            self.assertEqual(self.client.get(url).content, response.content)
+
+    def test_other_participant_cannot_open_result(self):
+        test = make_test(questions=2)
+        self.register()
+        result = self.submit(test)
+
+        self.client = Client()
+        self.register('Пётр', 'Сидоров')
+        response = self.client.get(reverse('test_result', args=[result.id]))
+
+        self.assertRedirects(response, reverse('test_list'), fetch_redirect_response=False)
+
+
+@override_settings(PAGED_TEST_THRESHOLD=3, QUESTIONS_PAGE_SIZE=2)
+class PagedQuestionsTests(CacheTestCase):
+    """Длинный тест загружается порциями (user-035)"""
+
+    def test_long_test_is_delivered_in_pages(self):
+        test = make_test(questions=5)
+        self.register()
+
+        response = self.client.get(reverse('take_test', args=[test.id]))
+        self.assertTrue(response.context['paged'])
+        self.assertEqual(len(response.context['questions']), 2)
+        self.assertEqual(response.context['total_questions'], 5)
+
+        url = reverse('get_test_questions', args=[test.id])
+        pages = [self.client.get(url, {'page': page}).json() for page in (1, 2, 3)]
+        self.assertEqual(
+            [question['text'] for page in pages for question in page['questions']],
+            [f'Вопрос {i}' for i in range(5)]
+        )
+        self.assertEqual({page['pages'] for page in pages}, {3})
+        self.assertNotIn('is_correct', json.dumps(pages))
+        self.assertEqual(self.client.get(url, {'page': 4}).status_code, 404)
+
+    def test_page_revalidates_until_test_changes(self):
+        test = make_test(questions=5)
+        self.register()
+        url = reverse('get_test_questions', args=[test.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            question = test.questions.order_by('order').first()
+            question.text = 'Исправленный вопрос'
+            question.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['questions'][0]['text'], 'Исправленный вопрос')
+
+
+class SnapshotTests(CacheTestCase):
+    """Весь тест одним поколоночным ответом (user-036)"""
+
+    def test_snapshot_is_columnar_and_gzipped_on_request(self):
+        test = make_test(questions=2, timer_minutes=10)
+        self.register()
+        url = reverse('get_test_snapshot', args=[test.id])
+
+        snapshot = self.client.get(url).json()
+        self.assertEqual(snapshot['questions']['text'], ['Вопрос 0', 'Вопрос 1'])
+        self.assertEqual(snapshot['answer_offsets'], [0, 3, 6])
+        self.assertEqual(snapshot['answers']['text'][3:6], ['Ответ 0', 'Ответ 1', 'Ответ 2'])
+        self.assertEqual(snapshot['timer_minutes'], 10)
+        self.assertNotIn('is_correct', json.dumps(snapshot))
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), snapshot)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'],
+                                         HTTP_ACCEPT_ENCODING='gzip').status_code, 304)
+
+    def test_unavailable_format_is_refused(self):
+        test = make_test(questions=1)
+        self.register()
+
+        response = self.client.get(reverse('get_test_snapshot', args=[test.id]), {'format': 'xml'})
+
+        self.assertEqual(response.status_code, 406)
+        self.assertIn('json', response.json()['formats'])
+
+
+class LeaderboardTests(CacheTestCase):
+    """Место, процентиль и лидеры теста (user-037)"""
+
+    def test_rank_shares_place_for_equal_scores(self):
+        test = make_test(questions=2)
+        first = test.questions.order_by('order').first()
+        one_correct = {f'answer_{first.id}': first.answers.get(is_correct=True).id}
+        results = {}
+        for name, answers in (('Анна', None), ('Борис', one_correct), ('Вера', one_correct), ('Глеб', {})):
+            self.client = Client()
+            self.register(name, 'Тестова')
+            results[name] = self.submit(test, answers)
+
+        # Чужой результат
+        self.assertEqual(self.client.get(reverse('get_result_rank', args=[results['Борис'].id])).status_code, 404)
+
+        self.assertEqual(
+            {key: self.client.get(reverse('get_result_rank', args=[results['Глеб'].id])).json()[key]
+             for key in ('rank', 'total', 'percentile')},
+            {'rank': 4, 'total': 4, 'percentile': 25.0}
+        )
+        leaders = self.client.get(reverse('get_test_leaderboard', args=[test.id])).json()['leaders']
+        self.assertEqual([leader['name'] for leader in leaders], ['Анна Т.', 'Борис Т.', 'Вера Т.', 'Глеб Т.'])
+
+        self.client = Client()
+        self.register('Вера', 'Тестова')
+        rank = self.client.get(reverse('get_result_rank', args=[results['Вера'].id])).json()
+        self.assertEqual((rank['rank'], rank['percentile']), (2, 75.0))
+
+
+class ResultRollupTests(CacheTestCase):
+    """Сводки результатов и отметка с отставанием (user-038)"""
+
+    def age(self, *results, seconds=rollups.SETTLE_SECONDS + 5):
+        TestResult.objects.filter(id__in=[result.id for result in results]).update(
+            completed_at=timezone.now() - timedelta(seconds=seconds)
+        )
+
+    def test_watermark_waits_for_recent_and_queued_results(self):
+        test = make_test(questions=2)
+        participants = [Participant.objects.create(first_name=f'Участник {i}', last_name='Т') for i in range(5)]
+        old = [make_result(test, participants[i], percentage=50.0, is_completed=True) for i in range(2)]
+        recent = make_result(test, participants[2], percentage=100.0, is_completed=True)
+        later = make_result(test, participants[3], percentage=0.0, is_completed=True)
+        self.age(*old, later)
+
+        self.assertEqual(rollups.rollup_batch(100), 2)
+        self.assertEqual(rollups.rollup_batch(100), 0)
+        watermark = RollupWatermark.objects.get(name=rollups.WATERMARK_NAME)
+        self.assertEqual(watermark.last_result_id, old[-1].id)
+
+        queued = make_result(test, participants[4], percentage=0.0, is_completed=False)
+        Submission.objects.create(test_result=queued, payload='{}')
+        self.age(recent, queued)
+        self.assertEqual(rollups.rollup_batch(100), 2)
+        self.assertEqual(rollups.rollup_batch(100), 0)
+
+        stat = DailyResultStat.objects.get(test=test)
+        self.assertEqual((stat.attempts, stat.score_sum), (4, 200.0))
+        self.assertEqual(stat.histogram[5], 2)
+
+        response = admin_client().get(reverse('admin_analytics'))
+        self.assertContains(response, test.title)
+
+
+class QuestionPoolTests(CacheTestCase):
+    """Случайный набор вопросов попытки (user-039)"""
+
+    def shown_questions(self, test):
+        response = self.client.get(reverse('take_test', args=[test.id]))
+        return [question['id'] for question in response.context['questions']]
+
+    def test_pool_is_reproduced_at_grading(self):
+        test = make_test(questions=8, pool_size=3)
+        self.register()
+
+        with CaptureQueriesContext(connection) as queries:
+            shown = self.shown_questions(test)
+        self.assertEqual(len(shown), 3)
+        self.assertEqual(self.shown_questions(test), shown)
+        self.assertFalse(any('RANDOM' in query['sql'].upper() for query in queries.captured_queries))
+
+        result = self.submit(test)
+        self.assertEqual((result.total_questions, result.correct_answers), (3, 3))
+        self.assertEqual([question_id for question_id, _, _ in unpack_answers(result.answers_packed)], shown)
+
+    def test_participants_draw_different_pools(self):
+        test = make_test(questions=8, pool_size=3)
+        pools = set()
+        for i in range(5):
+            self.client = Client()
+            self.register('Участник', str(i))
+            pools.add(tuple(self.shown_questions(test)))
+        self.assertGreater(len(pools), 1)
+
+
+class SetBasedAdminActionsTests(CacheTestCase):
+    """Массовые действия админки над вопросами и ответами (user-044)"""
+
+    def question_texts(self, test):
+        return list(test.questions.order_by('order').values_list('text', flat=True))
+
+    def test_question_moves_reorder_the_test(self):
+        test = make_test(questions=4)
+        questions = list(test.questions.order_by('order'))
+
+        self.admin_action('question', 'move_to_top', [questions[2], questions[3]])
+        self.assertEqual(self.question_texts(test), ['Вопрос 2', 'Вопрос 3', 'Вопрос 0', 'Вопрос 1'])
+
+        self.admin_action('question', 'move_down', [questions[2]])
+        self.assertEqual(self.question_texts(test), ['Вопрос 3', 'Вопрос 2', 'Вопрос 0', 'Вопрос 1'])
+
+        self.admin_action('question', 'renumber_questions', [questions[0]])
+        orders = list(test.questions.order_by('order').values_list('order', flat=True))
+        self.assertEqual({high - low for low, high in zip(orders, orders[1:])}, {ORDER_STEP})
+        self.assertEqual(self.question_texts(test), ['Вопрос 3', 'Вопрос 2', 'Вопрос 0', 'Вопрос 1'])
+
+    def test_answer_actions_update_the_cached_answer_key(self):
+        test = make_test(questions=2)
+        self.register()
+        self.client.get(reverse('take_test', args=[test.id]))
+        self.assertTrue(get_answer_key(test.id))
+        first = test.questions.order_by('order').first()
+        wrong = first.answers.get(order=0)
+
+        self.admin_action('answer', 'mark_as_only_correct', [wrong])
+
+        self.assertEqual(list(first.answers.filter(is_correct=True)), [wrong])
+        result = self.submit(test, {f'answer_{first.id}': wrong.id})
+        self.assertEqual(result.correct_answers, 1)
+
+    def test_default_answers_are_added_in_one_pass(self):
+        test = Test.objects.create(title='Без ответов', status='active')
+        questions = [Question.objects.create(test=test, text=f'Вопрос {i}', order=i) for i in range(3)]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.admin_action('question', 'add_default_answers', questions)
+
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "test_pr_answer"')]
+        self.assertEqual(len(inserts), 1)
+
+        self.assertEqual(Answer.objects.filter(question__test=test).count(), 9)
+        self.assertEqual(Answer.objects.filter(question__test=test, is_correct=True).count(), 3)
+
+
+class QuestionReorderTests(CacheTestCase):
+    """Перенос вопроса между соседями с промежутками в номерах (user-045)"""
+
+    def reorder(self, test, question, after=None, before=None):
+        return self.staff.post(
+            reverse('admin_reorder_question', args=[test.id]),
+            json.dumps({
+                'question_id': question.id,
+                'after_id': after.id if after else None,
+                'before_id': before.id if before else None,
+            }),
+            content_type='application/json'
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.staff = admin_client()
+
+    def test_move_into_gap_updates_one_row(self):
+        test = make_test(questions=3)
+        first, second, third = test.questions.order_by('order')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reorder(test, third, after=first, before=second)
+
+        self.assertEqual(response.json(), {
+            'success': True, 'orders': {str(third.id): ORDER_STEP // 2}, 'compacted': False,
+        })
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE "test_pr_question"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(list(test.questions.order_by('order')), [first, third, second])
+
+    def test_exhausted_gap_compacts_the_test(self):
+        test = make_test(questions=3)
+        first, second, third = test.questions.order_by('order')
+        Question.objects.filter(id=second.id).update(order=1)
+
+        response = self.reorder(test, third, after=first, before=second).json()
+
+        self.assertTrue(response['compacted'])
+        self.assertEqual(list(test.questions.order_by('order')), [first, third, second])
+        orders = list(test.questions.order_by('order').values_list('order', flat=True))
+        self.assertEqual({high - low for low, high in zip(orders, orders[1:])}, {ORDER_STEP})
+
+    def test_stale_neighbours_get_409(self):
+        test = make_test(questions=3)
+        first, second, third = test.questions.order_by('order')
+
+        # Клиент считает, что за вторым вопросом идёт первый
+        response = self.reorder(test, third, after=second, before=first)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(list(test.questions.order_by('order')), [first, second, third])
+
+
+class SerialLiveServerThread(LiveServerThread):
+    """
+    Живой сервер, обрабатывающий запросы по одному.
+    Потоки многопоточного сервера делят одно соединение с тестовой
+    SQLite в памяти, и одновременные транзакции участников мешают
+    друг другу (чужой ROLLBACK, 500 и редиректы вместо результата).
+    """
+
+    def _create_server(self, connections_override=None):
+        return WSGIServer((self.host, self.port), QuietWSGIRequestHandler, allow_reuse_address=False)
+
+
+class LoadJourneyTests(LiveServerTestCase):
+    """Нагрузочный прогон пути участника по HTTP (user-046)"""
+
+    server_thread_class = SerialLiveServerThread
+
+    def setUp(self):
+        cache.clear()
+
+    def test_journey_completes_against_live_server(self):
+        test = make_test(questions=3)
+        out = io.StringIO()
+
+        call_command(
+            'load_journey', url=self.live_server_url, participants=3, ramp_up=0,
+            think_time=0, answer_time=0, seed=1, stdout=out,
+        )
+
+        self.assertIn('Все запросы выполнены без ошибок', out.getvalue())
+        self.assertEqual(
+            TestResult.objects.filter(test=test, participant__first_name=LOAD_FIRST_NAME, is_completed=True).count(), 3
+        )
+
+    def test_invalid_url_is_rejected(self):
+        with self.assertRaisesMessage(CommandError, '--url'):
+            call_command('load_journey', url='127.0.0.1:8000', stdout=io.StringIO())
+
+
+class RateLimitTests(CacheTestCase):
+    """Ограничение частоты запросов GCRA (user-048)"""
+
+    def save_answer(self, client, question):
+        return client.post(
+            reverse('save_answer', args=[question.test_id]),
+            json.dumps({'question_id': question.id, 'answer_id': None}), content_type='application/json'
+        )
+
+    @override_settings(RATE_LIMITS={'register': {'rate': '1/m', 'burst': 2, 'keys': ['ip']}})
+    def test_register_burst_is_rejected_with_retry_after(self):
+        data = {'first_name': 'Иван', 'last_name': 'Петров'}
+        statuses = [self.client.post(reverse('register'), data).status_code for _ in range(2)]
+        response = self.client.post(reverse('register'), data)
+
+        self.assertEqual(statuses, [302, 302])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertContains(response, 'Слишком много попыток входа', status_code=429)
+        # Лимит только на POST: форма открывается
+        self.assertEqual(Client().get(reverse('register')).status_code, 200)
+
+    @override_settings(RATE_LIMITS={'save_answer': {'rate': '1/m', 'burst': 1, 'keys': ['participant']}})
+    def test_participants_have_separate_buckets(self):
+        question = make_test(questions=1).questions.get()
+        self.register()
+        other = Client()
+        other.post(reverse('register'), {'first_name': 'Пётр', 'last_name': 'Иванов'})
+
+        self.assertEqual(self.save_answer(self.client, question).json(), {'success': True})
+        rejected = self.save_answer(self.client, question)
+        self.assertEqual(self.save_answer(other, question).status_code, 200)
+
+        self.assertEqual(rejected.status_code, 429)
+        self.assertFalse(rejected.json()['success'])
+        self.assertEqual(rejected['Retry-After'], '60')
+
+    @override_settings(RATE_LIMIT_ENABLED=False, RATE_LIMITS={'save_answer': {'rate': '1/m', 'burst': 1}})
+    def test_disabled_limit_accepts_everything(self):
+        question = make_test(questions=1).questions.get()
+        self.register()
+
+        statuses = {self.save_answer(self.client, question).status_code for _ in range(5)}
+
+        self.assertEqual(statuses, {200})
+        self.assertEqual(ratelimit.check_shared_cache(None), [])
+
+    def test_bucket_refills_at_rate(self):
+        interval = ratelimit.parse_rate('60/m')
+        self.assertEqual(interval, 1000)
+
+        with mock.patch.object(ratelimit.time, 'time', return_value=1000.0) as now:
+            accepted = [ratelimit.acquire('ratelimit:test', interval, interval * 2) for _ in range(3)]
+            now.return_value += 1
+            refilled = ratelimit.acquire('ratelimit:test', interval, interval * 2)
+
+        self.assertEqual(accepted, [0, 0, 1000])
+        self.assertEqual(refilled, 0)
+
+    def test_local_cache_is_reported(self):
+        self.assertEqual([error.id for error in ratelimit.check_shared_cache(None)], ['test_pr.W001'])
+
+
+class BuilderChangesTests(CacheTestCase):
+    """Сохранение конструктора изменениями с проверкой версии (user-050)"""
+
+    def save(self, test, changes):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.staff.patch(
+                reverse('admin_save_test_changes', args=[test.id]),
+                json.dumps(changes), content_type='application/json'
+            )
+
+    def question_data(self, question, text):
+        return {'id': question.id, 'text': text, 'answers': [
+            {'id': answer.id, 'text': answer.text, 'is_correct': answer.is_correct, 'order': answer.order}
+            for answer in question.answers.order_by('order')
+        ]}
+
+    def setUp(self):
+        super().setUp()
+        self.staff = admin_client()
+
+    def test_changed_question_is_updated_in_place(self):
+        test = make_test(questions=2)
+        first, second = test.questions.order_by('order')
+        answer_ids = set(first.answers.values_list('id', flat=True))
+
+        response = self.save(test, {
+            'version': test.version,
+            'test': {'title': 'Новое название'},
+            'questions': [self.question_data(first, 'Новый текст')],
+        })
+
+        self.assertEqual(response.json()['version'], test.version + 1)
+        test.refresh_from_db()
+        self.assertEqual(test.title, 'Новое название')
+        first.refresh_from_db()
+        self.assertEqual(first.text, 'Новый текст')
+        # Варианты обновлены на месте: ответы участников на них не теряются
+        self.assertEqual(set(first.answers.values_list('id', flat=True)), answer_ids)
+        self.assertEqual(Question.objects.get(id=second.id).text, second.text)
+
+    def test_new_question_is_placed_after_its_neighbour(self):
+        test = make_test(questions=2)
+        first, second = test.questions.order_by('order')
+
+        response = self.save(test, {'version': test.version, 'questions': [{
+            'key': 'new', 'after_id': first.id, 'text': 'Вставленный вопрос', 'answers': [
+                {'text': 'Да', 'is_correct': True}, {'text': 'Нет'},
+            ],
+        }]})
+
+        created = Question.objects.get(id=response.json()['created']['new'])
+        self.assertEqual(list(test.questions.order_by('order')), [first, created, second])
+        self.assertEqual(created.answers.filter(is_correct=True).count(), 1)
+
+    def test_deleted_questions_are_removed(self):
+        test = make_test(questions=2)
+        first, second = test.questions.order_by('order')
+
+        response = self.save(test, {'version': test.version, 'deleted': [second.id]})
+
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(list(test.questions.all()), [first])
+
+    def test_stale_version_gets_409(self):
+        test = make_test(questions=2)
+        first = test.questions.order_by('order').first()
+        self.save(test, {'version': test.version, 'questions': [self.question_data(first, 'Первый редактор')]})
+
+        # Второй редактор открыл страницу до первого сохранения
+        response = self.save(test, {'version': test.version, 'questions': [self.question_data(first, 'Второй редактор')]})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['version'], test.version + 1)
+        self.assertEqual(Question.objects.get(id=first.id).text, 'Первый редактор')
@@ -0,0 +1,106 @@
+"""
+Время участников на вопросах.
+
+Страница прохождения копит время каждого открытия вопроса и отправляет
+его пачками (navigator.sendBeacon), а не запросом на каждый переход.
+Пачка записывается в журнал QuestionTiming одной вставкой. Команда
+`manage.py rollup_timings` прибавляет журнал к сводкам
+QuestionTimingStat и удаляет перенесённые записи, поэтому журнал
+остаётся коротким, а админка читает только сводки.
+"""
+
+import json
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .db import retry_on_locked
+from .models import Question, QuestionTiming, QuestionTimingStat, RollupWatermark
+
+WATERMARK_NAME = 'question_timings'
+
+# Записей в одной пачке со страницы (страница отправляет по 20)
+MAX_BATCH = 50
+
+# Открытие дольше считается забытой вкладкой и обрезается
+MAX_DURATION_MS = 30 * 60 * 1000
+
+
+def parse_timings(body, question_ids):
+    """
+    Пачка со страницы: JSON {"timings": [[question_id, мс], ...]}.
+    Записи о вопросах не из теста отбрасываются.
+    ValueError - если тело не пачка.
+    """
+    try:
+        timings = json.loads(body)['timings']
+        if not isinstance(timings, list) or len(timings) > MAX_BATCH:
+            raise ValueError
+        pairs = [(int(question_id), int(duration)) for question_id, duration in timings]
+    except (TypeError, KeyError, ValueError):
+        raise ValueError('Некорректная пачка')
+
+    return [
+        QuestionTiming(question_id=question_id, duration_ms=min(duration, MAX_DURATION_MS))
+        for question_id, duration in pairs
+        if question_id in question_ids and duration > 0
+    ]
+
+
+def record_timings(rows):
+    QuestionTiming.objects.bulk_create(rows)
+
+
+@retry_on_locked
+def rollup_batch(batch_size):
+    """
+    Перенести следующую пачку журнала в сводки.
+    Возвращает количество перенесённых записей (0 - журнал пуст).
+    """
+    with transaction.atomic():
+        # Строка отметки - блокировка от параллельного переноса
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+
+        events = list(
+            QuestionTiming.objects.order_by('id').values_list('id', 'question_id', 'duration_ms')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        totals = defaultdict(lambda: [0, 0])
+        for _, question_id, duration in events:
+            totals[question_id][0] += 1
+            totals[question_id][1] += duration
+
+        # Записи удалённых с тех пор вопросов просто отбрасываются
+        alive = set(Question.objects.filter(id__in=list(totals)).values_list('id', flat=True))
+        existing = QuestionTimingStat.objects.in_bulk(list(alive))
+        now = timezone.now()
+        changed = []
+        created = []
+        for question_id, (views, total_ms) in totals.items():
+            if question_id not in alive:
+                continue
+            row = existing.get(question_id)
+            if row is None:
+                created.append(QuestionTimingStat(question_id=question_id, views=views, total_ms=total_ms))
+                continue
+            row.views += views
+            row.total_ms += total_ms
+            row.updated_at = now
+            changed.append(row)
+
+        QuestionTimingStat.objects.bulk_update(changed, ['views', 'total_ms', 'updated_at'])
+        QuestionTimingStat.objects.bulk_create(created)
+
+        # Удаляются ровно перенесённые записи: пачки, вставленные
+        # во время переноса, останутся до следующего запуска
+        QuestionTiming.objects.filter(id__in=[event_id for event_id, _, _ in events])._raw_delete(
+            QuestionTiming.objects.db
+        )
+
+        watermark.last_event_id = events[-1][0]
+        watermark.save(update_fields=['last_event_id', 'updated_at'])
+
+    return len(events)
@@ -1,22 +1,36 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
+
+# Под ASGI участники обслуживаются асинхронными версиями views
+participant_views = async_views if settings.ASYNC_PARTICIPANT_VIEWS else views
 
 urlpatterns = [
     # Основные страницы пользователя
     path('', views.register, name='register'),
     path('tests/', views.test_list, name='test_list'),
-    path('test/<int:test_id>/take/', views.take_test, name='take_test'),
-    path('test/<int:test_id>/save-answer/', views.save_answer, name='save_answer'),
-    path('result/<int:result_id>/', views.test_result, name='test_result'),
+    path('test/<int:test_id>/take/', participant_views.take_test, name='take_test'),
+    path('test/<int:test_id>/save-answer/', participant_views.save_answer, name='save_answer'),
+    path('result/<int:result_id>/', participant_views.test_result, name='test_result'),
     path('logout/', views.logout_user, name='logout'),
     
     # API endpoints
-    path('api/test/<int:test_id>/timer/', views.get_test_timer, name='get_test_timer'),
+    path('api/test/<int:test_id>/timer/', participant_views.get_test_timer, name='get_test_timer'),
+    path('api/test/<int:test_id>/questions/', participant_views.get_test_questions, name='get_test_questions'),
+    path('api/test/<int:test_id>/snapshot/', participant_views.get_test_snapshot, name='get_test_snapshot'),
+    path('api/test/<int:test_id>/leaderboard/', participant_views.get_test_leaderboard, name='get_test_leaderboard'),
+    path('api/test/<int:test_id>/timings/', participant_views.record_question_timings, name='record_question_timings'),
+    path('api/result/<int:result_id>/rank/', participant_views.get_result_rank, name='get_result_rank'),
     
     # Админские страницы
     path('admin-builder/', views.admin_test_builder, name='admin_test_builder'),
+    path('admin-builder/analytics/', views.admin_analytics, name='admin_analytics'),
+    path('admin-builder/duplicates/', views.admin_duplicates, name='admin_duplicates'),
+    path('admin-builder/deletions/', views.admin_deletion_status, name='admin_deletion_status'),
     path('admin-builder/create/', views.admin_create_test, name='admin_create_test'),
     path('admin-builder/<int:test_id>/edit/', views.admin_edit_test, name='admin_edit_test'),
+    path('admin-builder/<int:test_id>/changes/', views.admin_save_test_changes, name='admin_save_test_changes'),
+    path('admin-builder/<int:test_id>/reorder/', views.admin_reorder_question, name='admin_reorder_question'),
     path('admin-builder/<int:test_id>/delete/', views.admin_delete_test, name='admin_delete_test'),
     path('admin-builder/<int:test_id>/duplicate/', views.admin_duplicate_test, name='admin_duplicate_test'),
 ]
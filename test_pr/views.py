@@ -1,21 +1,54 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.admin.views.decorators import staff_member_required
-from django.utils import timezone
-from django.http import JsonResponse
-from django.db import transaction
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.db import transaction, IntegrityError
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.db.models import Count, F
 from datetime import timedelta
+import hashlib
 import json
 
-from .models import Test, Question, Answer, Participant, TestResult, UserAnswer
+from .models import Test, Question, Answer, Participant, TestResult
 from .forms import TestForm, QuestionForm, AnswerForm
+from .sessions import login_participant, get_session_participant
+from .builder import VersionConflict, apply_changes, clean_test_fields, parse_changes
+from .caching import get_test_sheet, get_catalog_version, get_result_meta, result_page_key
+from .deletion import active_jobs, schedule_deletion
+from .dedup import CLUSTERS_SHOWN, DEFAULT_THRESHOLD, find_clusters
+from .http import not_modified_response, set_validators
+from .leaderboard import LEADERBOARD_CACHE_TIMEOUT, get_leaderboard, get_rank
+from .ordering import ORDER_STEP, StaleOrder, move_question
+from .packing import answers_for_result
+from .pools import attempt_sheet, attempt_tag
+from .ratelimit import rate_limit
+from .rollups import dashboard_data
+from .routers import reporting_reads
+from .snapshot import CONTENT_TYPES, accepts_gzip, available_formats, get_snapshot
+from .submissions import enqueue_submission, save_graded_result
+from .timings import parse_timings, record_timings
 
 
 # ============================================================================
 # ПОЛЬЗОВАТЕЛЬСКИЕ VIEWS
 # ============================================================================
 
+def register_rejected(request, retry_after):
+    """Ответ на слишком частые попытки регистрации"""
+    response = render(request, 'test_pr/register.html', {
+        'error': f'Слишком много попыток входа, повторите через {retry_after} с'
+    }, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
 @require_http_methods(["GET", "POST"])
+@rate_limit('register', rejected=register_rejected)
 def register(request):
     """
     Регистрация участника перед началом теста.
@@ -37,8 +70,8 @@ def register(request):
             last_name=last_name
         )
         
-        # Сохраняем ID участника в сессии
-        request.session['participant_id'] = participant.id
+        # Сохраняем ID и имя участника в сессии
+        login_participant(request, participant)
         
         return redirect('test_list')
     
@@ -55,24 +88,30 @@ def test_list(request):
     Отображение списка активных тестов.
     Пользователь должен быть зарегистрирован.
     """
-    # Проверяем, зарегистрирован ли пользователь
-    participant_id = request.session.get('participant_id')
-    if not participant_id:
+    # Проверяем, зарегистрирован ли пользователь (данные берутся из сессии)
+    participant = get_session_participant(request)
+    if not participant:
         return redirect('register')
     
-    try:
-        participant = Participant.objects.get(id=participant_id)
-    except Participant.DoesNotExist:
-        request.session.flush()
-        return redirect('register')
+    # Получаем информацию о пройденных тестах
+    completed_tests = list(TestResult.objects.filter(
+        participant_id=participant.id
+    ).values_list('test_id', flat=True))
     
-    # Получаем активные тесты
-    tests = Test.objects.filter(status='active')
+    # Каталог одинаков для всех, пока тесты не меняются; страница
+    # различается только участником и пройденными им тестами
+    etag = '"catalog-%s"' % hashlib.md5(
+        f'{get_catalog_version()}:{participant.id}:{sorted(completed_tests)}'.encode()
+    ).hexdigest()
+    cache_control = {'private': True, 'max_age': 0, 'must_revalidate': True}
     
-    # Получаем информацию о пройденных тестах
-    completed_tests = TestResult.objects.filter(
-        participant=participant
-    ).values_list('test_id', flat=True)
+    response = not_modified_response(request, etag=etag, **cache_control)
+    if response is not None:
+        patch_vary_headers(response, ['Cookie'])
+        return response
+    
+    # Получаем активные тесты
+    tests = Test.objects.filter(status='active').annotate(questions_count=Count('questions'))
     
     context = {
         'participant': participant,
@@ -80,7 +119,9 @@ def test_list(request):
         'completed_tests': completed_tests,
     }
     
-    return render(request, 'test_pr/test_list.html', context)
+    response = render(request, 'test_pr/test_list.html', context)
+    patch_vary_headers(response, ['Cookie'])
+    return set_validators(response, etag=etag, **cache_control)
 
 
 @require_http_methods(["GET", "POST"])
@@ -90,94 +131,81 @@ def take_test(request, test_id):
     GET: Показывает все вопросы теста с возможностью навигации
     POST: Сохраняет ответы и завершает тест
     """
-    participant_id = request.session.get('participant_id')
-    if not participant_id:
+    participant = get_session_participant(request)
+    if not participant:
         return redirect('register')
     
-    try:
-        participant = Participant.objects.get(id=participant_id)
-        test = Test.objects.get(id=test_id, status='active')
-    except (Participant.DoesNotExist, Test.DoesNotExist):
+    # Лист теста строится один раз на всех участников и берётся из кэша
+    test = get_test_sheet(test_id)
+    if not test:
         return redirect('test_list')
     
     # Проверяем, не прошёл ли уже этот тест
-    existing_result = TestResult.objects.filter(
-        test=test,
-        participant=participant
-    ).first()
+    existing_result_id = TestResult.objects.filter(
+        test_id=test_id,
+        participant_id=participant.id
+    ).values_list('id', flat=True).first()
     
-    if existing_result:
-        return redirect('test_result', result_id=existing_result.id)
-    
-    questions = test.questions.all().order_by('order')
+    if existing_result_id:
+        return redirect('test_result', result_id=existing_result_id)
     
     if request.method == 'POST':
-        # Завершение теста и сохранение результатов
-        total_questions = questions.count()
-        
-        # Создаём результат теста
-        result = TestResult.objects.create(
-            test=test,
-            participant=participant,
-            total_questions=total_questions,
-            correct_answers=0,
-            percentage=0,
-            started_at=timezone.now(),
-            is_completed=True
-        )
+        # Участник из сессии помечен удалённым - ответы не принимаются
+        if not Participant.objects.filter(id=participant.id).exists():
+            request.session.flush()
+            return redirect('register')
         
-        correct_count = 0
-        
-        # Обрабатываем ответы
-        for question in questions:
-            answer_id = request.POST.get(f'answer_{question.id}')
-            
-            user_answer = UserAnswer.objects.create(
-                test_result=result,
-                question=question,
-                is_correct=False
-            )
-            
-            if answer_id:
-                try:
-                    selected_answer = Answer.objects.get(
-                        id=answer_id,
-                        question=question
-                    )
-                    user_answer.selected_answer = selected_answer
-                    user_answer.is_correct = selected_answer.is_correct
-                    
-                    if selected_answer.is_correct:
-                        correct_count += 1
-                except Answer.DoesNotExist:
-                    pass
-            
-            user_answer.save()
+        try:
+            if settings.GRADING_QUEUE:
+                # Ответы принимаются без проверки - результат проверит grade_worker
+                result = enqueue_submission(test_id, participant.id, request.POST)
+            else:
+                result = save_graded_result(test_id, participant.id, request.POST)
+        except IntegrityError:
+            # Участник из сессии удалён из БД
+            if not Participant.objects.filter(id=participant.id).exists():
+                request.session.flush()
+                return redirect('register')
+            return redirect('test_list')
         
-        # Обновляем результат
-        result.correct_answers = correct_count
-        result.percentage = (correct_count / total_questions * 100) if total_questions > 0 else 0
-        result.save()
+        if not result:
+            return redirect('test_list')
         
         return redirect('test_result', result_id=result.id)
     
     # GET: Показываем форму с вопросами
+    return render(request, 'test_pr/take_test.html', take_test_context(test, participant))
+
+
+def take_test_context(test, participant):
+    """
+    Контекст страницы прохождения теста (общий для синхронной и асинхронной версий).
+    Длинный тест отдаётся только первой порцией вопросов, остальные
+    страница догружает через API по мере навигации.
+    """
+    test = attempt_sheet(test, participant.id)
+    
     # Инициализируем таймер, если установлен
     timer_seconds = None
-    if test.timer_minutes:
-        timer_seconds = test.timer_minutes * 60
+    if test['timer_minutes']:
+        timer_seconds = test['timer_minutes'] * 60
     
-    context = {
+    questions = test['questions']
+    paged = len(questions) > settings.PAGED_TEST_THRESHOLD
+    
+    return {
         'test': test,
-        'questions': questions,
+        'questions': questions[:settings.QUESTIONS_PAGE_SIZE] if paged else questions,
+        'total_questions': len(questions),
+        'paged': paged,
+        'page_size': settings.QUESTIONS_PAGE_SIZE,
         'participant': participant,
         'timer_seconds': timer_seconds,
     }
-    
-    return render(request, 'test_pr/take_test.html', context)
 
 
 @require_http_methods(["POST"])
+@rate_limit('save_answer')
 def save_answer(request, test_id):
     """
     AJAX endpoint для сохранения ответа пользователя.
@@ -202,30 +230,63 @@ def save_answer(request, test_id):
 def test_result(request, result_id):
     """
     Отображение результатов прохождения теста.
+    Проверенный результат не меняется: страница отдаётся из кэша,
+    а повторный запрос с ETag получает 304 без обращения к БД.
     """
-    participant_id = request.session.get('participant_id')
-    if not participant_id:
+    participant = get_session_participant(request)
+    if not participant:
         return redirect('register')
     
-    try:
-        participant = Participant.objects.get(id=participant_id)
-        result = TestResult.objects.get(id=result_id, participant=participant)
-    except (Participant.DoesNotExist, TestResult.DoesNotExist):
+    return result_page_response(request, result_id, participant)
+
+
+def result_page_response(request, result_id, participant):
+    """Страница результата участника (общая для синхронной и асинхронной версий)"""
+    meta = get_result_meta(result_id)
+    if not meta or meta['participant_id'] != participant.id:
         return redirect('test_list')
     
-    user_answers = result.user_answers.select_related(
-        'question',
-        'selected_answer'
-    ).order_by('question__order')
+    # Ответы ещё в очереди проверки
+    if not meta['is_completed']:
+        return render(request, 'test_pr/result_grading.html', {
+            'result': TestResult.objects.get(id=result_id),
+            'participant': participant,
+        })
+    
+    # Страница зависит от cookie сессии - кэшируется только в браузере участника
+    validators = {
+        'etag': meta['etag'],
+        'last_modified': meta['last_modified'],
+    }
+    cache_control = {'private': True, 'max_age': 0, 'must_revalidate': True}
+    
+    response = not_modified_response(request, **validators, **cache_control)
+    if response is not None:
+        return response
+    
+    html = cache.get(result_page_key(result_id))
+    if html is None:
+        html = _render_result_page(request, result_id, participant)
+        # Страницу с одноразовыми сообщениями не кэшируем
+        if not len(messages.get_messages(request)):
+            cache.set(result_page_key(result_id), html, settings.RESULT_CACHE_TIMEOUT)
+    
+    response = HttpResponse(html)
+    patch_vary_headers(response, ['Cookie'])
+    return set_validators(response, **validators, **cache_control)
+
+
+def _render_result_page(request, result_id, participant):
+    result = TestResult.objects.select_related('test').get(id=result_id)
     
     context = {
         'result': result,
-        'user_answers': user_answers,
+        'user_answers': answers_for_result(result),
         'test': result.test,
         'participant': participant,
     }
     
-    return render(request, 'test_pr/test_result.html', context)
+    return render_to_string('test_pr/test_result.html', context, request)
 
 
 @require_http_methods(["GET"])
@@ -245,16 +306,199 @@ def logout_user(request):
 def get_test_timer(request, test_id):
     """
     API: Получить информацию о таймере теста.
+    Данные берутся из листа теста в кэше, поэтому и ответ,
+    и 304 на If-None-Match обходятся без запросов к БД.
     """
+    test = get_test_sheet(test_id)
+    if not test:
+        return JsonResponse({'success': False, 'error': 'Тест не найден'})
+    
+    return timer_response(request, test)
+
+
+@require_http_methods(["GET"])
+def get_test_questions(request, test_id):
+    """
+    API: Порция вопросов теста с вариантами ответов (без отметки правильности).
+    Параметр page - номер порции, начиная с 1.
+    """
+    participant = get_session_participant(request)
+    if not participant:
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+    
+    test = get_test_sheet(test_id)
+    if not test:
+        return JsonResponse({'success': False, 'error': 'Тест не найден'})
+    
+    return questions_page_response(request, test, participant)
+
+
+def questions_page_response(request, test, participant):
+    """Ответ API порции вопросов попытки участника с ETag от версии теста"""
+    tag = attempt_tag(test, participant.id)
+    test = attempt_sheet(test, participant.id)
+    
     try:
-        test = Test.objects.get(id=test_id, status='active')
-        return JsonResponse({
-            'success': True,
-            'timer_minutes': test.timer_minutes,
-            'timer_seconds': (test.timer_minutes * 60) if test.timer_minutes else None,
-        })
-    except Test.DoesNotExist:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Некорректный номер страницы'}, status=400)
+    
+    page_size = settings.QUESTIONS_PAGE_SIZE
+    total = len(test['questions'])
+    pages = max(1, -(-total // page_size))
+    if not 1 <= page <= pages:
+        return JsonResponse({'success': False, 'error': 'Страница не найдена'}, status=404)
+    
+    etag = f'"questions-{test["id"]}-{test["version"]}{tag}-{page}-{page_size}"'
+    cache_control = {'private': True, 'max_age': 0, 'must_revalidate': True}
+    
+    response = not_modified_response(request, etag=etag, **cache_control)
+    if response is not None:
+        return response
+    
+    start = (page - 1) * page_size
+    response = JsonResponse({
+        'success': True,
+        'version': test['version'],
+        'page': page,
+        'pages': pages,
+        'page_size': page_size,
+        'total': total,
+        'questions': test['questions'][start:start + page_size],
+    })
+    return set_validators(response, etag=etag, **cache_control)
+
+
+@require_http_methods(["GET"])
+def get_test_snapshot(request, test_id):
+    """
+    API: Весь тест одним ответом для клиентов-киосков
+    (поколоночный JSON или MessagePack при ?format=msgpack).
+    """
+    participant = get_session_participant(request)
+    if not participant:
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+    
+    test = get_test_sheet(test_id)
+    if not test:
         return JsonResponse({'success': False, 'error': 'Тест не найден'})
+    
+    return snapshot_response(request, test, participant)
+
+
+def snapshot_response(request, test, participant):
+    """Ответ со снимком теста: готовое тело из кэша, gzip и ETag от версии теста"""
+    tag = attempt_tag(test, participant.id)
+    test = attempt_sheet(test, participant.id)
+    
+    fmt = request.GET.get('format')
+    if not fmt:
+        fmt = 'msgpack' if 'application/msgpack' in request.headers.get('Accept', '') else 'json'
+    if fmt not in available_formats():
+        return JsonResponse({
+            'success': False,
+            'error': 'Формат не поддерживается',
+            'formats': available_formats(),
+        }, status=406)
+    
+    body, gzipped = get_snapshot(test, fmt, tag)
+    use_gzip = accepts_gzip(request)
+    
+    etag = f'"snapshot-{test["id"]}-{test["version"]}{tag}-{fmt}{"-gzip" if use_gzip else ""}"'
+    cache_control = {'private': True, 'max_age': 0, 'must_revalidate': True}
+    
+    response = not_modified_response(request, etag=etag, **cache_control)
+    if response is None:
+        response = HttpResponse(gzipped if use_gzip else body, content_type=CONTENT_TYPES[fmt])
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+        set_validators(response, etag=etag, **cache_control)
+    
+    patch_vary_headers(response, ['Accept', 'Accept-Encoding', 'Cookie'])
+    return response
+
+
+@require_http_methods(["GET"])
+def get_result_rank(request, result_id):
+    """
+    API: Место и процентиль результата участника в тесте
+    и таблица лидеров. Загружается скриптом страницы результата,
+    поэтому сама страница остаётся неизменной и кэшируемой.
+    """
+    participant = get_session_participant(request)
+    if not participant:
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+    
+    result = TestResult.objects.filter(
+        id=result_id,
+        participant_id=participant.id,
+        is_completed=True
+    ).values('test_id', 'percentage').first()
+    if not result:
+        return JsonResponse({'success': False, 'error': 'Результат не найден'}, status=404)
+    
+    response = JsonResponse({
+        'success': True,
+        **(get_rank(result['test_id'], result['percentage']) or {}),
+        'leaders': get_leaderboard(result['test_id']),
+    })
+    patch_cache_control(response, private=True, max_age=LEADERBOARD_CACHE_TIMEOUT)
+    return response
+
+
+@require_http_methods(["GET"])
+def get_test_leaderboard(request, test_id):
+    """
+    API: Лучшие результаты теста.
+    """
+    if not get_session_participant(request):
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+    
+    response = JsonResponse({'success': True, 'leaders': get_leaderboard(test_id)})
+    patch_cache_control(response, private=True, max_age=LEADERBOARD_CACHE_TIMEOUT)
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@rate_limit('record_question_timings')
+def record_question_timings(request, test_id):
+    """
+    API: Пачка времени на вопросах со страницы прохождения (sendBeacon).
+    sendBeacon не передаёт заголовок CSRF; межсайтовый запрос
+    не несёт cookie сессии (SameSite=Lax) и отклоняется без участника.
+    """
+    if not get_session_participant(request):
+        return JsonResponse({'success': False, 'error': 'Требуется регистрация'}, status=403)
+    
+    test = get_test_sheet(test_id)
+    if not test:
+        return JsonResponse({'success': False, 'error': 'Тест не найден'}, status=404)
+    
+    try:
+        rows = parse_timings(request.body, {question['id'] for question in test['questions']})
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    record_timings(rows)
+    return HttpResponse(status=204)
+
+
+def timer_response(request, test):
+    """Ответ API таймера по листу теста с ETag от версии теста"""
+    etag = f'"timer-{test["id"]}-{test["version"]}"'
+    cache_control = {'public': True, 'max_age': 0, 'must_revalidate': True}
+    
+    response = not_modified_response(request, etag=etag, **cache_control)
+    if response is not None:
+        return response
+    
+    response = JsonResponse({
+        'success': True,
+        'timer_minutes': test['timer_minutes'],
+        'timer_seconds': (test['timer_minutes'] * 60) if test['timer_minutes'] else None,
+    })
+    return set_validators(response, etag=etag, **cache_control)
 
 
 # ============================================================================
@@ -269,7 +513,50 @@ def admin_test_builder(request):
     """
     tests = Test.objects.all().order_by('-created_at')
     return render(request, 'test_pr/admin/test_builder.html', {
-        'tests': tests
+        'tests': tests,
+        'deletions': active_jobs()
+    })
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def admin_analytics(request):
+    """
+    Админская страница: Аналитика результатов по сводкам
+    (обновляются командой rollup_results), чтение - с реплики отчётов
+    """
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 365)
+    except ValueError:
+        days = 30
+    
+    with reporting_reads(request):
+        context = dashboard_data(days)
+    
+    return render(request, 'test_pr/admin/analytics.html', context)
+
+
+@staff_member_required
+@require_http_methods(["GET"])
+def admin_duplicates(request):
+    """
+    Админская страница: Кластеры почти одинаковых вопросов
+    (подписи обновляются при сохранении и командой find_duplicates)
+    """
+    try:
+        threshold = min(max(float(request.GET.get('threshold', DEFAULT_THRESHOLD)), 0.5), 1.0)
+    except ValueError:
+        threshold = DEFAULT_THRESHOLD
+    
+    with reporting_reads(request):
+        clusters = find_clusters(threshold)
+        missing = Question.objects.filter(signature__isnull=True).count()
+    
+    return render(request, 'test_pr/admin/duplicates.html', {
+        'clusters': clusters[:CLUSTERS_SHOWN],
+        'total_clusters': len(clusters),
+        'threshold': threshold,
+        'missing': missing,
     })
 
 
@@ -313,7 +600,7 @@ def admin_create_test(request):
                     question = Question.objects.create(
                         test=test,
                         text=question_text,
-                        order=q_data.get('order', q_index)
+                        order=q_data.get('order', q_index * ORDER_STEP)
                     )
                     
                     # Создаём ответы для вопроса
@@ -391,6 +678,8 @@ def admin_edit_test(request, test_id):
                     })
                 
                 test = test_form.save()
+                # Полное сохранение тоже меняет версию: открытые страницы не перезапишут его изменениями
+                Test.objects.filter(id=test.id).update(version=F('version') + 1)
                 
                 # Удаляем старые вопросы
                 test.questions.all().delete()
@@ -416,7 +705,7 @@ def admin_edit_test(request, test_id):
                     question = Question.objects.create(
                         test=test,
                         text=question_text,
-                        order=q_data.get('order', q_index)
+                        order=q_data.get('order', q_index * ORDER_STEP)
                     )
                     
                     # Создаём ответы для вопроса
@@ -474,10 +763,12 @@ def admin_edit_test(request, test_id):
     questions_data = []
     for question in questions:
         questions_data.append({
+            'id': question.id,
             'text': question.text,
             'order': question.order,
             'answers': [
                 {
+                    'id': answer.id,
                     'text': answer.text,
                     'is_correct': answer.is_correct,
                     'order': answer.order
@@ -489,7 +780,72 @@ def admin_edit_test(request, test_id):
     return render(request, 'test_pr/admin/edit_test.html', {
         'form': form,
         'test': test,
-        'questions': json.dumps(questions_data)
+        'questions': questions_data
+    })
+
+
+@staff_member_required
+@require_http_methods(["PATCH"])
+def admin_save_test_changes(request, test_id):
+    """
+    API: Сохранение изменений конструктора - только изменённые поля теста
+    и вопросы. JSON: version - версия теста при открытии страницы,
+    test, questions, deleted (см. builder.parse_changes)
+    """
+    test = get_object_or_404(Test, id=test_id)
+    try:
+        changes = parse_changes(json.loads(request.body))
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    fields, errors = clean_test_fields(test, changes['test'])
+    if errors:
+        return JsonResponse({'success': False, 'errors': errors}, status=400)
+    
+    try:
+        version, created = apply_changes(test, changes, fields)
+    except VersionConflict as e:
+        return JsonResponse({'success': False, 'error': str(e), 'version': e.version}, status=409)
+    except (Question.DoesNotExist, Answer.DoesNotExist) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=404)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'message': 'Тест успешно обновлён',
+        'version': version,
+        'created': created
+    })
+
+
+@staff_member_required
+@require_http_methods(["POST"])
+def admin_reorder_question(request, test_id):
+    """
+    API: Перенос вопроса между соседями (перетаскивание в конструкторе).
+    JSON: question_id и after_id/before_id - ID соседей (null - начало/конец)
+    """
+    try:
+        data = json.loads(request.body)
+        question_id = int(data['question_id'])
+        after_id = int(data['after_id']) if data.get('after_id') is not None else None
+        before_id = int(data['before_id']) if data.get('before_id') is not None else None
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'success': False, 'error': 'Некорректные данные'}, status=400)
+    
+    get_object_or_404(Test, id=test_id)
+    try:
+        orders, compacted = move_question(test_id, question_id, after_id, before_id)
+    except Question.DoesNotExist as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=404)
+    except StaleOrder as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+    
+    return JsonResponse({
+        'success': True,
+        'orders': {str(question_id): order for question_id, order in orders.items()},
+        'compacted': compacted
     })
 
 
@@ -497,16 +853,17 @@ def admin_edit_test(request, test_id):
 @require_http_methods(["POST"])
 def admin_delete_test(request, test_id):
     """
-    API: Удаление теста
+    API: Удаление теста. Тест сразу скрывается, его вопросы и результаты
+    удаляются в фоне командой purge_deleted
     """
     try:
         test = get_object_or_404(Test, id=test_id)
-        test_title = test.title
-        test.delete()
+        job = schedule_deletion(test)
         
         return JsonResponse({
             'success': True,
-            'message': f'Тест "{test_title}" успешно удалён'
+            'message': f'Тест "{test.title}" удалён, его данные удаляются в фоне',
+            'job_id': job.id
         })
     except Exception as e:
         return JsonResponse({
@@ -515,6 +872,31 @@ def admin_delete_test(request, test_id):
         })
 
 
+@staff_member_required
+@require_http_methods(["GET"])
+def admin_deletion_status(request):
+    """
+    API: Прогресс фонового удаления тестов и участников
+    """
+    return JsonResponse({
+        'success': True,
+        'jobs': [
+            {
+                'id': job.id,
+                'title': job.title,
+                'kind': job.get_kind_display(),
+                'status': job.status,
+                'status_display': job.get_status_display(),
+                'progress': job.progress,
+                'deleted': job.deleted,
+                'total': job.total,
+                'error': job.error,
+            }
+            for job in active_jobs()
+        ]
+    })
+
+
 @staff_member_required
 @require_http_methods(["POST"])
 def admin_duplicate_test(request, test_id):